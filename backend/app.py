@@ -1,30 +1,48 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_from_directory, Response, stream_with_context
 import os
 import json
 import uuid
+import base64
 from datetime import datetime
 from pathlib import Path
 from werkzeug.utils import secure_filename
 import sys
 from unicodedata import normalize as uni_normalize
 import re
+import queue
 import threading
-from typing import Optional, Dict, Any
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ chạy một process (python app.py)
+    fcntl = None  # type: ignore
 
-# Supabase client
 from dotenv import load_dotenv
-try:
-    from supabase import create_client, Client  # type: ignore
-except Exception:
-    create_client = None  # type: ignore
-    Client = None  # type: ignore
+if TYPE_CHECKING:
+    from supabase import Client  # type: ignore
 
 # Import các module từ thư mục src
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-from interview.generate_questions import process_file, read_env
+from interview.generate_questions import process_file, stream_questions, read_env, warm_imports, warm_question_bank, warm_gemini_models, reset_gemini_clients, get_cv_text_cache, get_question_cache, question_file_meta
 from interview.ask import run_interactive_interview_from_json
-from interview.evaluate import main as evaluate_interview
+from interview.evaluate import evaluate_to_sink, FileResultSink, StoreResultSink, CallbackResultSink, MultiResultSink, get_score_cache, get_model as get_eval_model
+from interview.lazy_import import preload, load_times
 from interview.generate_questions import extract_text_from_pdf
+from interview.job_queue import JobQueue, QUEUED, RUNNING, DONE, FAILED
+from interview import gemini_gateway
+from interview.questions_index import QuestionsIndex
+from interview.results_index import ResultsIndex
+from interview.events import EventBroker, SharedEventLog
+from interview.question_bank import get_question_bank
+from interview.vector_index import get_vector_index, can_write as vector_index_can_write, set_write_gate as set_vector_write_gate
+
+# Supabase client: SDK chỉ được import khi tạo client lần đầu (_get_supabase) hoặc trong warmup
+from interview.supabase_access import SupabaseAccess, supabase_sdk, SUPABASE_AVAILABLE
+from interview.write_behind import WriteBehindJournal
+from interview.local_store import LocalStore
 import traceback
 import sys
 import re
@@ -67,6 +85,10 @@ os.makedirs('interview_question', exist_ok=True)
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _form_flag(name: str, form=None) -> bool:
+    form = request.form if form is None else form
+    return form.get(name, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
 def _slug_name(name: str) -> str:
     try:
         n = uni_normalize('NFKD', name)
@@ -91,37 +113,20 @@ def _load_env() -> None:
             load_dotenv(dotenv_path=str(env_path), override=True)
     except Exception:
         pass
-_supabase: Optional["Client"] = None
+# Circuit breaker + pool HTTP dùng chung: khi Supabase down/chưa cấu hình, _get_supabase() trả None
+# ngay và các helper _db_* chuyển sang chế độ file thay vì chờ timeout ở mỗi request
+_supabase_access = SupabaseAccess(
+    _load_env,
+    timeout=float(os.getenv('SUPABASE_TIMEOUT', '5')),
+    connect_timeout=float(os.getenv('SUPABASE_CONNECT_TIMEOUT', '2')),
+    pool_size=int(os.getenv('SUPABASE_POOL_SIZE', '20')),
+    failure_threshold=int(os.getenv('SUPABASE_BREAKER_FAILURES', '3')),
+    reset_timeout=float(os.getenv('SUPABASE_BREAKER_RESET_SECONDS', '30')),
+    config_retry=float(os.getenv('SUPABASE_CONFIG_RETRY_SECONDS', '60')),
+)
 
 def _get_supabase() -> Optional["Client"]:
-    global _supabase
-    if _supabase is not None:
-        return _supabase
-    try:
-        _load_env()
-        url = os.getenv('SUPABASE_URL')
-        key = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_ANON_KEY')
-        if create_client is None:
-            print('[SUPABASE] SDK not available (pip install supabase).')
-            return None
-        if not url:
-            print('[SUPABASE] Missing SUPABASE_URL in environment.')
-            return None
-        if not key:
-            print('[SUPABASE] Missing SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY in environment.')
-            return None
-        _supabase = create_client(url, key)
-        return _supabase
-    except Exception as e:
-        print('[SUPABASE] create_client failed:', e)
-        return None
-
-def _db_ordered_select(client: "Client", table: str, fields: str = '*'):
-    """Select rows ordered by created_at desc; fallback to id desc."""
-    try:
-        return client.table(table).select(fields).order('created_at', desc=True).execute()
-    except Exception:
-        return client.table(table).select(fields).order('id', desc=True).execute()
+    return _supabase_access.client()
 
 def _db_upsert_candidate(candidate_id: str, candidate_name: str) -> None:
     client = _get_supabase()
@@ -135,17 +140,47 @@ def _db_upsert_candidate(candidate_id: str, candidate_name: str) -> None:
     except Exception:
         pass
 
+def _db_upsert_candidates(rows: List[Dict[str, Any]]) -> bool:
+    """Upsert nhiều ứng viên trong một request (write-behind); False nếu không ghi được."""
+    client = _get_supabase()
+    if not client:
+        return False
+    try:
+        client.table('candidates').upsert(rows, on_conflict='candidate_id').execute()
+        return True
+    except Exception as e:
+        print('[SUPABASE][UPSERT candidates] error:', e)
+        return False
+
+def _interview_log_row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'candidate_id': payload.get('id'),
+        'candidate_name': payload.get('candidate_name'),
+        'interview_date': payload.get('interview_date'),
+        'responses': payload.get('responses'),  # JSONB
+    }
+
+def _db_insert_interview_logs(payloads: List[Dict[str, Any]]) -> Optional[List[int]]:
+    """Insert nhiều interview log trong một request → id theo đúng thứ tự; None nếu lỗi."""
+    client = _get_supabase()
+    if not client:
+        return None
+    try:
+        res = client.table('interview_logs').insert([_interview_log_row(p) for p in payloads]).execute()
+        ids = [row.get('id') for row in (getattr(res, 'data', None) or [])]
+        if len(ids) == len(payloads) and all(isinstance(i, int) for i in ids):
+            return ids
+        print('[SUPABASE][INSERT interview_logs] unexpected response:', len(ids), 'rows')
+    except Exception as e:
+        print('[SUPABASE][INSERT interview_logs] error:', e)
+    return None
+
 def _db_insert_interview_log(payload: Dict[str, Any]) -> Optional[int]:
     client = _get_supabase()
     if not client:
         return None
     try:
-        data = {
-            'candidate_id': payload.get('id'),
-            'candidate_name': payload.get('candidate_name'),
-            'interview_date': payload.get('interview_date'),
-            'responses': payload.get('responses'),  # JSONB
-        }
+        data = _interview_log_row(payload)
         res = client.table('interview_logs').insert(data).execute()
         if getattr(res, 'data', None) and isinstance(res.data, list) and res.data:
             row = res.data[0]
@@ -155,19 +190,492 @@ def _db_insert_interview_log(payload: Dict[str, Any]) -> Optional[int]:
         return None
     return None
 
-def _db_insert_evaluate_result(interview_log_id: Optional[int], result: Dict[str, Any]) -> None:
+def _db_insert_evaluate_result(interview_log_id: Optional[int], result: Dict[str, Any]) -> Optional[int]:
     client = _get_supabase()
     if not client:
-        return
+        return None
     try:
         data = {
             'interview_log_id': interview_log_id,
             'result': result,  # JSONB
         }
-        client.table('evaluate_results').insert(data).execute()
+        res = client.table('evaluate_results').insert(data).execute()
+        if getattr(res, 'data', None) and isinstance(res.data, list) and res.data:
+            row = res.data[0]
+            return int(row.get('id')) if isinstance(row.get('id'), (int,)) else None
     except Exception as e:
         print('[SUPABASE][INSERT evaluate_results] error:', e)
-        pass
+        return None
+    return None
+
+# -------------------- Write-behind (interview log + ứng viên) --------------------
+# /submit_interview ghi bài vào journal cục bộ và trả lời ngay; flusher nền gom lô upsert ứng viên /
+# insert log lên Supabase. Bài được trả về với key `local:<id cục bộ>`, đổi sang id DB sau khi ghi.
+# Kết quả chấm của bài chưa có id DB cũng đi qua journal (key kết quả `local:<id cục bộ>`).
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', '1') != '0'
+_write_behind: Optional[WriteBehindJournal] = None
+_write_behind_lock = threading.Lock()
+
+def _get_write_behind() -> WriteBehindJournal:
+    global _write_behind
+    if _write_behind is None:
+        with _write_behind_lock:
+            if _write_behind is None:
+                _write_behind = WriteBehindJournal(
+                    os.getenv('WRITE_BEHIND_DB', os.path.join('outputs', 'write_behind.sqlite3')),
+                    _db_upsert_candidates,
+                    _db_insert_interview_logs,
+                    _db_insert_evaluate_result,
+                    batch_size=int(os.getenv('WRITE_BEHIND_BATCH', '50')),
+                    flush_interval=float(os.getenv('WRITE_BEHIND_INTERVAL', '0.5')),
+                    max_attempts=int(os.getenv('WRITE_BEHIND_MAX_ATTEMPTS', '5')),
+                )
+    return _write_behind
+
+def _parse_local_key(log_file: str) -> Optional[int]:
+    if not log_file.startswith('local:'):
+        return None
+    try:
+        return int(log_file.split(':', 1)[1])
+    except ValueError:
+        return None
+
+def _resolve_log_key(log_file: str) -> str:
+    """`local:<id cục bộ>` → `id:<id DB>` khi bài đã được ghi lên Supabase; key khác giữ nguyên."""
+    local_id = _parse_local_key(log_file)
+    if local_id is None or not WRITE_BEHIND:
+        return log_file
+    try:
+        db_id = _get_write_behind().resolve(local_id)
+    except Exception:
+        db_id = None
+    return f"id:{db_id}" if db_id is not None else log_file
+
+def _resolve_result_ref(result_file: str) -> str:
+    """`local:<id>` (kết quả gửi qua journal) → `id:<id DB>` nếu đã ghi lên Supabase."""
+    local_id = _parse_local_key(result_file)
+    if local_id is None:
+        return result_file
+    try:
+        rid = _get_write_behind().result_id(local_id)
+    except Exception:
+        rid = None
+    return f"id:{rid}" if rid is not None else result_file
+
+# -------------------- Local store (chế độ không có Supabase) --------------------
+# LOCAL_STORE=sqlite (mặc định): interview log / kết quả chấm lưu trong SQLite thay cho các thư mục JSON,
+# file JSON có sẵn được nhập một lần khi mở kho. LOCAL_STORE=files: giữ outputs/interview_logs và
+# outputs/evaluate_results như trước. Key (log_file, result_file) vẫn là tên file ở cả hai chế độ.
+LOCAL_STORE = os.getenv('LOCAL_STORE', 'sqlite').strip().lower()
+LOCAL_STORE_DB = os.getenv('LOCAL_STORE_DB', os.path.join('outputs', 'local_store.sqlite3'))
+INTERVIEW_LOGS_DIR = os.path.join('outputs', 'interview_logs')
+_local_store: Optional[LocalStore] = None
+_local_store_lock = threading.Lock()
+
+def _get_local_store() -> Optional[LocalStore]:
+    """Mở kho (lần đầu: migrate file JSON). Chỉ gọi trên các đường xử lý chế độ file."""
+    global _local_store
+    if LOCAL_STORE != 'sqlite':
+        return None
+    if _local_store is None:
+        with _local_store_lock:
+            if _local_store is None:
+                store = LocalStore(LOCAL_STORE_DB)
+                try:
+                    counts = store.migrate_json_dirs(INTERVIEW_LOGS_DIR, EVAL_RESULTS_DIR)
+                    if counts is not None:
+                        print(f'[LOCAL-STORE] migrated JSON files: {counts}')
+                except Exception as e:
+                    print('[LOCAL-STORE] migration failed (sẽ thử lại lần mở kho sau):', e)
+                _local_store = store
+    return _local_store
+
+def _existing_local_store() -> Optional[LocalStore]:
+    """Kho cục bộ nếu đã được dùng (đã mở hoặc file đã có), không tạo kho / migrate: cho tác vụ nền và
+    health check, vốn cũng chạy ở chế độ Supabase."""
+    if LOCAL_STORE != 'sqlite' or (_local_store is None and not os.path.exists(LOCAL_STORE_DB)):
+        return None
+    return _get_local_store()
+
+def _local_result_sink():
+    store = _get_local_store()
+    return StoreResultSink(store) if store is not None else FileResultSink(EVAL_RESULTS_DIR)
+
+def _read_local_result(result_file: str) -> Optional[Dict[str, Any]]:
+    """Kết quả chấm theo tên (kho SQLite, hoặc file JSON chưa được nhập) → dict; None nếu không có."""
+    store = _get_local_store()
+    if store is not None:
+        result = store.get_result(result_file)
+        if result is not None:
+            return result
+    path = Path(EVAL_RESULTS_DIR) / os.path.basename(result_file)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _local_result_exists(result_file: str) -> bool:
+    store = _get_local_store()
+    if store is not None and store.has_result(result_file):
+        return True
+    return (Path(EVAL_RESULTS_DIR) / os.path.basename(result_file)).exists()
+
+def _local_result_names():
+    store = _get_local_store()
+    if store is not None:
+        return store.result_files()
+    results_dir = Path(EVAL_RESULTS_DIR)
+    return [f.name for f in results_dir.glob('*.json')] if results_dir.exists() else []
+
+# -------------------- Evaluation job queue --------------------
+# Hàng đợi bền vững (SQLite) thay cho thread daemon mỗi lần nộp bài: giới hạn số worker,
+# retry có backoff và job không mất khi restart process.
+EVAL_JOB_KIND = 'evaluate_interview'
+# Job done/failed cũ hơn số ngày này bị xoá khỏi JOB_DB_PATH (0 = giữ mãi); job 'running' không có
+# heartbeat trong JOB_STALE_SECONDS (worker ở máy khác đã chết) được đưa lại hàng đợi
+JOB_RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', '7'))
+JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '300'))
+
+def _job_queue_options() -> Dict[str, Any]:
+    return {
+        'stale_after': JOB_STALE_SECONDS,
+        'retention': JOB_RETENTION_DAYS * 86400 if JOB_RETENTION_DAYS > 0 else None,
+    }
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+# Nơi lưu kết quả chấm: auto (DB nếu bài đã lưu vào Supabase, ngược lại file) | db | file | both
+EVAL_RESULT_SINK = os.getenv('EVAL_RESULT_SINK', 'auto').strip().lower()
+EVAL_RESULTS_DIR = os.path.join('outputs', 'evaluate_results')
+
+def _eval_result_sink(interview_log_id: Optional[int], use_db: bool, local_log_id: Optional[int] = None):
+    if not use_db or EVAL_RESULT_SINK == 'file':
+        return _local_result_sink()
+
+    def _insert(name: str, result: Dict[str, Any]) -> Optional[str]:
+        log_id = interview_log_id
+        if log_id is None and local_log_id is not None:
+            journal = _get_write_behind()
+            log_id = journal.resolve(local_log_id)
+            if log_id is None:
+                # Bài nộp qua write-behind chưa có id DB: gửi kết quả vào journal (flusher ghi ngay sau log)
+                # thay vì giữ worker chấm điểm chờ
+                journal.attach_result(local_log_id, result)
+                return f"local:{local_log_id}"
+        rid = _db_insert_evaluate_result(log_id, result)
+        return f"id:{rid}" if rid is not None else None
+
+    db_sink = CallbackResultSink(_insert, label='supabase')
+    return MultiResultSink(db_sink, _local_result_sink()) if EVAL_RESULT_SINK == 'both' else db_sink
+
+def _run_eval_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: chấm điểm một bài phỏng vấn trong bộ nhớ và lưu kết quả qua sink (DB và/hoặc file)."""
+    result_name = payload['result_name']
+    name = payload.get('name') or result_name.replace('_results.json', '.json')
+    use_db_mode = bool(payload.get('use_db'))
+    interview = payload.get('interview')
+    try:
+        if interview is None:
+            # Job xếp hàng bởi phiên bản cũ chỉ có đường dẫn file log
+            with open(payload['path'], 'r', encoding='utf-8') as f:
+                interview = json.load(f)
+        sink = _eval_result_sink(payload.get('interview_log_id'), use_db_mode, payload.get('local_log_id'))
+        # Lần thử lại sau khi đã ghi file kết quả (chế độ file) → không chấm lại
+        if isinstance(sink, FileResultSink) and sink.path_for(name).exists():
+            return {'result_file': sink.path_for(name).name}
+        if isinstance(sink, StoreResultSink) and sink.exists(name):
+            return {'result_file': sink.result_file(name)}
+        # Lưu DB lỗi thì job được thử lại và chấm lại; các câu đã chấm lấy từ cache điểm nên không gọi lại Gemini
+        log_key = payload.get('log_key')
+        result, ref = evaluate_to_sink(interview, name, sink,
+                                       on_progress=lambda event: _result_events.publish(log_key, event))
+        print(f"[EVAL] Hoàn tất chấm điểm -> {ref}")
+        if _results_index is not None:
+            _results_index.add(ref)  # chế độ file: trang /api/results thấy kết quả mới ngay
+        _index_result_vectors(ref, result=result)
+        return {'result_file': ref}
+    finally:
+        # Job từ phiên bản cũ: dọn thư mục tạm (iview_*) của bài đã lưu DB
+        if use_db_mode and payload.get('tmp_dir'):
+            import shutil
+            shutil.rmtree(payload['tmp_dir'], ignore_errors=True)
+
+# Sự kiện kết quả (SSE): worker đẩy trực tiếp tới các client đang chờ, không cần poll DB
+RESULT_EVENTS_KEEPALIVE_SECONDS = 15.0
+RESULT_EVENTS_RECHECK_SECONDS = float(os.getenv('RESULT_EVENTS_RECHECK_SECONDS', '60'))
+# Nhiều worker process (gunicorn.conf.py đặt SHARED_EVENTS_DB): sự kiện đi qua nhật ký SQLite dùng chung,
+# nên client SSE nối vào worker nào cũng nhận được tiến độ của job chạy ở worker khác
+SHARED_EVENTS_DB = os.getenv('SHARED_EVENTS_DB', '')
+
+def _shared_events(channel: str) -> Optional[SharedEventLog]:
+    return SharedEventLog(SHARED_EVENTS_DB, channel) if SHARED_EVENTS_DB else None
+
+_result_events = EventBroker(shared=_shared_events('results'))
+
+def _publish_job_event(job: Dict[str, Any], status: str) -> None:
+    key = job.get('job_key')
+    if not key:
+        return
+    if status == DONE:
+        result = job.get('result') if isinstance(job.get('result'), dict) else {}
+        _result_events.publish(key, {'type': 'result', 'ready': True, 'status': DONE, 'result_file': result.get('result_file')})
+    elif status == FAILED:
+        _result_events.publish(key, {'type': 'failed', 'ready': False, 'status': FAILED, 'error': job.get('error')})
+    else:
+        event = {'type': 'status', 'ready': False, 'status': status, 'attempts': job.get('attempts', 0)}
+        if job.get('retry_in') is not None:
+            event['retry_in'] = job['retry_in']
+        _result_events.publish(key, event)
+
+def _get_job_queue() -> JobQueue:
+    """Khởi tạo lazily (tránh chạy worker trong process cha của reloader khi debug)."""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                job_queue = JobQueue(
+                    os.getenv('JOB_DB_PATH', os.path.join('outputs', 'jobs.sqlite3')),
+                    workers=int(os.getenv('EVAL_QUEUE_WORKERS', '2')),
+                    max_attempts=int(os.getenv('EVAL_JOB_MAX_ATTEMPTS', '3')),
+                    kinds=(EVAL_JOB_KIND,),
+                    **_job_queue_options(),
+                )
+                job_queue.register(EVAL_JOB_KIND, _run_eval_job)
+                job_queue.add_listener(_publish_job_event)
+                job_queue.start()
+                _job_queue = job_queue
+    return _job_queue
+
+# -------------------- Questions file index --------------------
+_questions_index: Optional[QuestionsIndex] = None
+_questions_index_lock = threading.Lock()
+
+def _get_questions_index() -> QuestionsIndex:
+    global _questions_index
+    if _questions_index is None:
+        with _questions_index_lock:
+            if _questions_index is None:
+                index = QuestionsIndex('interview_question', poll_interval=float(os.getenv('QUESTIONS_INDEX_POLL_SECONDS', '5')))
+                index.start_watcher()
+                _questions_index = index
+    return _questions_index
+
+def _resolve_questions_hint(hint: str) -> Optional[str]:
+    """Tra cứu qua index; miss thì rescan nếu thư mục đã đổi (watcher chưa kịp chạy) rồi thử lại."""
+    index = _get_questions_index()
+    match = index.resolve(hint)
+    if match is None and index.refresh_if_changed():
+        match = index.resolve(hint)
+    return match
+
+# -------------------- Vector index (câu hỏi / câu trả lời đã chấm) --------------------
+VECTOR_INDEX_SYNC_SECONDS = float(os.getenv('VECTOR_INDEX_SYNC_SECONDS', '300'))
+_vector_sync_thread: Optional[threading.Thread] = None
+_vector_sync_lock = threading.Lock()
+
+def _index_result_vectors(source: str, result: Optional[Dict[str, Any]] = None, result_path: Optional[str] = None) -> None:
+    if source.startswith('local:'):
+        return  # kết quả còn trong journal write-behind; sync từ DB index sau khi ghi (source id:<id>)
+    index = get_vector_index()
+    if index is None or not vector_index_can_write():
+        return  # worker khác giữ quyền ghi index: kết quả được index ở lượt sync kế tiếp của leader
+    try:
+        if result is None:
+            with open(result_path, 'r', encoding='utf-8') as rf:
+                result = json.load(rf)
+        index.index_result(source, result, version=source)
+    except Exception as e:
+        print('[VECTOR] index result failed:', e)
+
+def _sync_vector_index_from_db(index) -> int:
+    """Index các evaluate_results mới (keyset theo id, checkpoint trong state của index)."""
+    client = _get_supabase()
+    if client is None:
+        return 0
+    last_id = index.get_checkpoint('db_results') or 0
+    total = 0
+    while True:
+        resp = client.table('evaluate_results').select('id,result').gt('id', last_id).order('id').limit(200).execute()
+        rows = getattr(resp, 'data', None) or []
+        for row in rows:
+            if isinstance(row.get('result'), dict):
+                total += index.index_result(f"id:{row['id']}", row['result'], version=f"id:{row['id']}")
+            last_id = row['id']
+        if rows:
+            index.set_checkpoint('db_results', last_id)
+        if len(rows) < 200:
+            return total
+
+def _sync_vector_index_from_store(index) -> int:
+    """Như _sync_vector_index_from_db cho kho cục bộ (source = tên kết quả, như lúc job index)."""
+    store = _existing_local_store()
+    if store is None:
+        return 0
+    last_id = index.get_checkpoint('local_results') or 0
+    total = 0
+    while True:
+        rows = store.results_after(last_id)
+        for rid, result_file, result in rows:
+            if isinstance(result, dict):
+                total += index.index_result(result_file, result, version=result_file)
+            last_id = rid
+        if rows:
+            index.set_checkpoint('local_results', last_id)
+        if len(rows) < 200:
+            return total
+
+_leader_locks: Dict[str, Any] = {}
+
+def _is_leader(name: str) -> bool:
+    """Tác vụ nền chỉ nên chạy ở một process (nhiều worker): process giữ được flock của
+    outputs/<name>.lock là leader cho tới khi thoát; process khác thử lại ở chu kỳ sau."""
+    if fcntl is None:
+        return True
+    held = _leader_locks.get(name)
+    if held is not None and held[0] == os.getpid():
+        return True
+    fh = open(os.path.join('outputs', f'{name}.lock'), 'w')
+    try:
+        fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fh.close()
+        return False
+    _leader_locks[name] = (os.getpid(), fh)
+    return True
+
+_vector_leader_pid: Optional[int] = None
+
+def _vector_write_gate() -> bool:
+    """Nhiều worker: chỉ leader ghi index (chroma/state.json không an toàn khi nhiều process cùng ghi);
+    worker khác bỏ lần ghi trực tiếp sau job chấm/sinh câu hỏi, lượt sync của leader index phần đó."""
+    global _vector_leader_pid
+    if not _is_leader('vector_index_sync'):
+        return False
+    if _vector_leader_pid != os.getpid():
+        index = get_vector_index()
+        if index is not None:
+            index.reload_state()  # vừa nhận quyền ghi: state.json có thể do leader trước ghi
+        _vector_leader_pid = os.getpid()
+    return True
+
+if SHARED_EVENTS_DB:
+    set_vector_write_gate(_vector_write_gate)
+
+def _start_vector_index_sync() -> None:
+    """Sync nền định kỳ: file câu hỏi, file kết quả và các dòng evaluate_results mới."""
+    global _vector_sync_thread
+    if _vector_sync_thread is not None or get_vector_index() is None:
+        return
+    with _vector_sync_lock:
+        if _vector_sync_thread is not None:
+            return
+
+        def _loop() -> None:
+            index = get_vector_index()
+            while True:
+                if not vector_index_can_write():
+                    # Worker khác đang sync (chroma không an toàn khi nhiều process cùng ghi)
+                    time.sleep(VECTOR_INDEX_SYNC_SECONDS)
+                    continue
+                try:
+                    n = index.sync_questions_dir('interview_question', meta_lookup=question_file_meta())
+                    n += index.sync_results_dir(EVAL_RESULTS_DIR)
+                    n += _sync_vector_index_from_store(index)
+                    n += _sync_vector_index_from_db(index)
+                    if n:
+                        print(f'[VECTOR] indexed {n} new vectors')
+                except Exception as e:
+                    print('[VECTOR] sync error:', e)
+                time.sleep(VECTOR_INDEX_SYNC_SECONDS)
+
+        _vector_sync_thread = threading.Thread(target=_loop, name='vector-index-sync', daemon=True)
+        _vector_sync_thread.start()
+
+# -------------------- Warmup --------------------
+# Import app không import SDK nặng (Gemini, Supabase, OCR, pypdf) và không tạo client/model handle:
+# mọi thứ được khởi tạo lười khi dùng lần đầu. warm_process() là hook warmup tường minh làm trước
+# các việc đó (mặc định chạy nền) để process trả lời health check ngay mà request đầu vẫn nhanh.
+_warmup_state: Dict[str, Any] = {'status': 'idle', 'started_at': None, 'seconds': None, 'steps': {}}
+_warmup_lock = threading.Lock()
+_warmup_pid: Optional[int] = None
+
+def _warmup_steps(question_bank: bool):
+    steps = [
+        # Import SDK/thư viện nặng (thời gian từng module: /api/health/warmup → imports)
+        ('imports', lambda: (warm_imports(), preload([supabase_sdk]) if SUPABASE_AVAILABLE else None)),
+        # Cấu hình Gemini, danh sách model (list_models) và handle model text/vision
+        ('gemini', lambda: (read_env(), warm_gemini_models())),
+        ('evaluate_model', get_eval_model),
+        ('supabase', _get_supabase),
+    ]
+    if question_bank:
+        # Khai thác câu hỏi mới trong interview_question/ vào question bank (chỉ file mới/đã đổi)
+        steps.append(('question_bank', warm_question_bank))
+    return steps
+
+def warm_process(background: bool = True, question_bank: bool = True) -> None:
+    """Hook warmup: chạy lần lượt các bước khởi tạo, ghi thời gian/lỗi từng bước vào _warmup_state.
+
+    Không chạy lúc import (process con của pool OCR, reloader, script/test import app đều không warm);
+    chỉ điểm khởi động server gọi: `python app.py`, init_worker() (gunicorn) và before_serving (ASGI).
+    Mỗi process chỉ warm một lần."""
+    global _warmup_pid
+    with _warmup_lock:
+        if _warmup_pid == os.getpid():
+            return
+        _warmup_pid = os.getpid()
+
+    def _run() -> None:
+        start = time.perf_counter()
+        with _warmup_lock:
+            _warmup_state.update(status='running', started_at=time.time(), seconds=None, steps={})
+        for name, step in _warmup_steps(question_bank):
+            t = time.perf_counter()
+            entry: Dict[str, Any] = {}
+            try:
+                step()
+            except Exception as e:
+                print(f'[WARMUP] {name} failed: {e}')
+                entry['error'] = str(e)
+            entry['seconds'] = round(time.perf_counter() - t, 3)
+            with _warmup_lock:
+                _warmup_state['steps'][name] = entry
+        elapsed = time.perf_counter() - start
+        with _warmup_lock:
+            _warmup_state.update(status='done', seconds=round(elapsed, 3))
+        print(f'[WARMUP] done in {elapsed:.2f}s')
+
+    if background:
+        threading.Thread(target=_run, name='warmup', daemon=True).start()
+    else:
+        _run()
+
+def warmup_status() -> Dict[str, Any]:
+    with _warmup_lock:
+        state = dict(_warmup_state, steps=dict(_warmup_state['steps']))
+    state['imports'] = load_times()
+    return state
+
+def init_worker() -> None:
+    """Khởi tạo một worker process ngay sau fork (gunicorn.conf.py, preload_app).
+
+    Client Supabase/Gemini không dùng chung qua fork nên được bỏ và warm lại ở nền trong từng worker;
+    hàng đợi chấm điểm (SQLite, dùng chung giữa các worker) khởi động luôn thay vì chờ request đầu.
+    """
+    _supabase_access.reset()
+    reset_gemini_clients()
+    _ensure_job_queue()
+    warm_process(background=True, question_bank=_is_leader('question_bank_warm'))
+
+@app.before_request
+def _ensure_job_queue() -> None:
+    # Job còn dang dở từ lần chạy trước được xử lý tiếp ngay từ request đầu tiên
+    _get_job_queue()
+    _get_generation_queue()
+    if WRITE_BEHIND:
+        _get_write_behind().start()  # ghi tiếp các bài còn trong journal
+    _start_vector_index_sync()
 
 @app.route('/')
 def index():
@@ -189,12 +697,6 @@ def upload_cv():
             return redirect(request.url)
         
         if file and allowed_file(file.filename):
-            # Lưu file
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(file_path)
-            
             # Lấy thông tin từ form
             job_title = request.form.get('job_title', '').strip()
             level = request.form.get('level', '').strip()
@@ -203,57 +705,14 @@ def upload_cv():
                 flash('Vui lòng nhập đầy đủ thông tin vị trí và level', 'error')
                 return redirect(request.url)
             
-            try:
-                # Tạo câu hỏi phỏng vấn
-                read_env()  # Đọc API key
-                output_dir = Path('interview_question')
-                output_dir.mkdir(exist_ok=True)
-                
-                # Tạo tên file output dựa trên file CV thực tế (có UUID)
-                base_name = Path(unique_filename).stem
-                questions_file = output_dir / f"{base_name}.questions.json"
-                
-                # Đọc JD nếu có (optional)
-                jd_text = None
-                jd = request.files.get('jd_file')
-                if jd and jd.filename:
-                    jd_name = secure_filename(jd.filename)
-                    jd_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{jd_name}")
-                    jd.save(jd_path)
-                    try:
-                        if jd_name.lower().endswith('.pdf'):
-                            jd_text = extract_text_from_pdf(Path(jd_path))
-                        else:
-                            jd_text = Path(jd_path).read_text(encoding='utf-8', errors='ignore')
-                    except Exception as _e:
-                        print('[JD][WARN] Cannot read JD file:', _e)
-                # Gọi hàm tạo câu hỏi
-                from interview.generate_questions import process_file
-                process_file(Path(file_path), job_title, level, output_dir, jd_text=jd_text)
-                
-                # Tìm file câu hỏi đã được tạo (có thể có tên khác do UUID)
-                actual_questions_file = None
-                for file in output_dir.glob("*.questions.json"):
-                    if file.stem.startswith(base_name.split('_')[0]):  # Tìm file có UUID tương ứng
-                        actual_questions_file = file.name
-                        break
-                
-                if actual_questions_file:
-                    questions_file = actual_questions_file
-                
-                # Kiểm tra file đã được tạo
-                if actual_questions_file and (output_dir / actual_questions_file).exists():
-                    flash(f'Đã tạo thành công câu hỏi phỏng vấn cho {job_title} - {level}', 'success')
-                    return redirect(url_for('interview', questions_file=actual_questions_file))
-                else:
-                    flash('Có lỗi xảy ra khi tạo câu hỏi phỏng vấn', 'error')
-                    
-            except Exception as e:
-                flash(f'Lỗi: {str(e)}', 'error')
+            # Sinh câu hỏi chạy nền: trang chờ theo dõi job rồi chuyển sang trang phỏng vấn,
+            # request không giữ kết nối trong lúc OCR + Gemini
+            job = _enqueue_generation(request.files, request.form)
+            return redirect(url_for('upload_cv', job_id=job['job_id']))
         else:
             flash('File không được hỗ trợ. Vui lòng chọn file PNG, JPG, PDF', 'error')
     
-    return render_template('upload_cv.html')
+    return render_template('upload_cv.html', generation_job_id=request.args.get('job_id', type=int))
 
 @app.route('/interview')
 def interview():
@@ -299,20 +758,10 @@ def submit_interview():
         "responses": responses
     }
     
-    # Tạo tên file (chỉ để dùng cho pipeline chấm điểm) và ghi ra thư mục tạm, không dùng outputs/interview_logs
-    import tempfile
+    # Tên bài (dùng cho tên file kết quả / log_key ở chế độ file)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     safe_name = _safe_filename(interview_results['candidate_name'])
     filename = f"responses_{safe_name}_{timestamp}.json"
-    tmp_dir = tempfile.mkdtemp(prefix='iview_')
-    filepath = os.path.join(tmp_dir, filename)
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(interview_results, f, ensure_ascii=False, indent=4)
-    except Exception as e:
-        print("[SUBMIT][ERROR] Không thể ghi file tạm:", e)
-        traceback.print_exc()
-        return jsonify({'error': 'cannot write temp log', 'message': str(e)}), 500
     
     # Log thông tin nhận được
     try:
@@ -320,98 +769,88 @@ def submit_interview():
     except Exception:
         num_responses = -1
     print(f"[SUBMIT] Đã nhận bài phỏng vấn: {filename} | Số câu trả lời: {num_responses}")
-    print(f"[SUBMIT] Đẩy tác vụ chấm điểm nền... input={filepath}")
 
-    # Upsert ứng viên và lưu interview vào Supabase
+    # Upsert ứng viên và lưu interview vào Supabase: qua journal write-behind (không chờ Supabase),
+    # hoặc đồng bộ khi WRITE_BEHIND=0 / journal lỗi
     db_error = None
-    try:
-        _db_upsert_candidate(candidate_id=candidate_id, candidate_name=candidate_name)
-        db_log_id = _db_insert_interview_log(interview_results)
-    except Exception as e:
-        db_log_id = None
-        db_error = str(e)
-    use_db = db_log_id is not None
-
-    def _run_eval(path, result_name, interview_log_id, tmp_directory, use_db_mode):
+    db_log_id = None
+    local_log_id = None
+    if WRITE_BEHIND and _get_supabase() is not None:
         try:
-            evaluate_interview(path)
-            print(f"[EVAL] Hoàn tất chấm điểm -> outputs/evaluate_results/{result_name}")
-            # Đọc và lưu kết quả vào Supabase nếu có
-            if use_db_mode:
-                try:
-                    result_path = os.path.join('outputs/evaluate_results', result_name)
-                    with open(result_path, 'r', encoding='utf-8') as rf:
-                        result_json = json.load(rf)
-                    _db_insert_evaluate_result(interview_log_id, result_json)
-                    # Xóa file kết quả sau khi đã lưu DB để không lưu trên filesystem
-                    try:
-                        os.remove(result_path)
-                    except Exception:
-                        pass
-                except Exception:
-                    traceback.print_exc()
-        except Exception:
-            print("[EVAL][ERROR] Lỗi khi đánh giá (thread):")
-            traceback.print_exc()
-        finally:
-            # Dọn file tạm nếu dùng DB (đã copy vào DB, không cần giữ)
-            if use_db_mode:
-                try:
-                    try:
-                        os.remove(path)
-                    except Exception:
-                        pass
-                    import shutil
-                    shutil.rmtree(tmp_directory, ignore_errors=True)
-                except Exception:
-                    pass
-
-    # chạy chấm điểm ở thread nền để trả response ngay
-    # Nếu không dùng DB: chuyển file tạm sang outputs/interview_logs để giữ lại lịch sử file
+            local_log_id = _get_write_behind().append(candidate_id, candidate_name, interview_results)
+        except Exception as e:
+            print("[SUBMIT][WRITE-BEHIND] journal error, ghi trực tiếp:", e)
+    if local_log_id is None:
+        try:
+            _db_upsert_candidate(candidate_id=candidate_id, candidate_name=candidate_name)
+            db_log_id = _db_insert_interview_log(interview_results)
+        except Exception as e:
+            db_error = str(e)
+    use_db = db_log_id is not None or local_log_id is not None
+
+    # Bài được chấm trong bộ nhớ từ payload của job (không qua file tạm).
+    # Không dùng DB: lưu log vào kho cục bộ (SQLite, hoặc outputs/interview_logs khi LOCAL_STORE=files)
+    filepath = None
     if not use_db:
         try:
-            import shutil
-            os.makedirs('outputs/interview_logs', exist_ok=True)
-            dest = os.path.join('outputs/interview_logs', filename)
-            shutil.move(filepath, dest)
-            filepath = dest
-        except Exception:
-            pass
+            store = _get_local_store()
+            if store is not None:
+                store.upsert_candidate(candidate_id, candidate_name)
+                store.insert_interview_log(filename, interview_results)
+            else:
+                filepath = os.path.join(INTERVIEW_LOGS_DIR, filename)
+                os.makedirs(INTERVIEW_LOGS_DIR, exist_ok=True)
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    json.dump(interview_results, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            print("[SUBMIT][ERROR] Không thể ghi interview log:", e)
+            traceback.print_exc()
+            return jsonify({'error': 'cannot write interview log', 'message': str(e)}), 500
 
-    t = threading.Thread(target=_run_eval, args=(filepath, filename.replace('.json', '_results.json'), db_log_id, tmp_dir, use_db))
-    t.daemon = True
-    t.start()
+    # Chấm điểm qua hàng đợi job để trả response ngay
+    log_key = f"local:{local_log_id}" if local_log_id is not None else f"id:{db_log_id}" if use_db else filename
+    print(f"[SUBMIT] Đẩy tác vụ chấm điểm nền... key={log_key}")
+    try:
+        job_id = _get_job_queue().enqueue(EVAL_JOB_KIND, {
+            'name': filename,
+            'path': filepath,
+            'result_name': filename.replace('.json', '_results.json'),
+            'interview_log_id': db_log_id,
+            'local_log_id': local_log_id,
+            'use_db': use_db,
+            'interview': interview_results,
+            'log_key': log_key,
+        }, key=log_key)
+    except Exception as e:
+        print("[SUBMIT][ERROR] Không thể đưa bài vào hàng đợi chấm điểm:", e)
+        traceback.print_exc()
+        return jsonify({'error': 'cannot enqueue evaluation', 'message': str(e)}), 500
 
     return jsonify({
         'success': True,
         'queued': True,
         'message': 'Đã nhận bài và đang chấm điểm',
-        'log_file': (f"id:{db_log_id}" if use_db else filename),
+        'log_file': log_key,
+        'job_id': job_id,
         'use_db': use_db,
         'db_log_id': db_log_id,
+        'local_log_id': local_log_id,
         'db_error': db_error
     }), 200
 
 @app.route('/results')
 def results():
     """Trang hiển thị kết quả"""
-    results_dir = 'outputs/evaluate_results'
-    results_files = []
-    
-    if os.path.exists(results_dir):
-        for file in os.listdir(results_dir):
-            if file.endswith('.json'):
-                results_files.append(file)
-    
+    results_files = _local_result_names()
     return render_template('results.html', results_files=results_files)
 
 @app.route('/view_result/<filename>')
 def view_result(filename):
     """Xem chi tiết kết quả"""
     try:
-        filepath = os.path.join('outputs/evaluate_results', filename)
-        with open(filepath, 'r', encoding='utf-8') as f:
-            result_data = json.load(f)
+        result_data = _read_local_result(filename)
+        if result_data is None:
+            raise FileNotFoundError(filename)
         return render_template('view_result.html', result=result_data, filename=filename)
     except FileNotFoundError:
         flash('Không tìm thấy file kết quả', 'error')
@@ -423,6 +862,12 @@ def view_result(filename):
 @app.route('/download/<path:filename>')
 def download_file(filename):
     """Download file"""
+    store = _get_local_store()
+    result = store.get_result(os.path.basename(filename)) if store is not None else None
+    if result is not None:
+        return Response(json.dumps(result, ensure_ascii=False, indent=2), mimetype='application/json', headers={
+            'Content-Disposition': f'attachment; filename="{secure_filename(os.path.basename(filename))}"',
+        })
     return send_from_directory('outputs/evaluate_results', filename, as_attachment=True)
 
 @app.route('/api/questions/<filename>')
@@ -432,27 +877,10 @@ def get_questions(filename):
         base_dir = Path('interview_question')
         filepath = base_dir / filename
         if not filepath.exists():
-            # Try resolve via the same strategy as resolver
-            files = list(base_dir.glob('*.questions.json'))
-            # exact match (case sensitive) already failed; try suffix ignoring uuid
-            match = None
-            prefix = filename.split('_')[0]
-            candidates = [f for f in files if f.stem.startswith(prefix)] if prefix else []
-            if candidates:
-                match = max(candidates, key=lambda p: p.stat().st_mtime)
-            elif '_' in filename:
-                suffix = filename.split('_', 1)[1]
-                suf_candidates = [f for f in files if f.name.endswith(suffix)]
-                if suf_candidates:
-                    match = max(suf_candidates, key=lambda p: p.stat().st_mtime)
-            if not match:
-                # last resort substring contains
-                for f in files:
-                    if filename in f.name:
-                        match = f
-                        break
-            if match and match.exists():
-                with open(match, 'r', encoding='utf-8') as f:
+            # Resolve via the in-memory index (uuid prefix, suffix ignoring uuid, substring)
+            match = _resolve_questions_hint(filename)
+            if match and (base_dir / match).exists():
+                with open(base_dir / match, 'r', encoding='utf-8') as f:
                     questions = json.load(f)
                 return jsonify(questions)
             return jsonify({'error': 'File không tồn tại'}), 404
@@ -464,21 +892,41 @@ def get_questions(filename):
     except json.JSONDecodeError:
         return jsonify({'error': 'File không hợp lệ'}), 400
 
+def _upload_error(files, form):
+    """Lỗi validate chung của các endpoint upload CV (cả chế độ ASGI) → (payload, 400) hoặc None."""
+    file = files.get('cv_file')
+    if file is None:
+        return {'success': False, 'message': 'Không có file được chọn'}, 400
+    if file.filename == '':
+        return {'success': False, 'message': 'Không có file được chọn'}, 400
+    if not allowed_file(file.filename):
+        return {'success': False, 'message': 'File không được hỗ trợ. Vui lòng chọn file PNG, JPG, PDF'}, 400
+    if not form.get('job_title', '').strip() or not form.get('level', '').strip():
+        return {'success': False, 'message': 'Vui lòng nhập đầy đủ thông tin vị trí và level'}, 400
+    return None
+
+def _upload_result(unique_filename: str, job_title: str, level: str):
+    """Kết quả trả về sau khi process_file chạy xong → (payload, http_status)."""
+    # process_file ghi đúng <base_name>.questions.json → kiểm tra trực tiếp, không glob thư mục
+    questions_file = Path('interview_question') / f"{Path(unique_filename).stem}.questions.json"
+    if not questions_file.exists():
+        return {'success': False, 'message': 'Có lỗi xảy ra khi tạo câu hỏi phỏng vấn'}, 500
+    _get_questions_index().add(questions_file)
+    return {
+        'success': True,
+        'questions_file': questions_file.name,
+        'message': f'Đã tạo thành công câu hỏi cho {job_title} - {level}'
+    }, 200
+
 @app.route('/api/upload_cv', methods=['POST'])
 def api_upload_cv():
     """API upload CV, trả về JSON thay vì render template"""
-    # Kiểm tra file upload
-    if 'cv_file' not in request.files:
-        return jsonify({'success': False, 'message': 'Không có file được chọn'}), 400
-
-    file = request.files['cv_file']
-    if file.filename == '':
-        return jsonify({'success': False, 'message': 'Không có file được chọn'}), 400
-
-    if not (file and allowed_file(file.filename)):
-        return jsonify({'success': False, 'message': 'File không được hỗ trợ. Vui lòng chọn file PNG, JPG, PDF'}), 400
+    error = _upload_error(request.files, request.form)
+    if error:
+        return jsonify(error[0]), error[1]
 
     # Lưu file
+    file = request.files['cv_file']
     filename = secure_filename(file.filename)
     unique_filename = f"{uuid.uuid4()}_{filename}"
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
@@ -488,54 +936,362 @@ def api_upload_cv():
     job_title = request.form.get('job_title', '').strip()
     level = request.form.get('level', '').strip()
 
-    if not job_title or not level:
-        return jsonify({'success': False, 'message': 'Vui lòng nhập đầy đủ thông tin vị trí và level'}), 400
-
     try:
         # Tạo câu hỏi phỏng vấn
         read_env()  # Đọc API key
-        output_dir = Path('interview_question')
+        Path('interview_question').mkdir(exist_ok=True)
+        # Nếu có JD thì đọc nội dung (txt/pdf) và truyền vào prompt
+        jd_text = _read_jd_upload()
+        process_file(Path(file_path), job_title, level, Path('interview_question'), jd_text=jd_text,
+                     force_regenerate=_form_flag('force_regenerate'))
+        payload, code = _upload_result(unique_filename, job_title, level)
+        return jsonify(payload), code
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def _save_jd_upload() -> Optional[str]:
+    """Lưu file JD (nếu có) vào thư mục upload → đường dẫn file, chưa đọc nội dung."""
+    jd = request.files.get('jd_file')
+    if not (jd and jd.filename):
+        return None
+    jd_name = secure_filename(jd.filename)
+    jd_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{jd_name}")
+    jd.save(jd_path)
+    return jd_path
+
+def _read_jd_upload() -> Optional[str]:
+    """Lưu file JD (nếu có) và trả về nội dung text (txt/pdf)."""
+    jd_path = _save_jd_upload()
+    return _read_jd_file(jd_path) if jd_path else None
+
+def _read_jd_file(jd_path: str) -> Optional[str]:
+    try:
+        if jd_path.lower().endswith('.pdf'):
+            return extract_text_from_pdf(Path(jd_path))
+        return Path(jd_path).read_text(encoding='utf-8', errors='ignore')
+    except Exception as _e:
+        print('[JD][WARN] Cannot read JD file:', _e)
+        return None
+
+# -------------------- Question generation jobs --------------------
+# Upload chỉ lưu file rồi trả về job id ngay; đọc JD + OCR + Gemini chạy trên pool worker của
+# hàng đợi (cùng DB SQLite với job chấm điểm nhưng pool riêng). Client theo dõi qua
+# /api/generation_status (poll) hoặc /api/generation_events (SSE), rồi lấy câu hỏi qua /api/questions/<file>.
+GENERATE_JOB_KIND = 'generate_questions'
+_generation_queue: Optional[JobQueue] = None
+_generation_queue_lock = threading.Lock()
+_generation_events = EventBroker(shared=_shared_events('generation'))
+
+def _run_generate_job(payload: Dict[str, Any], attempt: int = 1) -> Dict[str, Any]:
+    """Job handler: sinh bộ câu hỏi cho một CV đã upload (ghi <stem>.questions.json)."""
+    output_dir = Path('interview_question')
+    questions_file = output_dir / payload['questions_file']
+    # Tên file là duy nhất cho mỗi upload: file đã có nghĩa là lần thử trước đã ghi xong
+    # (VD: process chết trước khi đánh dấu done) → không gọi lại Gemini
+    if not questions_file.exists():
+        read_env()
         output_dir.mkdir(exist_ok=True)
+        jd_text = _read_jd_file(payload['jd_path']) if payload.get('jd_path') else None
+        # force_regenerate chỉ bỏ qua cache ở lần đầu; lần thử lại dùng được bộ câu hỏi lần trước đã cache
+        process_file(Path(payload['file_path']), payload['job_title'], payload['level'], output_dir,
+                     jd_text=jd_text, force_regenerate=bool(payload.get('force_regenerate')) and attempt == 1)
+    if not questions_file.exists():
+        raise RuntimeError('Có lỗi xảy ra khi tạo câu hỏi phỏng vấn')
+    _get_questions_index().add(questions_file)
+    return {'questions_file': questions_file.name}
+
+def _generation_status_payload(job: Dict[str, Any], status: Optional[str] = None) -> Dict[str, Any]:
+    status = status or job.get('status')
+    result = job.get('result') if isinstance(job.get('result'), dict) else {}
+    payload = job.get('payload') if isinstance(job.get('payload'), dict) else {}
+    return {
+        'job_id': job.get('id'),
+        'status': status,
+        'ready': status == DONE,
+        'questions_file': result.get('questions_file') or payload.get('questions_file'),
+        'attempts': job.get('attempts', 0),
+        'error': job.get('error') if status in (QUEUED, FAILED) else None,
+    }
 
-        # Tạo tên file output dựa trên file CV thực tế (có UUID)
-        base_name = Path(unique_filename).stem
-        questions_file_candidate = output_dir / f"{base_name}.questions.json"
+def _generation_event(status: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload trạng thái → sự kiện SSE (`status`, hoặc `done`/`failed` khi job kết thúc)."""
+    return dict(status, type={DONE: 'done', FAILED: 'failed'}.get(status.get('status'), 'status'))
 
-        # Gọi hàm tạo câu hỏi
-        # Nếu có JD thì đọc nội dung (txt/pdf) và truyền vào prompt
-        jd_text = None
-        jd = request.files.get('jd_file')
-        if jd and jd.filename:
-            jd_name = secure_filename(jd.filename)
-            jd_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4()}_{jd_name}")
-            jd.save(jd_path)
-            try:
-                if jd_name.lower().endswith('.pdf'):
-                    jd_text = extract_text_from_pdf(Path(jd_path))
-                else:
-                    jd_text = Path(jd_path).read_text(encoding='utf-8', errors='ignore')
-            except Exception as _e:
-                print('[JD][WARN] Cannot read JD file:', _e)
-        process_file(Path(file_path), job_title, level, output_dir, jd_text=jd_text)
-
-        # Tìm file câu hỏi đã được tạo
-        actual_questions_file = None
-        for f in output_dir.glob("*.questions.json"):
-            if f.stem.startswith(base_name.split('_')[0]):
-                actual_questions_file = f.name
-                break
+def _publish_generation_event(job: Dict[str, Any], status: str) -> None:
+    event = _generation_event(_generation_status_payload(job, status))
+    if job.get('retry_in') is not None:
+        event['retry_in'] = job['retry_in']
+    _generation_events.publish(str(job.get('id')), event)
 
-        if actual_questions_file and (output_dir / actual_questions_file).exists():
-            return jsonify({
-                'success': True,
-                'questions_file': actual_questions_file,
-                'message': f'Đã tạo thành công câu hỏi cho {job_title} - {level}'
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Có lỗi xảy ra khi tạo câu hỏi phỏng vấn'}), 500
+def _get_generation_queue() -> JobQueue:
+    global _generation_queue
+    if _generation_queue is None:
+        with _generation_queue_lock:
+            if _generation_queue is None:
+                generation_queue = JobQueue(
+                    os.getenv('JOB_DB_PATH', os.path.join('outputs', 'jobs.sqlite3')),
+                    workers=int(os.getenv('GENERATION_WORKERS', '4')),
+                    max_attempts=int(os.getenv('GENERATION_JOB_MAX_ATTEMPTS', '2')),
+                    poll_interval=0.5,
+                    kinds=(GENERATE_JOB_KIND,),
+                    **_job_queue_options(),
+                )
+                generation_queue.register(GENERATE_JOB_KIND, _run_generate_job, with_attempt=True)
+                generation_queue.add_listener(_publish_generation_event)
+                generation_queue.start()
+                _generation_queue = generation_queue
+    return _generation_queue
+
+def _enqueue_generation(files, form) -> Dict[str, Any]:
+    """Lưu CV (+ JD) của request upload và xếp job sinh câu hỏi → payload trạng thái ban đầu."""
+    file = files['cv_file']
+    unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    file.save(file_path)
+    questions_file = f"{Path(unique_filename).stem}.questions.json"
+    job_id = _get_generation_queue().enqueue(GENERATE_JOB_KIND, {
+        'file_path': file_path,
+        'jd_path': _save_jd_upload(),
+        'job_title': form.get('job_title', '').strip(),
+        'level': form.get('level', '').strip(),
+        'force_regenerate': _form_flag('force_regenerate', form),
+        'questions_file': questions_file,
+    }, key=questions_file)
+    return {'job_id': job_id, 'status': QUEUED, 'ready': False, 'questions_file': questions_file}
+
+def _generation_status(job_id: Any):
+    """Trạng thái một job sinh câu hỏi → (payload, http_status)."""
+    try:
+        job = _get_generation_queue().get(int(job_id))
+    except (TypeError, ValueError):
+        job = None
+    if job is None or job.get('kind') != GENERATE_JOB_KIND:
+        return {'error': 'not found'}, 404
+    return _generation_status_payload(job), 200
+
+@app.route('/api/upload_cv/async', methods=['POST'])
+def api_upload_cv_async():
+    """Như /api/upload_cv nhưng không chờ sinh xong: lưu file, xếp job và trả 202 + job_id ngay."""
+    error = _upload_error(request.files, request.form)
+    if error:
+        return jsonify(error[0]), error[1]
+    payload = _enqueue_generation(request.files, request.form)
+    return jsonify(dict(payload, success=True)), 202
 
+@app.route('/api/generation_status')
+def api_generation_status():
+    job_id = request.args.get('job_id', '').strip()
+    if not job_id:
+        return jsonify({'error': 'missing job_id'}), 400
+    payload, code = _generation_status(job_id)
+    return jsonify(payload), code
+
+@app.route('/api/generation_events')
+def api_generation_events():
+    """SSE cho một job sinh câu hỏi: `status` (queued/running/thử lại), kết thúc bằng `done`/`failed`."""
+    job_id = request.args.get('job_id', '').strip()
+    if not job_id:
+        return jsonify({'error': 'missing job_id'}), 400
+    q = _generation_events.subscribe(job_id)
+    payload, code = _generation_status(job_id)
+    if code != 200:
+        _generation_events.unsubscribe(job_id, q)
+        return jsonify(payload), code
+
+    def _stream(initial: Dict[str, Any]):
+        try:
+            event = _generation_event(initial)
+            yield _sse(event)
+            if event['type'] != 'status':
+                return
+            idle = 0.0
+            while True:
+                try:
+                    event = q.get(timeout=RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    idle += RESULT_EVENTS_KEEPALIVE_SECONDS
+                    if idle >= RESULT_EVENTS_RECHECK_SECONDS:
+                        idle = 0.0
+                        current = _generation_event(_generation_status(job_id)[0])
+                        if current['type'] != 'status':
+                            yield _sse(current)
+                            return
+                    continue
+                yield _sse(event)
+                if event.get('type') in ('done', 'failed'):
+                    return
+        finally:
+            _generation_events.unsubscribe(job_id, q)
+
+    return Response(stream_with_context(_stream(payload)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+# -------------------- Streaming question generation --------------------
+# Sinh câu hỏi chạy trên pool nền (không phụ thuộc kết nối của client); từng câu được đẩy
+# qua EventBroker ngay khi Gemini sinh xong, bản dở dang giữ trong bộ nhớ để client vào sau
+# (trang phỏng vấn) phát lại từ đầu.
+QUESTION_STREAM_WORKERS = int(os.getenv('QUESTION_STREAM_WORKERS', '4'))
+QUESTION_STREAM_KEEP = 200
+_question_events = EventBroker(max_keys=QUESTION_STREAM_KEEP, shared=_shared_events('questions'))
+_question_streams: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_question_streams_lock = threading.Lock()
+_question_stream_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_question_stream_pool() -> ThreadPoolExecutor:
+    global _question_stream_pool
+    if _question_stream_pool is None:
+        with _question_streams_lock:
+            if _question_stream_pool is None:
+                _question_stream_pool = ThreadPoolExecutor(max_workers=QUESTION_STREAM_WORKERS,
+                                                           thread_name_prefix='question-stream')
+    return _question_stream_pool
+
+def _run_question_stream(questions_file: str, file_path: str, job_title: str, level: str,
+                         jd_path: Optional[str], force_regenerate: bool) -> None:
+    output_dir = Path('interview_question')
+    state = _question_streams[questions_file]
+    try:
+        read_env()
+        output_dir.mkdir(exist_ok=True)
+        # Đọc JD (có thể là PDF) trên pool nền, không trong request upload
+        jd_text = _read_jd_file(jd_path) if jd_path else None
+        for item in stream_questions(Path(file_path), job_title, level, output_dir, jd_text=jd_text,
+                                     force_regenerate=force_regenerate):
+            with _question_streams_lock:
+                index = len(state['questions'])
+                state['questions'].append(item)
+            _question_events.publish(questions_file, {'type': 'question', 'index': index, 'question': item})
+        out_path = output_dir / questions_file
+        if not out_path.exists():
+            raise RuntimeError('Có lỗi xảy ra khi tạo câu hỏi phỏng vấn')
+        _get_questions_index().add(out_path)
+        with _question_streams_lock:
+            state['status'] = 'done'
+            total = len(state['questions'])
+        _question_events.publish(questions_file, {'type': 'done', 'questions_file': questions_file, 'total': total})
     except Exception as e:
-        return jsonify({'success': False, 'message': str(e)}), 500
+        traceback.print_exc()
+        with _question_streams_lock:
+            state['status'] = 'error'
+            state['error'] = str(e)
+        _question_events.publish(questions_file, {'type': 'error', 'message': str(e)})
+
+def _start_question_stream(questions_file: str, *args: Any) -> None:
+    with _question_streams_lock:
+        _question_streams[questions_file] = {'questions': [], 'status': 'running', 'error': None}
+        while len(_question_streams) > QUESTION_STREAM_KEEP:
+            oldest = next(iter(_question_streams))
+            if _question_streams[oldest]['status'] == 'running':
+                break
+            _question_streams.popitem(last=False)
+    _get_question_stream_pool().submit(_run_question_stream, questions_file, *args)
+
+def _question_stream_snapshot(questions_file: str) -> Optional[Dict[str, Any]]:
+    """Phần đã sinh của một phiên (trong bộ nhớ, hoặc file đã ghi xong); None nếu không có."""
+    with _question_streams_lock:
+        state = _question_streams.get(questions_file)
+        if state:
+            return {'questions': list(state['questions']), 'status': state['status'], 'error': state['error']}
+    # Không có phiên sinh trong bộ nhớ (đã xong từ trước / process khác) → đọc file nếu có
+    path = Path('interview_question') / questions_file
+    try:
+        questions = json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+    except Exception:
+        questions = None
+    if isinstance(questions, list):
+        return {'questions': questions, 'status': 'done', 'error': None}
+    # Phiên đang chạy ở worker khác → dựng lại từ nhật ký sự kiện dùng chung
+    history = _question_events.history(questions_file)
+    if not history:
+        return None
+    snapshot = {'questions': [], 'status': 'running', 'error': None}
+    for event in history:
+        if event.get('type') == 'question' and event.get('index') == len(snapshot['questions']):
+            snapshot['questions'].append(event.get('question'))
+        elif event.get('type') == 'error':
+            snapshot.update(status='error', error=event.get('message'))
+    return snapshot
+
+def _question_stream_head(questions_file: str, snapshot: Dict[str, Any]):
+    """Sự kiện phát lại từ snapshot → (events, luồng đã kết thúc chưa)."""
+    events = [{'type': 'meta', 'questions_file': questions_file, 'status': snapshot['status']}]
+    events += [{'type': 'question', 'index': i, 'question': item} for i, item in enumerate(snapshot['questions'])]
+    if snapshot['status'] == 'done':
+        events.append({'type': 'done', 'questions_file': questions_file, 'total': len(snapshot['questions'])})
+        return events, True
+    if snapshot['status'] == 'error':
+        events.append({'type': 'error', 'message': snapshot['error']})
+        return events, True
+    return events, False
+
+def _question_stream_response(questions_file: str):
+    """SSE: `meta`, rồi `question` cho từng câu (phát lại phần đã có trước), kết thúc bằng `done`/`error`."""
+    q = _question_events.subscribe(questions_file)
+    snapshot = _question_stream_snapshot(questions_file)
+    if snapshot is None:
+        _question_events.unsubscribe(questions_file, q)
+        return jsonify({'error': 'not found'}), 404
+
+    def _stream():
+        try:
+            seen = len(snapshot['questions'])
+            head, finished = _question_stream_head(questions_file, snapshot)
+            for event in head:
+                yield _sse(event)
+            if finished:
+                return
+            while True:
+                try:
+                    event = q.get(timeout=RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if event.get('type') == 'question' and event.get('index', 0) < seen:
+                    continue  # đã có trong snapshot
+                yield _sse(event)
+                if event.get('type') in ('done', 'error'):
+                    return
+        finally:
+            _question_events.unsubscribe(questions_file, q)
+
+    return Response(stream_with_context(_stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/api/upload_cv/stream', methods=['POST'])
+def api_upload_cv_stream():
+    """Như /api/upload_cv nhưng trả về SSE: câu hỏi được đẩy xuống ngay khi từng câu sinh xong.
+
+    Việc sinh chạy nền nên vẫn hoàn tất (ghi file + cache) kể cả khi client ngắt kết nối;
+    trang phỏng vấn theo dõi tiếp qua /api/questions_events.
+    """
+    error = _upload_error(request.files, request.form)
+    if error:
+        return jsonify(error[0]), error[1]
+    file = request.files['cv_file']
+    job_title = request.form.get('job_title', '').strip()
+    level = request.form.get('level', '').strip()
+
+    filename = secure_filename(file.filename)
+    unique_filename = f"{uuid.uuid4()}_{filename}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    file.save(file_path)
+    jd_path = _save_jd_upload()
+
+    questions_file = f"{Path(unique_filename).stem}.questions.json"
+    _start_question_stream(questions_file, file_path, job_title, level, jd_path, _form_flag('force_regenerate'))
+    return _question_stream_response(questions_file)
+
+@app.route('/api/questions_events')
+def api_questions_events():
+    questions_file = request.args.get('questions_file', '').strip()
+    if not questions_file:
+        return jsonify({'error': 'missing questions_file'}), 400
+    return _question_stream_response(os.path.basename(questions_file))
 
 @app.route('/api/resolve_questions_file')
 def resolve_questions_file():
@@ -545,38 +1301,11 @@ def resolve_questions_file():
         return jsonify({'error': 'missing hint'}), 400
 
     try:
-        files = list(Path('interview_question').glob('*.questions.json'))
-        if not files:
+        if not len(_get_questions_index()) and not _get_questions_index().refresh_if_changed():
             return jsonify({'error': 'no files'}), 404
-
-        # exact match
-        for f in files:
-            if f.name == hint:
-                return jsonify({'match': f.name})
-
-        # uuid prefix (before first underscore)
-        prefix = hint.split('_')[0]
-        candidates = [f for f in files if f.stem.startswith(prefix)] if prefix else []
-        if candidates:
-            best = max(candidates, key=lambda p: p.stat().st_mtime)
-            return jsonify({'match': best.name})
-
-        # suffix match (after the first underscore) – ignore UUID differences
-        suffix = ''
-        if '_' in hint:
-            suffix = hint.split('_', 1)[1]
-            # ensure we include the dot extension part
-            if suffix:
-                suf_candidates = [f for f in files if f.name.endswith(suffix)]
-                if suf_candidates:
-                    best = max(suf_candidates, key=lambda p: p.stat().st_mtime)
-                    return jsonify({'match': best.name})
-
-        # fallback: contains hint substring
-        for f in files:
-            if hint in f.name:
-                return jsonify({'match': f.name})
-
+        match = _resolve_questions_hint(hint)
+        if match:
+            return jsonify({'match': match})
         return jsonify({'error': 'not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -584,81 +1313,165 @@ def resolve_questions_file():
 @app.route('/api/latest_questions_file')
 def latest_questions_file():
     try:
-        files = list(Path('interview_question').glob('*.questions.json'))
-        if not files:
+        index = _get_questions_index()
+        index.refresh_if_changed()
+        best = index.latest()
+        if not best:
             return jsonify({'error': 'no files'}), 404
-        best = max(files, key=lambda p: p.stat().st_mtime)
-        return jsonify({'match': best.name})
+        return jsonify({'match': best})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+RESULTS_PAGE_DEFAULT = 100
+RESULTS_PAGE_MAX = 500
+_results_index: Optional[ResultsIndex] = None
+_results_index_lock = threading.Lock()
+
+def _get_results_index() -> ResultsIndex:
+    """Chỉ mục outputs/evaluate_results (chế độ file) sắp theo mtime: quét một lần, cập nhật khi job ghi
+    kết quả; file do process khác ghi được nhận qua mtime thư mục (một stat mỗi request)."""
+    global _results_index
+    if _results_index is None:
+        with _results_index_lock:
+            if _results_index is None:
+                _results_index = ResultsIndex(EVAL_RESULTS_DIR)
+    return _results_index
+
+def _encode_results_cursor(created_at: Any, rid: Any) -> str:
+    raw = json.dumps([created_at, rid]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_results_cursor(cursor: Optional[str]):
+    """Cursor của /api/results → (created_at dạng ISO-8601 hoặc None, id); ValueError nếu không hợp lệ.
+
+    created_at được parse lại bằng datetime.fromisoformat rồi mới đưa vào bộ lọc PostgREST,
+    nên cursor do client gửi không thể chèn thêm điều kiện lọc.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, rid = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if isinstance(rid, bool) or not isinstance(rid, (int, str)):
+            raise ValueError('invalid id')
+        rid = int(rid)
+        if created_at is not None:
+            if not isinstance(created_at, str):
+                raise ValueError('invalid created_at')
+            created_at = datetime.fromisoformat(created_at.replace('Z', '+00:00')).isoformat()
+        return created_at, rid
+    except Exception:
+        raise ValueError('invalid cursor')
+
+def _db_results_page(client: "Client", limit: int, cursor):
+    """Một trang evaluate_results (limit + 1 dòng) theo (created_at, id) giảm dần; lỗi thì theo id giảm dần
+    (bảng không có created_at, như _db_ordered_select)."""
+    created_at, rid = cursor if cursor is not None else (None, None)
+    try:
+        query = (
+            client
+            .table('evaluate_results')
+            .select('id,created_at,summary:result->summary')
+            .order('created_at', desc=True)
+            .order('id', desc=True)
+            .limit(limit + 1)
+        )
+        if created_at is not None:
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{rid})')
+        elif rid is not None:
+            query = query.lt('id', rid)
+        return getattr(query.execute(), 'data', []) or []
+    except Exception as e:
+        print('[SUPABASE][results] ordered by created_at failed, falling back to id:', e)
+    query = client.table('evaluate_results').select('id,summary:result->summary').order('id', desc=True).limit(limit + 1)
+    if rid is not None:
+        query = query.lt('id', rid)
+    return getattr(query.execute(), 'data', []) or []
+
 @app.route('/api/results')
 def api_results():
-    """JSON: list evaluation results from Supabase; fallback to files if DB unavailable."""
+    """JSON: list evaluation results from Supabase; fallback to files if DB unavailable.
+
+    Phân trang keyset theo (created_at, id): ?limit=<n>&before=<cursor>, cursor kế tiếp trong header X-Next-Cursor.
+    Chỉ trả về summary (DB: chiếu result->summary phía server).
+    """
+    limit, before = _page_args(RESULTS_PAGE_DEFAULT, RESULTS_PAGE_MAX)
     client = _get_supabase()
     if client:
         try:
-            res = _db_ordered_select(client, 'evaluate_results')
-            data = getattr(res, 'data', []) or []
+            cursor = _decode_results_cursor(before)
+        except ValueError:
+            return jsonify({'error': 'invalid cursor'}), 400
+        try:
+            data = _db_results_page(client, limit, cursor)
+            has_more = len(data) > limit
+            data = data[:limit]
             items = []
             for row in data:
                 rid = row.get('id')
-                result = row.get('result') or {}
-                summary = result.get('summary') if isinstance(result, dict) else None
+                summary = row.get('summary') if isinstance(row.get('summary'), dict) else None
                 items.append({
                     'filename': f"id:{rid}",
                     'modified': row.get('created_at') or row.get('id') or 0,
                     'summary': summary,
                 })
-            return jsonify(items)
-        except Exception:
-            pass
-    # fallback
-    results_dir = Path('outputs/evaluate_results')
-    items = []
-    if results_dir.exists():
-        for f in results_dir.glob('*.json'):
-            try:
-                with open(f, 'r', encoding='utf-8') as fp:
-                    data = json.load(fp)
-                summary = data.get('summary') or {}
-                items.append({
-                    'filename': f.name,
-                    'modified': f.stat().st_mtime,
-                    'summary': summary,
-                })
-            except Exception:
-                items.append({ 'filename': f.name, 'modified': f.stat().st_mtime })
-    items.sort(key=lambda x: x.get('modified', 0), reverse=True)
-    return jsonify(items)
+            next_cursor = _encode_results_cursor(data[-1].get('created_at'), data[-1].get('id')) if has_more and data else None
+            return _paged_response(items, next_cursor)
+        except Exception as e:
+            print('[SUPABASE][results] error:', e)
+    store = _get_local_store()
+    if store is not None:
+        items, has_more = store.list_results(limit, before)
+        return _paged_response(items, items[-1]['filename'] if has_more and items else None)
+    # fallback: chỉ mục sắp theo mtime, chỉ parse summary của các file trong trang
+    index = _get_results_index()
+    index.refresh_if_changed()
+    items, has_more = index.page(limit, before)
+    return _paged_response(items, items[-1]['filename'] if has_more and items else None)
+
+def _db_result_response(key: str):
+    """Response cho kết quả trong DB (`id:<id>`) hoặc kết quả write-behind (`local:<id cục bộ>`: đọc từ
+    journal khi chưa lên Supabase); None với key của kho cục bộ / filesystem."""
+    local_id = _parse_local_key(key)
+    if local_id is not None:
+        journal = _get_write_behind()
+        rid = journal.result_id(local_id)
+        if rid is None:
+            result_data = journal.pending_result(local_id)
+            if result_data is None:
+                return jsonify({'error': 'not found'}), 404
+            return jsonify(result_data)
+        key = f"id:{rid}"
+    if not key.startswith('id:'):
+        return None
+    client = _get_supabase()
+    if not client:
+        return jsonify({'error': 'Supabase not configured'}), 500
+    try:
+        rid = int(key.split(':', 1)[1])
+    except Exception:
+        return jsonify({'error': 'invalid id'}), 400
+    try:
+        res = client.table('evaluate_results').select('*').eq('id', rid).single().execute()
+        row = getattr(res, 'data', None)
+        if not row:
+            return jsonify({'error': 'not found'}), 404
+        result_data = row.get('result') or {}
+        return jsonify(result_data)
+    except Exception as e:
+        return jsonify({'error': 'db error', 'detail': str(e)}), 500
 
 @app.route('/api/view_result/<filename>')
 def api_view_result(filename):
     try:
-        # DB id-based access
-        if filename.startswith('id:'):
-            client = _get_supabase()
-            if not client:
-                return jsonify({'error': 'Supabase not configured'}), 500
-            try:
-                rid = int(filename.split(':', 1)[1])
-            except Exception:
-                return jsonify({'error': 'invalid id'}), 400
-            try:
-                res = client.table('evaluate_results').select('*').eq('id', rid).single().execute()
-                row = getattr(res, 'data', None)
-                if not row:
-                    return jsonify({'error': 'not found'}), 404
-                result_data = row.get('result') or {}
-                return jsonify(result_data)
-            except Exception as e:
-                return jsonify({'error': 'db error', 'detail': str(e)}), 500
-        # Filesystem fallback
-        filepath = Path('outputs/evaluate_results') / filename
-        if not filepath.exists():
+        # DB id-based access (và kết quả write-behind)
+        db_response = _db_result_response(filename)
+        if db_response is not None:
+            return db_response
+        # Kho cục bộ / filesystem fallback
+        result_data = _read_local_result(filename)
+        if result_data is None:
             return jsonify({'error': 'File không tồn tại'}), 404
-        with open(filepath, 'r', encoding='utf-8') as f:
-            result_data = json.load(f)
         return jsonify(result_data)
     except json.JSONDecodeError:
         return jsonify({'error': 'Invalid JSON in DB'}), 500
@@ -669,62 +1482,131 @@ def api_view_result_qs():
     hint = request.args.get('hint', '')
     if not hint:
         return jsonify({'error': 'missing hint'}), 400
-    if hint.startswith('id:'):
-        client = _get_supabase()
-        if not client:
-            return jsonify({'error': 'Supabase not configured'}), 500
-        try:
-            rid = int(hint.split(':', 1)[1])
-        except Exception:
-            return jsonify({'error': 'invalid id'}), 400
-        try:
-            res = client.table('evaluate_results').select('*').eq('id', rid).single().execute()
-            row = getattr(res, 'data', None)
-            if not row:
-                return jsonify({'error': 'not found'}), 404
-            result_data = row.get('result') or {}
-            return jsonify(result_data)
-        except Exception as e:
-            return jsonify({'error': 'db error', 'detail': str(e)}), 500
-    # filesystem
-    results_dir = Path('outputs/evaluate_results')
-    target = results_dir / hint
-    if not target.exists():
-        return jsonify({'error': 'File không tồn tại'}), 404
+    db_response = _db_result_response(hint)
+    if db_response is not None:
+        return db_response
+    # kho cục bộ / filesystem
     try:
-        with open(target, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = _read_local_result(hint)
+        if data is None:
+            return jsonify({'error': 'File không tồn tại'}), 404
         return jsonify(data)
     except json.JSONDecodeError:
         return jsonify({'error': 'File không hợp lệ'}), 400
 
+HISTORY_PAGE_DEFAULT = 100
+HISTORY_PAGE_MAX = 500
+
+def _page_args(default_limit: int, max_limit: int):
+    """Đọc ?limit=&before= cho các endpoint phân trang theo cursor."""
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except (TypeError, ValueError):
+        limit = default_limit
+    limit = max(1, min(limit, max_limit))
+    before = (request.args.get('before') or '').strip() or None
+    return limit, before
+
+def _parse_id_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        return int(cursor.split(':', 1)[1] if cursor.startswith('id:') else cursor)
+    except (TypeError, ValueError):
+        return None
+
+def _paged_response(items, next_cursor: Optional[str]):
+    resp = jsonify(items)
+    if next_cursor:
+        resp.headers['X-Next-Cursor'] = next_cursor
+    return resp
+
+# Số kết quả đọc cho mỗi log của trang (log được chấm lại nhiều lần); thiếu thì đọc thêm cho các log còn lại
+HISTORY_EVAL_FANOUT = 3
+# None: chưa biết; False: DB chưa có computed column response_count (sql/response_count.sql)
+_response_count_column: Optional[bool] = None
+
+def _db_latest_evals(client: "Client", log_ids: List[Any]) -> Dict[Any, Dict[str, Any]]:
+    """{interview_log_id: kết quả mới nhất (id, summary)} – truy vấn in_() có giới hạn dòng."""
+    latest: Dict[Any, Dict[str, Any]] = {}
+    remaining = list(log_ids)
+    while remaining:
+        limit = len(remaining) * HISTORY_EVAL_FANOUT
+        res = (
+            client
+            .table('evaluate_results')
+            .select('id,interview_log_id,summary:result->summary')
+            .in_('interview_log_id', remaining)
+            .order('created_at', desc=True)
+            .order('id', desc=True)
+            .limit(limit)
+            .execute()
+        )
+        rows = getattr(res, 'data', None) or []
+        for ev in rows:
+            latest.setdefault(ev.get('interview_log_id'), ev)
+        if len(rows) < limit:
+            break
+        # Trang bị cắt bởi các log có nhiều kết quả: đọc lại cho các log chưa thấy kết quả
+        remaining = [i for i in remaining if i not in latest]
+    return latest
+
+def _db_response_counts(client: "Client", log_ids: List[Any]) -> Dict[Any, int]:
+    """{id: số câu trả lời} – chỉ chiếu computed column response_count; DB chưa có hàm đó thì đọc responses."""
+    global _response_count_column
+    if _response_count_column is not False:
+        try:
+            res = client.table('interview_logs').select('id,response_count').in_('id', log_ids).execute()
+            _response_count_column = True
+            return {row.get('id'): int(row.get('response_count') or 0) for row in getattr(res, 'data', None) or []}
+        except Exception as e:
+            if 'response_count' not in str(e):
+                raise
+            _response_count_column = False
+            print('[SUPABASE][history] response_count chưa có (chạy sql/response_count.sql); đọc cả responses')
+    res = client.table('interview_logs').select('id,responses').in_('id', log_ids).execute()
+    counts: Dict[Any, int] = {}
+    for row in getattr(res, 'data', None) or []:
+        resp = row.get('responses') if isinstance(row.get('responses'), list) else []
+        counts[row.get('id')] = len(resp)
+    return counts
+
 @app.route('/api/history')
 def api_history():
-    """Danh sách các phiên phỏng vấn từ Supabase; fallback filesystem."""
+    """Danh sách các phiên phỏng vấn từ Supabase; fallback filesystem.
+
+    Phân trang theo cursor: ?limit=<n>&before=<log_file của phần tử cuối trang trước>;
+    cursor của trang kế tiếp nằm trong header X-Next-Cursor.
+    """
+    limit, before = _page_args(HISTORY_PAGE_DEFAULT, HISTORY_PAGE_MAX)
     client = _get_supabase()
     if client:
         try:
-            res_logs = _db_ordered_select(client, 'interview_logs')
-            logs = getattr(res_logs, 'data', []) or []
+            # 1) Một trang log (keyset theo id giảm dần), chỉ lấy các cột cần cho danh sách
+            query = (
+                client
+                .table('interview_logs')
+                .select('id,candidate_name,interview_date,created_at')
+                .order('id', desc=True)
+                .limit(limit + 1)
+            )
+            before_id = _parse_id_cursor(before)
+            if before_id is not None:
+                query = query.lt('id', before_id)
+            logs = getattr(query.execute(), 'data', None) or []
+            has_more = len(logs) > limit
+            logs = logs[:limit]
+            log_ids = [lg.get('id') for lg in logs if lg.get('id') is not None]
+
+            # 2) Kết quả chấm mới nhất cho cả trang (in_(), chỉ id/log/summary), 3) số câu trả lời của các phiên chưa chấm
+            latest_eval = _db_latest_evals(client, log_ids)
+            pending_ids = [i for i in log_ids if i not in latest_eval]
+            response_counts = _db_response_counts(client, pending_ids) if pending_ids else {}
+
             items = []
             for lg in logs:
                 log_id = lg.get('id')
-                ev = None
-                try:
-                    res_eval = (
-                        client
-                        .table('evaluate_results')
-                        .select('id,result,created_at')
-                        .eq('interview_log_id', log_id)
-                        .order('created_at', desc=True)
-                        .limit(1)
-                        .execute()
-                    )
-                    data_list = getattr(res_eval, 'data', None) or []
-                    if isinstance(data_list, list) and data_list:
-                        ev = data_list[0]
-                except Exception:
-                    ev = None
+                ev = latest_eval.get(log_id)
                 status = 'done' if ev else 'pending'
                 entry = {
                     'log_file': f"id:{log_id}",
@@ -732,71 +1614,146 @@ def api_history():
                     'status': status,
                     'modified': lg.get('created_at') or lg.get('id') or 0,
                 }
-                if ev and isinstance(ev.get('result'), dict):
-                    entry['summary'] = ev['result'].get('summary')
+                if ev and isinstance(ev.get('summary'), dict):
+                    entry['summary'] = ev['summary']
                 else:
-                    resp = lg.get('responses') if isinstance(lg.get('responses'), list) else []
                     entry['summary'] = {
                         'candidate_name': lg.get('candidate_name'),
                         'interview_date': lg.get('interview_date'),
-                        'questions_scored': len(resp),
+                        'questions_scored': response_counts.get(log_id, 0),
                         'type': 'job'
                     }
                 items.append(entry)
-            return jsonify(items)
-        except Exception:
-            pass
+            next_cursor = f"id:{logs[-1].get('id')}" if has_more and logs else None
+            return _paged_response(_apply_job_states(items), next_cursor)
+        except Exception as e:
+            print('[SUPABASE][history] error:', e)
+    store = _get_local_store()
+    if store is not None:
+        items, has_more = store.list_history(limit, before)
+        return _paged_response(_apply_job_states(items), items[-1]['log_file'] if has_more and items else None)
     # filesystem
     logs_dir = Path('outputs') / 'interview_logs'
     results_dir = Path('outputs') / 'evaluate_results'
-    items = []
+    logs = []
     if logs_dir.exists():
         for log in logs_dir.glob('*.json'):
-            result_name = log.name.replace('.json', '_results.json')
-            result_path = results_dir / result_name
-            status = 'done' if result_path.exists() else 'pending'
-            entry = {
-                'log_file': log.name,
-                'result_file': result_name if result_path.exists() else None,
-                'status': status,
-                'modified': log.stat().st_mtime,
-            }
-            if result_path.exists():
-                try:
-                    with open(result_path, 'r', encoding='utf-8') as fp:
-                        data = json.load(fp)
-                        entry['summary'] = data.get('summary')
-                except Exception:
-                    pass
-            else:
-                try:
-                    with open(log, 'r', encoding='utf-8') as fp:
-                        data = json.load(fp)
-                        entry['summary'] = {
-                            'candidate_name': data.get('candidate_name'),
-                            'interview_date': data.get('interview_date'),
-                            'type': 'job'
-                        }
-                except Exception:
-                    pass
-            items.append(entry)
-    items.sort(key=lambda x: x.get('modified', 0), reverse=True)
-    return jsonify(items)
+            try:
+                logs.append((log.stat().st_mtime, log))
+            except FileNotFoundError:
+                continue
+    logs.sort(key=lambda x: x[0], reverse=True)
+    if before:
+        names = [log.name for _, log in logs]
+        if before in names:
+            logs = logs[names.index(before) + 1:]
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    # Chỉ đọc/parse file của trang hiện tại
+    items = []
+    for mtime, log in logs:
+        result_name = log.name.replace('.json', '_results.json')
+        result_path = results_dir / result_name
+        status = 'done' if result_path.exists() else 'pending'
+        entry = {
+            'log_file': log.name,
+            'result_file': result_name if result_path.exists() else None,
+            'status': status,
+            'modified': mtime,
+        }
+        if result_path.exists():
+            try:
+                with open(result_path, 'r', encoding='utf-8') as fp:
+                    data = json.load(fp)
+                    entry['summary'] = data.get('summary')
+            except Exception:
+                pass
+        else:
+            try:
+                with open(log, 'r', encoding='utf-8') as fp:
+                    data = json.load(fp)
+                    entry['summary'] = {
+                        'candidate_name': data.get('candidate_name'),
+                        'interview_date': data.get('interview_date'),
+                        'type': 'job'
+                    }
+            except Exception:
+                pass
+        items.append(entry)
+    next_cursor = logs[-1][1].name if has_more and logs else None
+    return _paged_response(_apply_job_states(items), next_cursor)
 
-@app.route('/api/result_status')
-def api_result_status():
-    """Kiểm tra xem kết quả cho log_file đã sẵn sàng chưa"""
-    log_file = request.args.get('log')
-    if not log_file:
-        return jsonify({'error': 'missing log'}), 400
+def _apply_job_states(items):
+    """Gắn trạng thái job (queued/running/failed) cho các phiên chưa có kết quả – một truy vấn cho cả trang."""
+    pending = [it['log_file'] for it in items if it.get('status') != 'done']
+    # Bài nộp qua write-behind: job mang key `local:<id cục bộ>`, log trong DB mang `id:<id DB>`
+    aliases: Dict[str, str] = {}
+    db_ids = [int(k.split(':', 1)[1]) for k in pending if k.startswith('id:') and k.split(':', 1)[1].isdigit()]
+    if WRITE_BEHIND and db_ids:
+        try:
+            aliases = {f"id:{db_id}": f"local:{local_id}" for db_id, local_id in _get_write_behind().local_ids_for(db_ids).items()}
+        except Exception:
+            aliases = {}
+    try:
+        jobs = _get_job_queue().states_for(pending + list(aliases.values()))
+    except Exception:
+        jobs = {}
+    for it in items:
+        job = jobs.get(it['log_file']) or jobs.get(aliases.get(it['log_file'], ''))
+        if not job or it.get('status') == 'done':
+            continue
+        it['job_status'] = job['status']
+        if job['status'] == FAILED:
+            it['status'] = 'failed'
+    return items
+
+def _job_result_status(log_file: str):
+    """Trạng thái job trong hàng đợi → (payload, 200); None nếu không có job cho log_file."""
+    try:
+        job = _get_job_queue().get_by_key(log_file)
+    except Exception:
+        job = None
+    if job:
+        job_result = job.get('result') if isinstance(job.get('result'), dict) else {}
+        if job['status'] == DONE and job_result.get('result_file'):
+            return {'ready': True, 'result_file': _resolve_result_ref(job_result['result_file']), 'status': DONE}, 200
+        if job['status'] in (QUEUED, RUNNING):
+            return {'ready': False, 'status': job['status'], 'attempts': job.get('attempts', 0)}, 200
+        if job['status'] == FAILED:
+            return {'ready': False, 'status': FAILED, 'error': job.get('error')}, 200
+    return None
+
+def _db_result_status(rows):
+    """Kết quả truy vấn evaluate_results mới nhất của một interview_log → payload."""
+    if isinstance(rows, list) and rows:
+        rid = rows[0].get('id')
+        if rid is not None:
+            return {'ready': True, 'result_file': f"id:{rid}"}
+    return {'ready': False}
+
+def _fs_result_status(log_file: str):
+    result_name = log_file.replace('.json', '_results.json')
+    if _local_result_exists(result_name):
+        return {'ready': True, 'result_file': result_name}, 200
+    return {'ready': False}, 200
+
+def _result_status(log_file: str):
+    """Trạng thái kết quả cho một log_file → (payload, http_status)."""
+    # Trạng thái job trong hàng đợi: trả lời ngay, không cần truy vấn DB/filesystem
+    job_status = _job_result_status(log_file)
+    if job_status:
+        return job_status
+    log_file = _resolve_log_key(log_file)
+    if log_file.startswith('local:'):
+        return {'ready': False}, 200  # write-behind: log chưa được ghi lên Supabase
     if log_file.startswith('id:'):
         client = _get_supabase()
         if not client:
-            return jsonify({'error': 'Supabase not configured'}), 500
+            return {'error': 'Supabase not configured'}, 500
         try:
             lid = int(log_file.split(':', 1)[1])
         except Exception:
-            return jsonify({'error': 'invalid id'}), 400
+            return {'error': 'invalid id'}, 400
         try:
             res = (
                 client
@@ -807,54 +1764,130 @@ def api_result_status():
                 .limit(1)
                 .execute()
             )
-            lst = getattr(res, 'data', None) or []
-            if isinstance(lst, list) and lst:
-                rid = lst[0].get('id')
-                if rid is not None:
-                    return jsonify({'ready': True, 'result_file': f"id:{rid}"})
-            return jsonify({'ready': False})
+            return _db_result_status(getattr(res, 'data', None) or []), 200
         except Exception:
-            return jsonify({'ready': False})
+            return {'ready': False}, 200
     # Filesystem fallback
-    result_name = log_file.replace('.json', '_results.json')
-    result_path = Path('outputs/evaluate_results') / result_name
-    if result_path.exists():
-        return jsonify({'ready': True, 'result_file': result_name})
-    return jsonify({'ready': False})
+    return _fs_result_status(log_file)
+
+@app.route('/api/result_status')
+def api_result_status():
+    """Kiểm tra xem kết quả cho log_file đã sẵn sàng chưa"""
+    log_file = request.args.get('log')
+    if not log_file:
+        return jsonify({'error': 'missing log'}), 400
+    payload, code = _result_status(log_file)
+    return jsonify(payload), code
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+def _terminal_result_event(status: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Sự kiện kết thúc luồng (`result`/`failed`) ứng với một payload trạng thái, nếu có."""
+    if status.get('ready'):
+        return dict(status, type='result')
+    if status.get('status') == FAILED:
+        return dict(status, type='failed')
+    return None
+
+def _result_events_head(log_file: str, initial: Dict[str, Any]):
+    """Sự kiện mở đầu của /api/result_events → (events, luồng đã kết thúc chưa)."""
+    terminal = _terminal_result_event(initial)
+    if terminal:
+        return [terminal], True
+    events = [dict(initial, type='status')]
+    last = _result_events.last(log_file)
+    if last and last.get('type') == 'progress':
+        events.append(last)
+    return events, False
+
+@app.route('/api/result_events')
+def api_result_events():
+    """Server-Sent Events cho một log_file: worker chấm điểm đẩy tiến độ từng câu và kết quả cuối.
+
+    Sự kiện: `status` (queued/running), `progress` (mỗi câu chấm xong), `result` (ready + result_file),
+    `failed`. Luồng đóng sau `result`/`failed`. Thay cho việc poll /api/result_status.
+    """
+    log_file = request.args.get('log')
+    if not log_file:
+        return jsonify({'error': 'missing log'}), 400
+    # Đăng ký trước khi đọc trạng thái để không lỡ sự kiện xảy ra ở giữa
+    q = _result_events.subscribe(log_file)
+    try:
+        payload, code = _result_status(log_file)
+    except Exception:
+        _result_events.unsubscribe(log_file, q)
+        raise
+    if code != 200:
+        _result_events.unsubscribe(log_file, q)
+        return jsonify(payload), code
+
+    def _stream(initial: Dict[str, Any]):
+        try:
+            head, finished = _result_events_head(log_file, initial)
+            for event in head:
+                yield _sse(event)
+            if finished:
+                return
+            idle = 0.0
+            while True:
+                try:
+                    event = q.get(timeout=RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    idle += RESULT_EVENTS_KEEPALIVE_SECONDS
+                    # Lưới an toàn (VD: job chạy ở process khác): thỉnh thoảng kiểm tra lại trạng thái
+                    if idle >= RESULT_EVENTS_RECHECK_SECONDS:
+                        idle = 0.0
+                        current, _ = _result_status(log_file)
+                        terminal = _terminal_result_event(current)
+                        if terminal:
+                            yield _sse(terminal)
+                            return
+                    continue
+                yield _sse(event)
+                if event.get('type') in ('result', 'failed'):
+                    return
+        finally:
+            _result_events.unsubscribe(log_file, q)
+
+    return Response(stream_with_context(_stream(payload)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
 
 @app.route('/api/resolve_result_file')
 def resolve_result_file():
     hint = request.args.get('hint', '').strip()
     if not hint:
         return jsonify({'error': 'missing hint'}), 400
-    results_dir = Path('outputs/evaluate_results')
-    files = list(results_dir.glob('*.json'))
-    if not files:
+    # Tên kết quả, mới nhất trước (kho cục bộ: theo thời điểm tạo; filesystem: theo mtime)
+    store = _get_local_store()
+    if store is not None:
+        names = store.result_files()
+    else:
+        files = sorted(Path(EVAL_RESULTS_DIR).glob('*.json'), key=lambda p: p.stat().st_mtime, reverse=True)
+        names = [f.name for f in files]
+    if not names:
         return jsonify({'error': 'no files'}), 404
     # exact
-    for f in files:
-        if f.name == hint:
-            return jsonify({'match': f.name})
+    if hint in names:
+        return jsonify({'match': hint})
     # accent-insensitive match
     slug_hint = _slug_name(hint)
-    best = None
-    for f in files:
-        if _slug_name(f.name) == slug_hint:
-            best = f
-            break
-    if best:
-        return jsonify({'match': best.name})
-    # suffix after first underscore
+    for name in names:
+        if _slug_name(name) == slug_hint:
+            return jsonify({'match': name})
+    # suffix after first underscore (mới nhất)
     if '_' in hint:
         suffix = hint.split('_', 1)[1]
-        suf = [f for f in files if f.name.endswith(suffix)]
-        if suf:
-            best = max(suf, key=lambda p: p.stat().st_mtime)
-            return jsonify({'match': best.name})
+        for name in names:
+            if name.endswith(suffix):
+                return jsonify({'match': name})
     # contains / accent-insensitive contains
-    for f in files:
-        if hint in f.name or _slug_name(hint) in _slug_name(f.name):
-            return jsonify({'match': f.name})
+    for name in names:
+        if hint in name or slug_hint in _slug_name(name):
+            return jsonify({'match': name})
     return jsonify({'error': 'not found'}), 404
 
 @app.route('/api/health/db')
@@ -862,14 +1895,98 @@ def health_db():
     """Simple DB health endpoint to help diagnose env/policy issues."""
     client = _get_supabase()
     if not client:
-        return jsonify({'ok': False, 'reason': 'client_none'}), 500
+        return jsonify({'ok': False, 'reason': 'client_none', 'supabase': _supabase_access.stats()}), 500
     try:
         # minimal query
         res = client.table('interview_logs').select('id').limit(1).execute()
         _ = getattr(res, 'data', None)
-        return jsonify({'ok': True})
+        return jsonify({'ok': True, 'supabase': _supabase_access.stats()})
+    except Exception as e:
+        return jsonify({'ok': False, 'reason': 'query_failed', 'detail': str(e), 'supabase': _supabase_access.stats()}), 500
+
+@app.route('/api/health/jobs')
+def health_jobs():
+    """Số job chấm điểm theo trạng thái (queued/running/done/failed)."""
+    try:
+        return jsonify(_get_job_queue().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health/write_behind')
+def health_write_behind():
+    """Journal write-behind: số bài chưa ghi lên Supabase, tuổi bài cũ nhất, số lô đã ghi, lỗi gần nhất."""
+    if not WRITE_BEHIND:
+        return jsonify({'enabled': False})
+    try:
+        return jsonify(dict(_get_write_behind().stats(), enabled=True))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health/local_store')
+def health_local_store():
+    """Kho cục bộ (chế độ không có Supabase): số dòng mỗi bảng và kết quả migrate file JSON."""
+    try:
+        store = _existing_local_store()
+        return jsonify(store.stats() if store is not None else {'enabled': False, 'mode': LOCAL_STORE})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/health/warmup')
+def health_warmup():
+    """Tiến độ warmup (idle/running/done, thời gian và lỗi từng bước) và thời gian import từng SDK nặng."""
+    return jsonify(warmup_status())
+
+@app.route('/api/health/gemini')
+def health_gemini():
+    """Gemini gateway metrics: hạn mức RPM/TPM còn lại, độ sâu hàng đợi và thời gian chờ theo làn."""
+    return jsonify(gemini_gateway.metrics())
+
+@app.route('/api/health/caches')
+def health_caches():
+    """Thống kê các cache cục bộ (số entry, dung lượng, hit/miss)."""
+    out = {}
+    for name, getter in (('cv_text', get_cv_text_cache), ('questions', get_question_cache), ('scores', get_score_cache),
+                         ('question_bank', get_question_bank)):
+        try:
+            cache = getter()
+            out[name] = cache.stats() if cache is not None else {'enabled': False}
+        except Exception as e:
+            out[name] = {'error': str(e)}
+    return jsonify(out)
+
+@app.route('/api/similar_questions')
+def api_similar_questions():
+    """Câu hỏi đã sinh trước đây gần nghĩa nhất với `q` (vector index)."""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'missing q'}), 400
+    index = get_vector_index()
+    if index is None:
+        return jsonify({'error': 'vector index unavailable'}), 503
+    k = max(1, min(request.args.get('k', 10, type=int) or 10, 50))
+    return jsonify({'items': index.similar_questions(q, k=k)})
+
+@app.route('/api/similar_candidates')
+def api_similar_candidates():
+    """Bài phỏng vấn có câu trả lời gần nhất với `q` (kỹ năng, đoạn CV, câu trả lời mẫu...)."""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({'error': 'missing q'}), 400
+    index = get_vector_index()
+    if index is None:
+        return jsonify({'error': 'vector index unavailable'}), 503
+    k = max(1, min(request.args.get('k', 10, type=int) or 10, 50))
+    return jsonify({'items': index.similar_candidates(q, k=k)})
+
+@app.route('/api/health/vector_index')
+def health_vector_index():
+    index = get_vector_index()
+    if index is None:
+        return jsonify({'available': False})
+    try:
+        return jsonify(index.stats())
     except Exception as e:
-        return jsonify({'ok': False, 'reason': 'query_failed', 'detail': str(e)}), 500
+        return jsonify({'available': True, 'error': str(e)}), 500
 
 @app.route('/api/health/env')
 def health_env():
@@ -889,4 +2006,7 @@ def health_env():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    # debug=True chạy thêm process reloader: chỉ warm trong process con thực sự phục vụ request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_process(background=True)
     app.run(debug=True, host='0.0.0.0', port=5000)
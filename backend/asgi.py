@@ -0,0 +1,300 @@
+"""
+Chế độ phục vụ ASGI (async) cho backend.
+
+Các endpoint I/O-bound chạy native async trên event loop, không giữ một thread cho mỗi request
+trong lúc chờ Gemini/Supabase hoặc trong lúc giữ kết nối SSE:
+- POST /api/upload_cv        Gemini async; trích xuất text/ghi file chạy trong thread pool
+- GET  /api/result_status    Supabase AsyncClient
+- GET  /api/result_events    SSE
+- POST /api/upload_cv/stream, GET /api/questions_events  SSE (sinh câu hỏi vẫn chạy trên pool nền)
+- GET  /api/generation_events  SSE của job sinh câu hỏi (POST /api/upload_cv/async đi qua Flask)
+Mọi route khác được chuyển cho app Flask hiện có (WSGI, pool ASGI_WSGI_WORKERS thread), nên hành vi
+và response giữ nguyên; `python app.py` vẫn là chế độ threaded như cũ.
+
+Chạy từ thư mục backend:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import os
+import queue
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, TYPE_CHECKING
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart, Response, jsonify, request
+from werkzeug.utils import secure_filename
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient  # type: ignore
+
+import app as backend  # app Flask + helper dùng chung (thư mục, env, warm cache...)
+from interview.generate_questions import process_file_async, read_env
+
+ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', '16'))
+
+async_app = Quart(__name__, static_folder=None)
+async_app.config['MAX_CONTENT_LENGTH'] = backend.app.config['MAX_CONTENT_LENGTH']
+async_app.config['RESPONSE_TIMEOUT'] = None  # luồng SSE mở lâu hơn timeout mặc định (60s)
+
+# -------------------- Supabase (async) --------------------
+async def _get_async_supabase() -> Optional["AsyncClient"]:
+    # Cùng circuit breaker / cache lỗi cấu hình với client sync của app Flask
+    return await backend._supabase_access.async_client()
+
+@async_app.before_serving
+async def _startup() -> None:
+    # Giống before_request của app Flask: xử lý tiếp job dang dở, bật sync vector index
+    await asyncio.to_thread(backend._ensure_job_queue)
+    # Warm nền (bỏ qua nếu init_worker() của gunicorn đã warm process này)
+    backend.warm_process(background=True, question_bank=backend._is_leader('question_bank_warm'))
+
+# -------------------- Upload CV --------------------
+async def _save_jd_upload(files) -> Optional[str]:
+    jd = files.get('jd_file')
+    if not (jd and jd.filename):
+        return None
+    jd_path = os.path.join(backend.UPLOAD_FOLDER, f"{uuid.uuid4()}_{secure_filename(jd.filename)}")
+    await jd.save(jd_path)
+    return jd_path
+
+async def _read_jd_upload(files) -> Optional[str]:
+    jd_path = await _save_jd_upload(files)
+    return await asyncio.to_thread(backend._read_jd_file, jd_path) if jd_path else None
+
+@async_app.post('/api/upload_cv')
+async def api_upload_cv():
+    """Như /api/upload_cv của app Flask; request chờ Gemini mà không chiếm thread."""
+    files = await request.files
+    form = await request.form
+    error = backend._upload_error(files, form)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    file = files['cv_file']
+    unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
+    file_path = os.path.join(backend.UPLOAD_FOLDER, unique_filename)
+    await file.save(file_path)
+    job_title = form.get('job_title', '').strip()
+    level = form.get('level', '').strip()
+
+    try:
+        read_env()
+        output_dir = Path('interview_question')
+        output_dir.mkdir(exist_ok=True)
+        jd_text = await _read_jd_upload(files)
+        await process_file_async(Path(file_path), job_title, level, output_dir, jd_text=jd_text,
+                                 force_regenerate=backend._form_flag('force_regenerate', form))
+        payload, code = await asyncio.to_thread(backend._upload_result, unique_filename, job_title, level)
+        return jsonify(payload), code
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# -------------------- Trạng thái kết quả --------------------
+async def _result_status(log_file: str):
+    """Bản async của app._result_status (Supabase AsyncClient thay cho client đồng bộ)."""
+    job_status = await asyncio.to_thread(backend._job_result_status, log_file)
+    if job_status:
+        return job_status
+    log_file = await asyncio.to_thread(backend._resolve_log_key, log_file)
+    if log_file.startswith('local:'):
+        return {'ready': False}, 200
+    if log_file.startswith('id:'):
+        client = await _get_async_supabase()
+        if not client:
+            return {'error': 'Supabase not configured'}, 500
+        try:
+            lid = int(log_file.split(':', 1)[1])
+        except Exception:
+            return {'error': 'invalid id'}, 400
+        try:
+            res = await (
+                client
+                .table('evaluate_results')
+                .select('id,created_at')
+                .eq('interview_log_id', lid)
+                .order('created_at', desc=True)
+                .limit(1)
+                .execute()
+            )
+            return backend._db_result_status(getattr(res, 'data', None) or []), 200
+        except Exception:
+            return {'ready': False}, 200
+    return await asyncio.to_thread(backend._fs_result_status, log_file)
+
+@async_app.get('/api/result_status')
+async def api_result_status():
+    log_file = request.args.get('log')
+    if not log_file:
+        return jsonify({'error': 'missing log'}), 400
+    payload, code = await _result_status(log_file)
+    return jsonify(payload), code
+
+# -------------------- SSE --------------------
+def _sse_response(events: AsyncIterator[str]) -> Response:
+    async def _body():
+        async for chunk in events:
+            yield chunk.encode('utf-8')
+
+    response = Response(_body(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    response.timeout = None
+    return response
+
+@async_app.get('/api/result_events')
+async def api_result_events():
+    log_file = request.args.get('log')
+    if not log_file:
+        return jsonify({'error': 'missing log'}), 400
+    # Đăng ký trước khi đọc trạng thái để không lỡ sự kiện xảy ra ở giữa
+    sub = backend._result_events.subscribe_async(log_file)
+    try:
+        payload, code = await _result_status(log_file)
+    except Exception:
+        backend._result_events.unsubscribe(log_file, sub)
+        raise
+    if code != 200:
+        backend._result_events.unsubscribe(log_file, sub)
+        return jsonify(payload), code
+
+    async def _stream():
+        try:
+            head, finished = backend._result_events_head(log_file, payload)
+            for event in head:
+                yield backend._sse(event)
+            if finished:
+                return
+            idle = 0.0
+            while True:
+                try:
+                    event = await sub.get(backend.RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    idle += backend.RESULT_EVENTS_KEEPALIVE_SECONDS
+                    if idle >= backend.RESULT_EVENTS_RECHECK_SECONDS:
+                        idle = 0.0
+                        current, _ = await _result_status(log_file)
+                        terminal = backend._terminal_result_event(current)
+                        if terminal:
+                            yield backend._sse(terminal)
+                            return
+                    continue
+                yield backend._sse(event)
+                if event.get('type') in ('result', 'failed'):
+                    return
+        finally:
+            backend._result_events.unsubscribe(log_file, sub)
+
+    return _sse_response(_stream())
+
+@async_app.post('/api/upload_cv/stream')
+async def api_upload_cv_stream():
+    """Như /api/upload_cv/stream của app Flask: sinh câu hỏi vẫn chạy trên pool nền, còn luồng
+    SSE trả về client được phục vụ bởi event loop."""
+    files = await request.files
+    form = await request.form
+    error = backend._upload_error(files, form)
+    if error:
+        return jsonify(error[0]), error[1]
+    file = files['cv_file']
+    unique_filename = f"{uuid.uuid4()}_{secure_filename(file.filename)}"
+    file_path = os.path.join(backend.UPLOAD_FOLDER, unique_filename)
+    await file.save(file_path)
+    jd_path = await _save_jd_upload(files)
+
+    questions_file = f"{Path(unique_filename).stem}.questions.json"
+    backend._start_question_stream(questions_file, file_path, form.get('job_title', '').strip(),
+                                   form.get('level', '').strip(), jd_path, backend._form_flag('force_regenerate', form))
+    return await _question_stream_response(questions_file)
+
+@async_app.get('/api/questions_events')
+async def api_questions_events():
+    questions_file = os.path.basename(request.args.get('questions_file', '').strip())
+    if not questions_file:
+        return jsonify({'error': 'missing questions_file'}), 400
+    return await _question_stream_response(questions_file)
+
+async def _question_stream_response(questions_file: str):
+    sub = backend._question_events.subscribe_async(questions_file)
+    snapshot = await asyncio.to_thread(backend._question_stream_snapshot, questions_file)
+    if snapshot is None:
+        backend._question_events.unsubscribe(questions_file, sub)
+        return jsonify({'error': 'not found'}), 404
+
+    async def _stream():
+        try:
+            seen = len(snapshot['questions'])
+            head, finished = backend._question_stream_head(questions_file, snapshot)
+            for event in head:
+                yield backend._sse(event)
+            if finished:
+                return
+            while True:
+                try:
+                    event = await sub.get(backend.RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if event.get('type') == 'question' and event.get('index', 0) < seen:
+                    continue  # đã có trong snapshot
+                yield backend._sse(event)
+                if event.get('type') in ('done', 'error'):
+                    return
+        finally:
+            backend._question_events.unsubscribe(questions_file, sub)
+
+    return _sse_response(_stream())
+
+@async_app.get('/api/generation_events')
+async def api_generation_events():
+    job_id = request.args.get('job_id', '').strip()
+    if not job_id:
+        return jsonify({'error': 'missing job_id'}), 400
+    sub = backend._generation_events.subscribe_async(job_id)
+    payload, code = await asyncio.to_thread(backend._generation_status, job_id)
+    if code != 200:
+        backend._generation_events.unsubscribe(job_id, sub)
+        return jsonify(payload), code
+
+    async def _stream():
+        try:
+            event = backend._generation_event(payload)
+            yield backend._sse(event)
+            if event['type'] != 'status':
+                return
+            idle = 0.0
+            while True:
+                try:
+                    event = await sub.get(backend.RESULT_EVENTS_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    idle += backend.RESULT_EVENTS_KEEPALIVE_SECONDS
+                    if idle >= backend.RESULT_EVENTS_RECHECK_SECONDS:
+                        idle = 0.0
+                        current, _ = await asyncio.to_thread(backend._generation_status, job_id)
+                        current = backend._generation_event(current)
+                        if current['type'] != 'status':
+                            yield backend._sse(current)
+                            return
+                    continue
+                yield backend._sse(event)
+                if event.get('type') in ('done', 'failed'):
+                    return
+        finally:
+            backend._generation_events.unsubscribe(job_id, sub)
+
+    return _sse_response(_stream())
+
+# -------------------- ASGI entrypoint --------------------
+_flask_app = WSGIMiddleware(backend.app, workers=ASGI_WSGI_WORKERS)
+
+ASYNC_PATHS = frozenset(rule.rule for rule in async_app.url_map.iter_rules())
+
+async def app(scope: Dict[str, Any], receive, send) -> None:
+    """Route native async → Quart; mọi route còn lại → app Flask."""
+    if scope['type'] == 'lifespan' or scope.get('path') in ASYNC_PATHS:
+        await async_app(scope, receive, send)
+    else:
+        await _flask_app(scope, receive, send)
@@ -0,0 +1,181 @@
+"""
+A/B chế độ chấm điểm của evaluate.py: per_question (mỗi câu một request) vs batch (một request cho cả bài).
+
+Với mỗi interview log, chạy cả hai chế độ rồi so sánh:
+- số request và số token input ước lượng (gemini_gateway.estimate_tokens) của mỗi chế độ
+- mức đồng thuận điểm: MAE / tương quan Pearson của overall_score từng câu, tỉ lệ lệch <= 10 điểm,
+  MAE từng tiêu chí rubric, chênh lệch overall_score tổng thể và tỉ lệ trùng hiring_recommendation
+
+Mặc định gọi Gemini thật (cần GEMINI_API_KEY). `--stub` dùng model giả lập có điểm xác định
+theo nội dung câu trả lời (đo số request/token, kiểm tra đường fallback với `--stub-invalid`).
+
+Chạy từ thư mục backend:
+    python benchmarks/ab_eval_modes.py outputs/interview_logs/*.json
+    python benchmarks/ab_eval_modes.py --stub --questions 9 --stub-invalid 1
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+def _stub_score(answer):
+    digest = hashlib.sha256(answer.encode("utf-8")).digest()
+    fields = {name: 3 + digest[i] % 8 for i, name in enumerate(
+        ("correctness", "coverage", "reasoning", "creativity", "communication", "attitude"))}
+    fields["overall_score"] = round(sum(fields.values()) / 60 * 100)
+    fields["feedback"] = "stub"
+    return fields
+
+
+class StubModel:
+    """Giả lập GenerativeModel cho cả prompt một câu, prompt tổng thể và prompt batch."""
+
+    def __init__(self, invalid=0):
+        self.invalid = invalid
+
+    def generate_content(self, prompt, **kwargs):
+        prompt = str(prompt)
+        if '"questions"' in prompt:
+            blocks = re.findall(r"\[id=([^\]]+)\]\nCâu hỏi: .*?\nTrả lời: (.*?)\n", prompt, flags=re.DOTALL)
+            questions = [dict(_stub_score(answer), id=key) for key, answer in blocks]
+            for entry in questions[:self.invalid]:
+                entry["correctness"] = "cao"  # sai schema → phải chấm lại riêng
+            payload = {"questions": questions, "overall_feedback": {
+                "overall_score": 70, "strengths": "stub", "weaknesses": "stub",
+                "hiring_recommendation": "Có tiềm năng, cân nhắc cho vòng sau"}}
+        elif "HR Manager" in prompt:
+            payload = {"overall_score": 70, "strengths": "stub", "weaknesses": "stub",
+                       "hiring_recommendation": "Có tiềm năng, cân nhắc cho vòng sau"}
+        else:
+            answer = re.search(r"Câu trả lời của ứng viên: (.*)\n", prompt).group(1)
+            payload = _stub_score(answer)
+        return _StubResponse(json.dumps(payload, ensure_ascii=False))
+
+
+class CountingModel:
+    """Bọc model thật/giả lập để đếm request và token input ước lượng."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.requests = 0
+        self.input_tokens = 0
+
+    def generate_content(self, prompt, **kwargs):
+        from interview import gemini_gateway
+        self.requests += 1
+        self.input_tokens += gemini_gateway.estimate_tokens(prompt)
+        return self.inner.generate_content(prompt, **kwargs)
+
+
+def _fake_interview(n):
+    return {
+        "candidate_name": "ab",
+        "interview_date": "2025-01-01 00:00:00",
+        "responses": [
+            {"id": i, "question": f"Câu hỏi số {i}?", "response": f"Câu trả lời số {i} với ví dụ {i * 7}."}
+            for i in range(1, n + 1)
+        ],
+    }
+
+
+def _pearson(xs, ys):
+    n = len(xs)
+    if n < 2:
+        return None
+    mx, my = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mx) * (y - my) for x, y in zip(xs, ys))
+    vx = sum((x - mx) ** 2 for x in xs)
+    vy = sum((y - my) ** 2 for y in ys)
+    return cov / (vx * vy) ** 0.5 if vx and vy else None
+
+
+def _run(evaluate, data, mode, inner):
+    counter = CountingModel(inner)
+    evaluate.model = counter
+    start = time.perf_counter()
+    result = evaluate._evaluate_interview_log(data, mode=mode)
+    return result, counter, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A/B per_question vs batch scoring in evaluate.py")
+    parser.add_argument("logs", nargs="*", help="File interview log (định dạng responses)")
+    parser.add_argument("--stub", action="store_true", help="Dùng model giả lập thay vì Gemini")
+    parser.add_argument("--questions", type=int, default=9, help="Số câu của bài giả lập khi không truyền log")
+    parser.add_argument("--stub-invalid", type=int, default=0, help="Số câu sai schema trong phản hồi batch giả lập")
+    args = parser.parse_args()
+
+    # So sánh trên lời gọi model thật sự, không dùng kết quả cache từ lần chạy trước
+    os.environ["SCORE_CACHE_MAX_MB"] = "0"
+    from interview import evaluate  # import sau khi đặt SCORE_CACHE_MAX_MB
+    inner = StubModel(args.stub_invalid) if args.stub else evaluate.get_model()
+
+    paths = [p for pattern in args.logs for p in glob.glob(pattern)]
+    datasets = [(p, json.load(open(p, encoding="utf-8"))) for p in paths] or [("<giả lập>", _fake_interview(args.questions))]
+
+    totals = {m: {"requests": 0, "input_tokens": 0, "seconds": 0.0} for m in (evaluate.EVAL_MODE_PER_QUESTION, evaluate.EVAL_MODE_BATCH)}
+    diffs, xs, ys, field_diffs = [], [], [], {f: [] for f in evaluate.RUBRIC_FIELDS}
+    overall_diffs, rec_matches = [], []
+    for name, data in datasets:
+        if not isinstance(data, dict) or not data.get("responses"):
+            print(f"Bỏ qua {name}: không phải interview log")
+            continue
+        runs = {}
+        for mode in totals:
+            result, counter, seconds = _run(evaluate, data, mode, inner)
+            runs[mode] = result
+            totals[mode]["requests"] += counter.requests
+            totals[mode]["input_tokens"] += counter.input_tokens
+            totals[mode]["seconds"] += seconds
+        a = runs[evaluate.EVAL_MODE_PER_QUESTION]
+        b = runs[evaluate.EVAL_MODE_BATCH]
+        for key, ra in a["details"].items():
+            rb = b["details"].get(key)
+            if not rb:
+                continue
+            xs.append(ra["overall_score"])
+            ys.append(rb["overall_score"])
+            diffs.append(abs(ra["overall_score"] - rb["overall_score"]))
+            for field in evaluate.RUBRIC_FIELDS:
+                if isinstance(ra.get(field), (int, float)) and isinstance(rb.get(field), (int, float)):
+                    field_diffs[field].append(abs(ra[field] - rb[field]))
+        fa = a["summary"].get("overall_feedback") or {}
+        fb = b["summary"].get("overall_feedback") or {}
+        if isinstance(fa.get("overall_score"), (int, float)) and isinstance(fb.get("overall_score"), (int, float)):
+            overall_diffs.append(abs(fa["overall_score"] - fb["overall_score"]))
+        rec_matches.append(fa.get("hiring_recommendation") == fb.get("hiring_recommendation"))
+        print(f"✔ {name}: {len(a['details'])} / {len(b['details'])} câu được chấm (per_question / batch)")
+
+    print("\n=== A/B evaluate: per_question vs batch ===")
+    for mode, t in totals.items():
+        print(f"{mode:<13}: {t['requests']} request, ~{t['input_tokens']} token input, {t['seconds']:.2f}s")
+    pq, bt = totals[evaluate.EVAL_MODE_PER_QUESTION], totals[evaluate.EVAL_MODE_BATCH]
+    if bt["requests"] and bt["input_tokens"]:
+        print(f"Giảm      : request x{pq['requests'] / bt['requests']:.1f}, token input x{pq['input_tokens'] / bt['input_tokens']:.1f}")
+    if diffs:
+        r = _pearson(xs, ys)
+        print(f"overall_score từng câu: MAE {sum(diffs) / len(diffs):.1f}, "
+              f"Pearson {('%.3f' % r) if r is not None else 'n/a'}, "
+              f"lệch <= 10 điểm: {sum(d <= 10 for d in diffs) / len(diffs):.0%} ({len(diffs)} cặp)")
+        print("MAE theo tiêu chí: " + ", ".join(
+            f"{f} {sum(v) / len(v):.2f}" for f, v in field_diffs.items() if v))
+    if overall_diffs:
+        print(f"Đánh giá tổng thể: MAE overall_score {sum(overall_diffs) / len(overall_diffs):.1f}")
+    if rec_matches:
+        print(f"Trùng hiring_recommendation: {sum(rec_matches) / len(rec_matches):.0%}")
+
+
+if __name__ == "__main__":
+    main()
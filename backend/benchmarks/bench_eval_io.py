@@ -0,0 +1,85 @@
+"""
+Benchmark chi phí I/O của một lượt chấm: chuỗi file cũ vs API trong bộ nhớ (evaluate_to_sink).
+
+- file: ghi bài ra file tạm (mkdtemp) → evaluate.main đọc lại → ghi <name>_results.json →
+  đọc lại kết quả để lưu DB → xoá file và thư mục tạm (luồng /submit_interview trước đây)
+- memory: evaluate_to_sink(dict) với sink giả lập DB (không đọc/ghi file)
+
+Model giả lập trả về ngay (độ trễ `--latency`, mặc định 0), cache điểm tắt, nên chênh lệch chỉ
+là phần serialize/parse/ghi đĩa. `--dir` để đo trên một filesystem cụ thể (VD: overlay của container).
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_eval_io.py --submissions 200 --questions 9
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Đo I/O, không đo hạn mức: bỏ giới hạn RPM/TPM của gateway cho model giả lập
+os.environ.setdefault('GEMINI_RPM', '1000000')
+os.environ.setdefault('GEMINI_TPM', '1000000000')
+from bench_evaluate import StubModel, _fake_interview, evaluate  # noqa: E402
+
+
+def _file_chain(data, name, work_dir):
+    tmp_dir = tempfile.mkdtemp(prefix='iview_', dir=work_dir)
+    path = os.path.join(tmp_dir, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    with open(path, 'r', encoding='utf-8') as f:
+        loaded = json.load(f)
+    result = evaluate.evaluate(loaded, max_workers=1)
+    sink = evaluate.FileResultSink(os.path.join(work_dir, 'evaluate_results'))
+    sink.write(name, result)
+    with open(sink.path_for(name), 'r', encoding='utf-8') as f:
+        stored = json.load(f)
+    os.remove(sink.path_for(name))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    return stored
+
+
+def _memory(data, name):
+    sink = evaluate.CallbackResultSink(lambda _name, _result: 'id:1', label='stub-db')
+    result, _ = evaluate.evaluate_to_sink(data, name, sink, max_workers=1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='File round trip vs in-memory evaluation API')
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=9)
+    parser.add_argument('--latency', type=float, default=0.0, help='Độ trễ giả lập mỗi lời gọi model (giây)')
+    parser.add_argument('--dir', default=None, help='Thư mục làm việc cho chế độ file (mặc định: thư mục tạm)')
+    args = parser.parse_args()
+
+    evaluate.model = StubModel(args.latency)
+    data = _fake_interview(args.questions)
+    work_dir = tempfile.mkdtemp(prefix='bench_eval_io_', dir=args.dir)
+    try:
+        timings = {}
+        for label, run in (('file', lambda i: _file_chain(data, f'responses_bench_{i}.json', work_dir)),
+                           ('memory', lambda i: _memory(data, f'responses_bench_{i}.json'))):
+            start = time.perf_counter()
+            for i in range(args.submissions):
+                result = run(i)
+            timings[label] = time.perf_counter() - start
+            assert result['summary']['questions_scored'] == args.questions
+        leftovers = [n for n in os.listdir(work_dir) if n.startswith('iview_')]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print('\n=== BENCHMARK I/O chấm điểm ===')
+    print(f'Số bài: {args.submissions} | số câu/bài: {args.questions} | độ trễ model: {args.latency}s')
+    for label, seconds in timings.items():
+        print(f'{label:<7}: {seconds:.2f}s ({seconds / args.submissions * 1000:.2f} ms/bài)')
+    saved = (timings['file'] - timings['memory']) / args.submissions * 1000
+    print(f'Tiết kiệm: {saved:.2f} ms/bài | thư mục iview_* còn sót: {len(leftovers)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark chấm điểm tuần tự vs song song cho evaluate.py với model giả lập (stub).
+
+Không gọi Gemini thật: model.generate_content được thay bằng stub ngủ `--latency` giây
+rồi trả về JSON hợp lệ, nên kết quả đo chỉ phản ánh số round trip nối tiếp.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_evaluate.py --questions 9 --latency 0.5 --workers 6
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+# Tắt cache điểm để mỗi lần chạy đều thực sự gọi (stub) model
+os.environ["SCORE_CACHE_MAX_MB"] = "0"
+
+from interview import evaluate  # noqa: E402
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Giả lập GenerativeModel: mỗi lời gọi mất `latency` giây."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if "HR Manager" in str(prompt):
+            payload = {
+                "overall_score": 70,
+                "strengths": "stub",
+                "weaknesses": "stub",
+                "hiring_recommendation": "Có tiềm năng, cân nhắc cho vòng sau",
+            }
+        else:
+            payload = {
+                "correctness": 7, "coverage": 7, "reasoning": 7, "creativity": 7,
+                "communication": 7, "attitude": 7, "overall_score": 70, "feedback": "stub",
+            }
+        return _StubResponse(json.dumps(payload, ensure_ascii=False))
+
+
+def _fake_interview(n):
+    return {
+        "candidate_name": "bench",
+        "id": "bench",
+        "interview_date": "2025-01-01 00:00:00",
+        "responses": [
+            {"id": i, "question": f"Câu hỏi số {i}?", "response": f"Câu trả lời số {i}."}
+            for i in range(1, n + 1)
+        ],
+    }
+
+
+def _run(data, workers):
+    stub = StubModel(ARGS.latency)
+    evaluate.model = stub
+    start = time.perf_counter()
+    result = evaluate._evaluate_interview_log(data, max_workers=workers)
+    elapsed = time.perf_counter() - start
+    return elapsed, stub.calls, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark evaluate.py sequential vs concurrent scoring")
+    parser.add_argument("--questions", type=int, default=9)
+    parser.add_argument("--latency", type=float, default=0.5, help="Độ trễ giả lập cho mỗi lời gọi model (giây)")
+    parser.add_argument("--workers", type=int, default=evaluate.EVAL_MAX_WORKERS)
+    ARGS = parser.parse_args()
+
+    data = _fake_interview(ARGS.questions)
+    seq_time, seq_calls, seq_result = _run(data, 1)
+    par_time, par_calls, par_result = _run(data, ARGS.workers)
+
+    assert list(seq_result["details"]) == list(par_result["details"]), "thứ tự câu hỏi không khớp"
+    assert seq_result["summary"] == par_result["summary"], "summary không khớp"
+
+    print("\n=== BENCHMARK evaluate ===")
+    print(f"Số câu hỏi: {ARGS.questions} | độ trễ model: {ARGS.latency}s")
+    print(f"Tuần tự   : {seq_time:.2f}s ({seq_calls} lời gọi)")
+    print(f"Song song : {par_time:.2f}s ({par_calls} lời gọi, workers={ARGS.workers})")
+    print(f"Tăng tốc  : x{seq_time / par_time:.1f}")
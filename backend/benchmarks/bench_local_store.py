@@ -0,0 +1,109 @@
+"""
+Benchmark chế độ không có Supabase: thư mục JSON (LOCAL_STORE=files) vs kho SQLite (LOCAL_STORE=sqlite).
+
+Sinh `--history` interview log (một nửa đã có kết quả) dưới dạng file JSON trong thư mục tạm, đo thời
+gian migrate một lần vào SQLite, rồi đo độ trễ p50/p95 của /api/history, /api/results (trang đầu và
+trang giữa) và /api/result_status ở hai chế độ. Không cần Supabase/Gemini.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_local_store.py --history 5000 --requests 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ['SUPABASE_URL'] = ''  # chế độ file
+
+
+def _make_files(n, questions):
+    os.makedirs(os.path.join('outputs', 'interview_logs'), exist_ok=True)
+    os.makedirs(os.path.join('outputs', 'evaluate_results'), exist_ok=True)
+    responses = [{'id': q, 'question': f'Câu hỏi số {q}?', 'response': 'Câu trả lời ' * 40} for q in range(1, questions + 1)]
+    names = []
+    for i in range(n):
+        name = f'responses_candidate{i}_20250101_{i:06d}.json'
+        log = {'candidate_name': f'Candidate {i}', 'id': f'c{i}', 'interview_date': '2025-01-01 00:00:00',
+               'responses': responses}
+        path = os.path.join('outputs', 'interview_logs', name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(log, f, ensure_ascii=False, indent=4)
+        os.utime(path, (1_700_000_000 + i, 1_700_000_000 + i))
+        if i % 2 == 0:
+            result = {'summary': {'candidate_name': f'Candidate {i}', 'overall_score': 70},
+                      'details': {str(r['id']): dict(r, answer=r['response'], overall_score=70) for r in responses}}
+            rpath = os.path.join('outputs', 'evaluate_results', name.replace('.json', '_results.json'))
+            with open(rpath, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            os.utime(rpath, (1_700_000_000 + i, 1_700_000_000 + i))
+        names.append(name)
+    return names
+
+
+def _measure(fn, requests):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[max(0, int(len(samples) * 0.95) - 1)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON directories vs SQLite local store')
+    parser.add_argument('--history', type=int, default=5000, help='Số interview log có sẵn')
+    parser.add_argument('--questions', type=int, default=9)
+    parser.add_argument('--requests', type=int, default=50, help='Số request đo cho mỗi endpoint')
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix='bench_local_store_'))
+    names = _make_files(args.history, args.questions)
+    import app
+    app._supabase_access.load_env = lambda: None  # không để backend/.env bật Supabase
+    client = app.app.test_client()
+    middle_log = names[len(names) // 2]
+    middle_result = names[(len(names) // 4) * 2].replace('.json', '_results.json')
+    pending_log = names[1]
+
+    def check(resp):
+        assert resp.status_code == 200, resp.get_data(as_text=True)[:200]
+
+    endpoints = [
+        ('history (trang đầu)', lambda: check(client.get('/api/history?limit=100'))),
+        ('history (giữa)', lambda: check(client.get(f'/api/history?limit=100&before={middle_log}'))),
+        ('results (trang đầu)', lambda: check(client.get('/api/results?limit=100'))),
+        ('results (giữa)', lambda: check(client.get(f'/api/results?limit=100&before={middle_result}'))),
+        ('result_status', lambda: check(client.get(f'/api/result_status?log={pending_log}'))),
+    ]
+
+    app.LOCAL_STORE = 'sqlite'
+    start = time.perf_counter()
+    store = app._get_local_store()  # lần mở đầu tiên nhập các file JSON có sẵn
+    migrate_seconds = time.perf_counter() - start
+    counts = store.stats()['migrations'].get('json_dirs_v1')
+
+    timings = {}
+    for mode in ('files', 'sqlite'):
+        app.LOCAL_STORE = mode
+        for label, fn in endpoints:
+            fn()  # lần đầu: dựng chỉ mục summary (files) / cache trang của SQLite
+            timings[(mode, label)] = _measure(fn, args.requests)
+
+    print('\n=== BENCHMARK kho cục bộ (không có Supabase) ===')
+    print(f'Lịch sử: {args.history} log, {(args.history + 1) // 2} kết quả | {args.requests} request/endpoint')
+    print(f'Migrate JSON → SQLite: {migrate_seconds:.2f}s ({counts})')
+    print(f'{"endpoint":<22} {"files p50":>10} {"p95":>8} {"sqlite p50":>11} {"p95":>8}   (ms)')
+    for label, _ in endpoints:
+        fp50, fp95 = timings[('files', label)]
+        sp50, sp95 = timings[('sqlite', label)]
+        print(f'{label:<22} {fp50:>10.1f} {fp95:>8.1f} {sp50:>11.1f} {sp95:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
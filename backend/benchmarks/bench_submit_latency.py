@@ -0,0 +1,134 @@
+"""
+Benchmark độ trễ /submit_interview: ghi Supabase đồng bộ (WRITE_BEHIND=0) vs journal write-behind.
+
+Supabase được giả lập bằng một server PostgREST tối giản chạy cục bộ, mỗi request chờ `--rtt` giây
+(round trip tới Supabase thật). In độ trễ submit p50/p95, số request tới Supabase theo bảng
+(upsert ứng viên, insert log) và thời gian tới khi journal ghi xong. `--candidates` nhỏ hơn
+`--submissions` để thấy các lần upsert ứng viên bị bỏ qua. Model chấm điểm giả lập, không gọi Gemini.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_submit_latency.py --submissions 200 --rtt 0.08 --concurrency 8
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Đo đường ghi, không đo hạn mức Gemini / warmup
+os.environ.setdefault('GEMINI_RPM', '1000000')
+os.environ.setdefault('GEMINI_TPM', '1000000000')
+
+
+class FakePostgrest(BaseHTTPRequestHandler):
+    """PostgREST giả lập: insert/upsert trả lại các dòng kèm id tăng dần, select trả danh sách rỗng."""
+
+    rtt = 0.0
+    requests = Counter()
+    rows = Counter()
+    next_id = 0
+    lock = threading.Lock()
+    protocol_version = 'HTTP/1.1'
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        time.sleep(self.rtt)
+        table = self.path.split('?')[0].rsplit('/', 1)[-1]
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'[]')
+        rows = body if isinstance(body, list) else [body]
+        with self.lock:
+            FakePostgrest.requests[table] += 1
+            FakePostgrest.rows[table] += len(rows)
+            out = []
+            for row in rows:
+                FakePostgrest.next_id += 1
+                out.append(dict(row, id=FakePostgrest.next_id))
+        self._reply(201, out)
+
+    def do_GET(self):
+        time.sleep(self.rtt)
+        self._reply(200, [])
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Submit latency: synchronous Supabase writes vs write-behind journal')
+    parser.add_argument('--submissions', type=int, default=200)
+    parser.add_argument('--candidates', type=int, default=50, help='Số ứng viên khác nhau')
+    parser.add_argument('--rtt', type=float, default=0.08, help='Độ trễ mỗi request tới Supabase giả lập (giây)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    FakePostgrest.rtt = args.rtt
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePostgrest)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(SUPABASE_URL=f'http://127.0.0.1:{server.server_port}', SUPABASE_SERVICE_ROLE_KEY='bench-key')
+
+    workdir = tempfile.mkdtemp(prefix='bench_submit_')
+    os.chdir(workdir)  # app tạo outputs/, uploads/... tương đối
+    import app
+    from bench_evaluate import StubModel, _fake_interview
+    from interview import evaluate
+    app._supabase_access.load_env = lambda: None  # không để backend/.env ghi đè URL giả lập
+    evaluate.model = StubModel(0.0)
+    client = app.app.test_client()
+    interview = _fake_interview(3)
+
+    def submit(i):
+        body = dict(interview, candidate_id=f'cand-{i % args.candidates}', candidate_name=f'Candidate {i % args.candidates}')
+        start = time.perf_counter()
+        resp = client.post('/submit_interview', json=body)
+        assert resp.status_code == 200, resp.get_data(as_text=True)
+        return time.perf_counter() - start
+
+    lines = []
+    for label, write_behind in (('sync', False), ('write-behind', True)):
+        app.WRITE_BEHIND = write_behind
+        FakePostgrest.requests.clear()
+        FakePostgrest.rows.clear()
+        # Log của submit/job chấm điểm nền không in ra giữa bảng kết quả
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                latencies = sorted(pool.map(submit, range(args.submissions)))
+            submitted = time.perf_counter() - start
+            if write_behind:
+                journal = app._get_write_behind()
+                while journal.stats()['pending']:
+                    time.sleep(0.05)
+            drained = time.perf_counter() - start
+        lines.append(f'{label:<13}: p50 {statistics.median(latencies) * 1000:7.1f} ms | '
+                     f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms | '
+                     f'nộp xong {submitted:.2f}s, ghi DB xong {drained:.2f}s | request Supabase: '
+                     f"candidates {FakePostgrest.requests['candidates']} ({FakePostgrest.rows['candidates']} dòng), "
+                     f"interview_logs {FakePostgrest.requests['interview_logs']} ({FakePostgrest.rows['interview_logs']} dòng)")
+    server.shutdown()
+
+    print('\n=== BENCHMARK độ trễ submit ===')
+    print(f'Số bài: {args.submissions} | ứng viên: {args.candidates} | RTT Supabase: {args.rtt * 1000:.0f} ms '
+          f'| đồng thời: {args.concurrency}')
+    for line in lines:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark độ trễ các helper _db_* khi Supabase down hoặc chưa cấu hình: có vs không có circuit breaker.
+
+- down: SUPABASE_URL trỏ tới một server treo (mặc định socket cục bộ nhận kết nối nhưng không bao giờ
+  trả lời → mỗi lời gọi chờ hết SUPABASE_TIMEOUT; `--url` để dùng địa chỉ khác)
+- misconfigured: thiếu SUPABASE_URL; đếm số lần đọc lại .env
+
+"no-breaker" đặt ngưỡng lỗi rất lớn và không cache lỗi cấu hình (giống _get_supabase trước đây:
+mỗi request đọc lại .env và thử kết nối). Mỗi kịch bản chạy trong một process riêng.
+
+Chạy từ thư mục backend:
+    python benchmarks/bench_supabase_outage.py --requests 50 --timeout 1
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = r'''
+import json, os, sys, time
+sys.path.insert(0, {backend!r})
+import app
+from dotenv import load_dotenv
+calls = [0]
+def counting_load_env():
+    # Như _load_env (hai lần load_dotenv override) nhưng đọc .env của kịch bản, không đọc backend/.env
+    calls[0] += 1
+    load_dotenv('.env', override=True)
+    load_dotenv('.env', override=True)
+app._supabase_access.load_env = counting_load_env
+latencies = []
+for _ in range({requests}):
+    start = time.perf_counter()
+    app._db_upsert_candidate('bench', 'Bench')
+    app._db_insert_interview_log({{'id': 'bench', 'candidate_name': 'Bench', 'responses': []}})
+    latencies.append(time.perf_counter() - start)
+print('__OUTAGE__' + json.dumps({{'latencies': latencies, 'load_env': calls[0],
+                                 'supabase': app._supabase_access.stats()}}))
+'''
+
+
+def _run(scenario, breaker, url, args):
+    env = dict(os.environ, SUPABASE_SERVICE_ROLE_KEY='bench-key',
+               SUPABASE_TIMEOUT=str(args.timeout))
+    env.setdefault('GEMINI_API_KEY', 'bench')
+    if not breaker:
+        env.update(SUPABASE_BREAKER_FAILURES='1000000', SUPABASE_CONFIG_RETRY_SECONDS='0')
+    code = _PROBE.format(backend=BACKEND_DIR, requests=args.requests)
+    # Thư mục tạm (app tạo outputs/uploads tương đối) chứa .env của kịch bản
+    with tempfile.TemporaryDirectory(prefix='bench_supabase_') as workdir:
+        with open(os.path.join(workdir, '.env'), 'w', encoding='utf-8') as f:
+            f.write(f"SUPABASE_URL={url if scenario == 'down' else ''}\n")
+        proc = subprocess.run([sys.executable, '-c', code], cwd=workdir, env=env,
+                              capture_output=True, text=True, timeout=3600)
+    marker = [line for line in proc.stdout.splitlines() if line.startswith('__OUTAGE__')]
+    if not marker:
+        raise RuntimeError(f'{scenario}: probe failed\n{proc.stderr[-2000:]}')
+    return json.loads(marker[-1][len('__OUTAGE__'):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Supabase outage: circuit breaker vs no breaker')
+    parser.add_argument('--requests', type=int, default=50, help='Số lượt nộp bài (upsert + insert) mỗi kịch bản')
+    parser.add_argument('--url', help='URL Supabase không phản hồi (mặc định: server treo cục bộ)')
+    parser.add_argument('--timeout', type=float, default=1.0, help='SUPABASE_TIMEOUT (giây)')
+    args = parser.parse_args()
+
+    # Server treo: kernel hoàn tất bắt tay TCP (backlog) nhưng không ai đọc/trả lời request
+    hung = socket.socket()
+    hung.bind(('127.0.0.1', 0))
+    hung.listen(1024)
+    url = args.url or f'http://127.0.0.1:{hung.getsockname()[1]}'
+
+    print('\n=== BENCHMARK Supabase down / chưa cấu hình ===')
+    print(f'{"kịch bản":<15} {"chế độ":<11} {"tổng (s)":>9} {"p50 ms":>8} {"max ms":>8} {"đọc .env":>9}  circuit')
+    for scenario in ('down', 'misconfigured'):
+        for breaker in (False, True):
+            out = _run(scenario, breaker, url, args)
+            lat = sorted(out['latencies'])
+            circuit = out['supabase']['circuit']
+            print(f'{scenario:<15} {"breaker" if breaker else "no-breaker":<11} {sum(lat):>9.2f} '
+                  f'{lat[len(lat) // 2] * 1000:>8.1f} {lat[-1] * 1000:>8.1f} {out["load_env"]:>9}  '
+                  f'{circuit["state"]} (opened {circuit["opened"]}, rejected {circuit["rejected"]})')
+    hung.close()
+
+
+if __name__ == '__main__':
+    main()
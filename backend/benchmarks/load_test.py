@@ -0,0 +1,240 @@
+"""
+Load test: chế độ threaded (`python app.py`, Flask/werkzeug) vs ASGI (`uvicorn asgi:app`).
+
+Gửi đồng thời nhiều request upload CV (`/api/upload_cv`, mỗi request chờ Gemini), upload bất đồng bộ
+(`/api/upload_cv/async`, trả job id ngay) và poll trạng thái (`/api/result_status`), đo throughput,
+độ trễ p50/p95/max, số lỗi và số thread đỉnh của server.
+
+Mặc định tự chạy cả hai server trong thư mục tạm với Gemini giả lập (độ trễ `--stub-latency`,
+không cần API key, không ghi vào thư mục backend) rồi in bảng so sánh:
+    python benchmarks/load_test.py --concurrency 200 --stub-latency 3
+Chạy vào một server đang chạy sẵn (Gemini thật hoặc giả lập tuỳ server):
+    python benchmarks/load_test.py --url http://localhost:5000 --cv path/to/cv.pdf --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chạy trong process server: thay genai.GenerativeModel bằng model giả lập có độ trễ cố định
+_SERVER_BOOTSTRAP = r'''
+import asyncio, json, os, sys, time
+sys.path.insert(0, {backend!r})
+sys.path.insert(0, os.path.join({backend!r}, 'src'))
+import google.generativeai as genai
+
+LATENCY = float(os.environ['LOAD_TEST_STUB_LATENCY'])
+QUESTIONS = json.dumps([{{"id": i, "question": f"Question {{i}}?", "category": "technical", "purpose": "stub"}}
+                        for i in range(1, 10)])
+
+class _Response:
+    text = QUESTIONS
+    usage_metadata = None
+
+class StubModel:
+    def __init__(self, *args, **kwargs):
+        pass
+    def generate_content(self, *args, **kwargs):
+        time.sleep(LATENCY)
+        return [_Response()] if kwargs.get('stream') else _Response()
+    async def generate_content_async(self, *args, **kwargs):
+        await asyncio.sleep(LATENCY)
+        return _Response()
+
+genai.GenerativeModel = StubModel
+genai.configure = lambda **kwargs: None
+genai.list_models = lambda: []
+mode, port = sys.argv[1], int(sys.argv[2])
+if mode == 'threaded':
+    import app
+    app.app.run(host='127.0.0.1', port=port, threaded=True)
+else:
+    import uvicorn
+    import asgi
+    uvicorn.run(asgi.app, host='127.0.0.1', port=port, log_level='warning', backlog=4096)
+'''
+
+
+def _text_pdf(text):
+    """PDF một trang có lớp text (pypdf trích xuất được, không cần OCR)."""
+    content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _thread_count(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def _run_load(url, cv_bytes, cv_name, kind, concurrency, total, pid=None):
+    latencies, errors = [], 0
+    peak_threads = _thread_count(pid) if pid else None
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=600) as client:
+        async def one(i):
+            nonlocal errors
+            async with sem:
+                start = time.perf_counter()
+                try:
+                    if kind in ('upload', 'async'):
+                        path = '/api/upload_cv' if kind == 'upload' else '/api/upload_cv/async'
+                        res = await client.post(path, files={'cv_file': (cv_name, cv_bytes)},
+                                                data={'job_title': 'Backend Developer', 'level': 'Junior',
+                                                      'force_regenerate': '1'})
+                    else:
+                        res = await client.get('/api/result_status', params={'log': f'load_test_{i}.json'})
+                    if res.status_code != (202 if kind == 'async' else 200):
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while True:
+                n = _thread_count(pid)
+                if n is not None:
+                    peak_threads = max(peak_threads or 0, n)
+                await asyncio.sleep(0.1)
+
+        sampler = asyncio.create_task(sample_threads()) if pid else None
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+        if sampler:
+            sampler.cancel()
+    return {
+        'requests': total,
+        'errors': errors,
+        'seconds': elapsed,
+        'rps': total / elapsed if elapsed else 0.0,
+        'p50': _percentile(latencies, 50),
+        'p95': _percentile(latencies, 95),
+        'max': max(latencies) if latencies else 0.0,
+        'peak_threads': peak_threads,
+    }
+
+
+def _start_server(mode, port, workdir, stub_latency):
+    env = dict(os.environ)
+    env.update({
+        'GEMINI_API_KEY': env.get('GEMINI_API_KEY', 'load-test-stub'),
+        'LOAD_TEST_STUB_LATENCY': str(stub_latency),
+        # Đo đường sinh câu hỏi thật sự: tắt cache/bank/index, bỏ giới hạn RPM
+        'QUESTION_CACHE_MAX_MB': '0',
+        'CV_TEXT_CACHE_MAX_MB': '0',
+        'QUESTION_BANK_ENABLED': '0',
+        'VECTOR_INDEX_ENABLED': '0',
+        'QUESTION_SEED_K': '0',
+        'GEMINI_RPM': '1000000',
+        'GEMINI_TPM': '1000000000',
+    })
+    code = _SERVER_BOOTSTRAP.format(backend=BACKEND_DIR)
+    proc = subprocess.Popen([sys.executable, '-c', code, mode, str(port)], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f'{mode} server exited with code {proc.returncode}')
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/result_status', params={'log': 'warmup.json'}, timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def _print_row(label, kind, r):
+    threads = r['peak_threads'] if r['peak_threads'] is not None else '-'
+    print(f"{label:<9} {kind:<7} {r['requests']:>5} {r['errors']:>6} {r['seconds']:>8.2f} {r['rps']:>8.1f} "
+          f"{r['p50']:>7.2f} {r['p95']:>7.2f} {r['max']:>7.2f} {threads:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test threaded vs ASGI serving mode')
+    parser.add_argument('--url', help='Chạy vào server có sẵn thay vì tự dựng hai server giả lập')
+    parser.add_argument('--cv', help='File CV dùng cho request upload (mặc định: PDF text sinh sẵn)')
+    parser.add_argument('--concurrency', type=int, default=100, help='Số request đồng thời')
+    parser.add_argument('--requests', type=int, default=0, help='Tổng số request mỗi loại (mặc định = concurrency)')
+    parser.add_argument('--polls', type=int, default=0, help='Tổng số request poll (mặc định = 5 x requests)')
+    parser.add_argument('--stub-latency', type=float, default=3.0, help='Độ trễ Gemini giả lập (giây)')
+    parser.add_argument('--modes', default='threaded,asgi', help='Chế độ khi tự dựng server')
+    args = parser.parse_args()
+
+    total = args.requests or args.concurrency
+    polls = args.polls or total * 5
+    if args.cv:
+        with open(args.cv, 'rb') as f:
+            cv_bytes, cv_name = f.read(), os.path.basename(args.cv)
+    else:
+        cv_bytes, cv_name = _text_pdf('Backend developer. Python, Django, PostgreSQL, REST APIs.'), 'load_test_cv.pdf'
+
+    print(f"{'mode':<9} {'kind':<7} {'reqs':>5} {'errors':>6} {'seconds':>8} {'req/s':>8} "
+          f"{'p50':>7} {'p95':>7} {'max':>7} {'threads':>8}")
+    if args.url:
+        for kind, n in (('upload', total), ('async', total), ('poll', polls)):
+            _print_row('remote', kind, asyncio.run(_run_load(args.url, cv_bytes, cv_name, kind, args.concurrency, n)))
+        return
+
+    for mode in args.modes.split(','):
+        with tempfile.TemporaryDirectory(prefix=f'load_test_{mode}_') as workdir:
+            port = _free_port()
+            proc = _start_server(mode, port, workdir, args.stub_latency)
+            try:
+                url = f'http://127.0.0.1:{port}'
+                for kind, n in (('upload', total), ('async', total), ('poll', polls)):
+                    _print_row(mode, kind, asyncio.run(_run_load(url, cv_bytes, cv_name, kind, args.concurrency, n, proc.pid)))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Đo thời gian khởi động (cold start) của backend: import app/asgi, request đầu tiên, chi phí import từng module.
+
+Mỗi lần đo chạy một process Python mới (`-X importtime`) trong thư mục tạm, để đo phần import
+(import app không chạy warmup). In thời gian import, thời gian tới response đầu tiên
+(`/api/health/warmup`), các module tốn nhiều nhất (thời gian cộng dồn) và kiểm tra các SDK nặng
+(Gemini, Supabase, OCR, pypdf) không bị import sẵn. `--warmup` chạy thêm warm_process() đồng bộ và
+in thời gian từng bước (có gọi mạng: list_models, Supabase).
+
+Chạy từ thư mục backend:
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --targets app,asgi --repeat 5 --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# SDK phải được import lười (chỉ khi dùng lần đầu / trong warmup)
+LAZY_MODULES = ('google.generativeai', 'supabase', 'pytesseract', 'pypdf', 'pdf2image', 'PIL.Image',
+                'chromadb', 'sentence_transformers')
+
+_PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {backend!r})
+start = time.perf_counter()
+import {target} as target
+imported = time.perf_counter() - start
+flask_app = target.backend.app if {target!r} == 'asgi' else target.app
+start = time.perf_counter()
+flask_app.test_client().get('/api/health/warmup')
+first = time.perf_counter() - start
+out = {{'import': imported, 'first_request': first,
+        'loaded': [m for m in {lazy!r} if m in sys.modules]}}
+if {warmup!r}:
+    backend = target.backend if {target!r} == 'asgi' else target
+    backend.warm_process(background=False)
+    out['warmup'] = backend.warmup_status()
+print('__STARTUP__' + json.dumps(out))
+'''
+
+
+def _parse_importtime(stderr):
+    """Dòng `import time: self | cumulative | name` → [(depth, name, cumulative_us)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            indent = len(name) - len(name.lstrip(' '))
+            rows.append(((indent - 1) // 2, name.strip(), int(cumulative)))
+        except ValueError:
+            continue
+    return rows
+
+
+def _run_once(target, warmup):
+    env = dict(os.environ)
+    env.setdefault('GEMINI_API_KEY', 'startup-benchmark')
+    code = _PROBE.format(backend=BACKEND_DIR, target=target, lazy=LAZY_MODULES, warmup=warmup)
+    with tempfile.TemporaryDirectory(prefix='startup_time_') as workdir:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=workdir, env=env,
+                              capture_output=True, text=True, timeout=600)
+    marker = [line for line in proc.stdout.splitlines() if line.startswith('__STARTUP__')]
+    if proc.returncode != 0 or not marker:
+        raise RuntimeError(f'{target}: probe failed\n{proc.stderr[-2000:]}')
+    return json.loads(marker[-1][len('__STARTUP__'):]), _parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start / import-time benchmark')
+    parser.add_argument('--targets', default='app', help='Module cần đo, phân tách bằng dấu phẩy (app, asgi)')
+    parser.add_argument('--repeat', type=int, default=3, help='Số lần đo mỗi target (lấy trung vị)')
+    parser.add_argument('--top', type=int, default=10, help='Số module tốn nhiều nhất cần in')
+    parser.add_argument('--warmup', action='store_true', help='Chạy thêm warm_process() và in thời gian từng bước')
+    args = parser.parse_args()
+
+    for target in args.targets.split(','):
+        runs = [_run_once(target, args.warmup and i == 0) for i in range(max(1, args.repeat))]
+        imports = [r[0]['import'] for r in runs]
+        firsts = [r[0]['first_request'] for r in runs]
+        print(f'\n=== {target} ({len(runs)} lần) ===')
+        print(f'import         : trung vị {statistics.median(imports) * 1000:.0f} ms '
+              f'(min {min(imports) * 1000:.0f}, max {max(imports) * 1000:.0f})')
+        print(f'request đầu    : trung vị {statistics.median(firsts) * 1000:.0f} ms')
+        loaded = runs[0][0]['loaded']
+        print(f'SDK nạp sẵn    : {", ".join(loaded) if loaded else "không (lazy)"}')
+
+        # Chi phí import theo module: trung bình các lần chạy, chỉ các import trực tiếp (depth 0-1)
+        totals = {}
+        for _, rows in runs:
+            for depth, name, cumulative in rows:
+                if depth <= 1:
+                    totals.setdefault(name, []).append(cumulative)
+        ranked = sorted(((statistics.mean(v), k) for k, v in totals.items()), reverse=True)[:args.top]
+        print(f'{"module":<40} {"cumulative ms":>14}')
+        for us, name in ranked:
+            print(f'{name:<40} {us / 1000:>14.1f}')
+
+        warm = runs[0][0].get('warmup')
+        if warm:
+            print(f"warmup         : {warm.get('seconds')} s")
+            for step, info in warm.get('steps', {}).items():
+                error = f" (lỗi: {info['error']})" if info.get('error') else ''
+                print(f"  {step:<13}: {info.get('seconds')} s{error}")
+            for module, seconds in warm.get('imports', {}).items():
+                print(f'  import {module:<25}: {seconds * 1000:.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Cấu hình gunicorn cho production: nhiều worker process, preload app, warm client trong từng worker.
+
+Chạy từ thư mục backend:
+    gunicorn -c gunicorn.conf.py                    # Flask, worker gthread
+    SERVER_MODE=asgi gunicorn -c gunicorn.conf.py   # asgi:app trên UvicornWorker
+
+State dùng chung giữa các worker:
+- hàng đợi chấm điểm: SQLite (outputs/jobs.sqlite3), claim nguyên tử, job của worker chết được đưa lại hàng đợi
+- sự kiện SSE: nhật ký SQLite SHARED_EVENTS_DB (mặc định outputs/events.sqlite3)
+- cache, question bank: SQLite như khi chạy một process
+- quota Gemini (GEMINI_RPM/GEMINI_TPM): token bucket trong SQLite GEMINI_QUOTA_DB (mặc định outputs/gemini_quota.sqlite3),
+  tổng cho cả server; worker nào đang bận được dùng phần quota mà worker rảnh không dùng
+- tác vụ nền chỉ cần một nơi chạy (sync vector index, khai thác question bank) do một worker giữ flock đảm nhận
+"""
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv('BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count() * 2 + 1)))
+SERVER_MODE = os.getenv('SERVER_MODE', 'threaded')
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'app:app'
+    worker_class = 'gthread'
+    threads = int(os.getenv('WEB_THREADS', '8'))
+preload_app = True
+# /api/upload_cv đồng bộ có thể mất 10-30s chờ Gemini
+timeout = int(os.getenv('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+os.environ.setdefault('SHARED_EVENTS_DB', os.path.join(chdir, 'outputs', 'events.sqlite3'))
+os.environ.setdefault('GEMINI_QUOTA_DB', os.path.join(chdir, 'outputs', 'gemini_quota.sqlite3'))
+
+
+def post_fork(server, worker):
+    import app as backend
+    backend.init_worker()
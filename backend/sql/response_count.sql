@@ -0,0 +1,10 @@
+-- Computed column cho /api/history: số câu trả lời của một interview log, tính trong Postgres
+-- để API chỉ trả về một số nguyên thay vì cả mảng responses (JSONB).
+-- Chạy một lần trong Supabase SQL editor. PostgREST cho phép select=id,response_count.
+create or replace function public.response_count(public.interview_logs)
+returns integer
+language sql
+stable
+as $$
+  select coalesce(jsonb_array_length(case when jsonb_typeof($1.responses) = 'array' then $1.responses end), 0);
+$$;
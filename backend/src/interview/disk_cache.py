@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    meta TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries(accessed_at);
+"""
+
+
+class DiskCache:
+    """Small persistent key/value cache on SQLite (JSON values).
+
+    - max_bytes: total size bound; least-recently-used entries are evicted on write.
+    - ttl_seconds: entries older than this are treated as misses and removed.
+    Hit/miss counters are per process.
+    """
+
+    def __init__(self, db_path: str, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.db_path = db_path
+        self.max_bytes = max_bytes if max_bytes and max_bytes > 0 else None
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {'value', 'meta', 'created_at'} or None (miss/expired)."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT value, meta, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._count(False)
+                return None
+            if self.ttl_seconds is not None and now - row['created_at'] > self.ttl_seconds:
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._count(False)
+                return None
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        self._count(True)
+        return {
+            'value': json.loads(row['value']),
+            'meta': json.loads(row['meta']) if row['meta'] else {},
+            'created_at': row['created_at'],
+        }
+
+    def get(self, key: str) -> Any:
+        entry = self.get_entry(key)
+        return entry['value'] if entry else None
+
+    def set(self, key: str, value: Any, meta: Optional[Dict[str, Any]] = None) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        raw_meta = json.dumps(meta, ensure_ascii=False) if meta else None
+        size = len(raw.encode('utf-8')) + (len(raw_meta.encode('utf-8')) if raw_meta else 0)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, value, meta, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, raw, raw_meta, size, now, now),
+            )
+            if self.max_bytes is not None:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Xoá dần các entry ít được dùng gần đây nhất cho tới khi dưới giới hạn
+        for row in conn.execute('SELECT key, size FROM entries ORDER BY accessed_at ASC').fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (row['key'],))
+            total -= row['size']
+
+    def metas(self) -> List[Dict[str, Any]]:
+        """Meta của mọi entry còn hạn (VD: tra ngược file nguồn → tham số đã dùng)."""
+        oldest = time.time() - self.ttl_seconds if self.ttl_seconds is not None else 0
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT meta FROM entries WHERE meta IS NOT NULL AND created_at >= ?',
+                                (oldest,)).fetchall()
+        return [json.loads(r['meta']) for r in rows]
+
+    def delete(self, key: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM entries')
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS b FROM entries').fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'entries': int(row['n']),
+            'bytes': int(row['b']),
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+        }
@@ -1,26 +1,133 @@
-import google.generativeai as genai
+import hashlib
 import json
 import re
 import os
 import sys
+import threading
+import time
+import unicodedata
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
-# Setup Gemini
-load_dotenv()
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise RuntimeError("Missing GEMINI_API_KEY in environment/.env")
-genai.configure(api_key=api_key)
+try:
+    from interview import gemini_gateway
+    from interview.disk_cache import DiskCache
+    from interview.lazy_import import lazy_module
+    from interview.local_store import LocalStore
+except ImportError:  # chạy trực tiếp như script từ src/interview
+    import gemini_gateway  # type: ignore
+    from disk_cache import DiskCache  # type: ignore
+    from lazy_import import lazy_module  # type: ignore
+    from local_store import LocalStore  # type: ignore
 
-model = genai.GenerativeModel("models/gemini-2.5-flash")  
+# Gemini SDK + model được khởi tạo khi chấm lần đầu (get_model) hoặc trong warmup, không lúc import:
+# import module không cần GEMINI_API_KEY và không trả chi phí import SDK
+genai = lazy_module("google.generativeai")
+EVAL_MODEL_NAME = "models/gemini-2.5-flash"
+model = None  # benchmark có thể gán model giả lập trực tiếp
+_model_lock = threading.Lock()
 
-def score_answer(answer, question, expected_points=None):
-    """
-    Gửi dữ liệu đến API Gemini để chấm điểm câu trả lời và trả về kết quả JSON.
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                load_dotenv()
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("Missing GEMINI_API_KEY in environment/.env")
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(EVAL_MODEL_NAME)
+    return model
+
+def _model_name():
+    return getattr(model, "model_name", type(model).__name__) if model is not None else EVAL_MODEL_NAME
+
+# Số lời gọi chấm điểm chạy song song cho mỗi bài phỏng vấn (1 = tuần tự)
+EVAL_MAX_WORKERS = int(os.getenv("EVAL_MAX_WORKERS", "6"))
+
+# Chế độ chấm:
+# - "per_question": mỗi câu một request score_answer + một request đánh giá tổng thể (mặc định)
+# - "batch": một request có cấu trúc chấm mọi câu và viết luôn đánh giá tổng thể; câu nào
+#   không khớp schema thì chấm lại riêng bằng score_answer
+EVAL_MODE_PER_QUESTION = "per_question"
+EVAL_MODE_BATCH = "batch"
+EVAL_MODE = os.getenv("EVAL_MODE", EVAL_MODE_PER_QUESTION)
+
+RUBRIC_FIELDS = ("correctness", "coverage", "reasoning", "creativity", "communication", "attitude")
+OVERALL_FEEDBACK_FIELDS = ("strengths", "weaknesses", "hiring_recommendation")
+
+# Cache kết quả chấm (persist, SQLite): chấm lại một log / job retry / batch re-score kho lưu trữ
+# không tốn lại request Gemini cho câu trả lời đã chấm. Khoá gồm model + hash template prompt,
+# nên sửa rubric là tự vô hiệu hoá; SCORE_CACHE_VERSION để vô hiệu hoá thủ công.
+SCORE_CACHE_MAX_MB = float(os.getenv("SCORE_CACHE_MAX_MB", "128"))
+SCORE_CACHE_TTL_HOURS = float(os.getenv("SCORE_CACHE_TTL_HOURS", "720"))
+SCORE_CACHE_VERSION = os.getenv("SCORE_CACHE_VERSION", "1")
+_score_cache = None
+_score_cache_lock = threading.Lock()
+
+def get_score_cache():
+    """DiskCache dùng chung; None nếu bị tắt (SCORE_CACHE_MAX_MB=0)."""
+    global _score_cache
+    if SCORE_CACHE_MAX_MB <= 0:
+        return None
+    if _score_cache is None:
+        with _score_cache_lock:
+            if _score_cache is None:
+                default_path = Path(__file__).parent.parent.parent / "cache" / "scores.sqlite3"
+                _score_cache = DiskCache(
+                    os.getenv("SCORE_CACHE_PATH", str(default_path)),
+                    max_bytes=int(SCORE_CACHE_MAX_MB * 1024 * 1024),
+                    ttl_seconds=SCORE_CACHE_TTL_HOURS * 3600,
+                )
+    return _score_cache
+
+def clear_score_cache():
+    cache = get_score_cache()
+    if cache is not None:
+        cache.clear()
+
+def _normalize_text(text):
+    """Chuẩn hoá để các câu trả lời chỉ khác hoa/thường, dạng Unicode, khoảng trắng dùng chung cache.
+
+    Giữ nguyên dấu câu và toán tử: "a != b" và "a == b", "-5" và "5" là các câu trả lời khác nhau.
     """
-    expected_points_str = "(không cung cấp)" if not expected_points else str(expected_points)
-    prompt = f"""
+    text = unicodedata.normalize("NFC", str(text or "")).lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+# Đổi khi cách chuẩn hoá khoá thay đổi (2: không còn bỏ dấu câu) để không dùng lại các entry cũ
+_SCORE_KEY_FORMAT = 2
+
+def prompt_version(template):
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+def score_cache_key(kind, template, parts):
+    payload = json.dumps([kind, SCORE_CACHE_VERSION, _SCORE_KEY_FORMAT, _model_name(), prompt_version(template), list(parts)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _cached_result(kind, template, parts, compute, cacheable=bool):
+    """compute() qua cache; chỉ lưu (và chỉ dùng lại) kết quả cacheable(result) (mặc định: khác rỗng/None)."""
+    cache = get_score_cache()
+    key = score_cache_key(kind, template, parts) if cache is not None else None
+    if key:
+        try:
+            hit = cache.get(key)
+        except Exception as e:
+            print(f"[SCORE_CACHE] lookup failed: {e}")
+            hit = None
+        # Entry ghi trước khi có kiểm tra schema có thể không hợp lệ: bỏ qua và chấm lại
+        if hit is not None and cacheable(hit):
+            return hit
+    result = compute()
+    if key and cacheable(result):
+        try:
+            cache.set(key, result, meta={"kind": kind})
+        except Exception as e:
+            print(f"[SCORE_CACHE] store failed: {e}")
+    return result
+
+SCORE_PROMPT_TEMPLATE = """
 Bạn là một giám khảo phỏng vấn kỹ thuật AI. Hãy trả lời hoàn toàn bằng **tiếng Việt**.
 
 Câu hỏi phỏng vấn: {question}
@@ -56,8 +163,24 @@ Ví dụ đúng:
  "feedback": "Ứng viên trả lời đúng phần lớn ý chính nhưng còn thiếu chi tiết về vai trò của Controller..."
 }}
 """
+
+def score_answer(answer, question, expected_points=None):
+    """
+    Gửi dữ liệu đến API Gemini để chấm điểm câu trả lời và trả về kết quả JSON.
+    Kết quả hợp lệ (validate_question_score) được lưu cache theo (câu hỏi, câu trả lời đã chuẩn hoá, ý chính, model, phiên bản prompt).
+    """
+    return _cached_result(
+        "answer", SCORE_PROMPT_TEMPLATE,
+        (_normalize_text(question), _normalize_text(answer), json.dumps(expected_points, ensure_ascii=False, sort_keys=True)),
+        lambda: _score_answer_uncached(answer, question, expected_points),
+        cacheable=lambda r: validate_question_score(r) is not None,
+    )
+
+def _score_answer_uncached(answer, question, expected_points=None):
+    expected_points_str = "(không cung cấp)" if not expected_points else str(expected_points)
+    prompt = SCORE_PROMPT_TEMPLATE.format(question=question, expected_points_str=expected_points_str, answer=answer)
     try:
-        response = model.generate_content(prompt)
+        response = gemini_gateway.generate_content(get_model(), prompt, priority=gemini_gateway.PRIORITY_BACKGROUND)
         raw = response.text.strip()
         
         # Dọn dẹp các ký tự không mong muốn
@@ -72,12 +195,7 @@ Ví dụ đúng:
         print(f"Lỗi xảy ra khi gọi API: {e}")
         return None
 
-# --- HÀM MỚI ---
-def get_overall_feedback(full_interview_log, candidate_name, job_title):
-    """
-    Gửi toàn bộ nội dung phỏng vấn để AI đưa ra đánh giá tổng thể.
-    """
-    prompt = f"""
+OVERALL_PROMPT_TEMPLATE = """
 Bạn là một Trưởng phòng Nhân sự (HR Manager) giàu kinh nghiệm, chuyên tổng kết và đánh giá sau phỏng vấn. Hãy trả lời hoàn toàn bằng **tiếng Việt**.
 
 Dưới đây là toàn bộ phần hỏi-đáp của ứng viên **{candidate_name}** cho vị trí **{job_title}**.
@@ -102,8 +220,23 @@ Cấu trúc JSON mong muốn:
   "hiring_recommendation": "<Một câu chốt đề xuất: 'Rất khuyến khích', 'Có tiềm năng, cân nhắc cho vòng sau', hoặc 'Không phù hợp'>"
 }}
 """
+
+def get_overall_feedback(full_interview_log, candidate_name, job_title):
+    """
+    Gửi toàn bộ nội dung phỏng vấn để AI đưa ra đánh giá tổng thể (có cache theo nội dung bài).
+    """
+    return _cached_result(
+        "overall", OVERALL_PROMPT_TEMPLATE,
+        (_normalize_text(full_interview_log), _normalize_text(candidate_name), _normalize_text(job_title)),
+        lambda: _overall_feedback_uncached(full_interview_log, candidate_name, job_title),
+        cacheable=lambda r: validate_overall_feedback(r) is not None,
+    )
+
+def _overall_feedback_uncached(full_interview_log, candidate_name, job_title):
+    prompt = OVERALL_PROMPT_TEMPLATE.format(
+        full_interview_log=full_interview_log, candidate_name=candidate_name, job_title=job_title)
     try:
-        response = model.generate_content(prompt)
+        response = gemini_gateway.generate_content(get_model(), prompt, priority=gemini_gateway.PRIORITY_BACKGROUND)
         raw = response.text.strip()
         
         raw = raw.replace("```json", "").replace("```", "")
@@ -116,110 +249,342 @@ Cấu trúc JSON mong muốn:
         print(f"Lỗi xảy ra khi gọi API (đánh giá tổng thể): {e}")
         return None
 
-def main(input_filepath):
+def _as_score(value, upper):
+    """Số nguyên trong [0, upper] (chấp nhận "8" hoặc "8/10"); None nếu không hợp lệ."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, str):
+        match = re.fullmatch(r"\s*(\d+)\s*(?:/\s*\d+)?\s*", value)
+        value = int(match.group(1)) if match else None
+    if not isinstance(value, int) or not 0 <= value <= upper:
+        return None
+    return value
+
+def validate_question_score(obj):
+    """Chuẩn hoá kết quả chấm một câu theo schema (6 tiêu chí 0-10, overall_score 0-100, feedback); None nếu sai."""
+    if not isinstance(obj, dict):
+        return None
+    out = {}
+    for field in RUBRIC_FIELDS:
+        value = _as_score(obj.get(field), 10)
+        if value is None:
+            return None
+        out[field] = value
+    out["overall_score"] = _as_score(obj.get("overall_score"), 100)
+    feedback = obj.get("feedback")
+    if out["overall_score"] is None or not isinstance(feedback, str) or not feedback.strip():
+        return None
+    out["feedback"] = feedback
+    return out
+
+def validate_overall_feedback(obj):
+    if not isinstance(obj, dict):
+        return None
+    score = _as_score(obj.get("overall_score"), 100)
+    if score is None:
+        return None
+    out = {"overall_score": score}
+    for field in OVERALL_FEEDBACK_FIELDS:
+        value = obj.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        out[field] = value
+    return out
+
+BATCH_PROMPT_TEMPLATE = """
+Bạn là giám khảo phỏng vấn kỹ thuật AI kiêm Trưởng phòng Nhân sự giàu kinh nghiệm. Hãy trả lời hoàn toàn bằng **tiếng Việt**.
+
+Dưới đây là {count} câu hỏi-đáp của ứng viên **{candidate_name}** cho vị trí **{job_title}**, mỗi câu có một id.
+
+--- BẮT ĐẦU NỘI DUNG PHỎNG VẤN ---
+{qa_blocks}
+--- KẾT THÚC NỘI DUNG PHỎNG VẤN ---
+
+1) Chấm TỪNG câu theo các tiêu chí (số nguyên 0-10):
+
+- correctness: mức độ chính xác của câu trả lời.
+- coverage: mức độ bao quát các ý chính cần có.
+- reasoning: có giải thích logic, đưa ra lập luận hay không.
+- creativity: có đưa ví dụ hoặc cách diễn đạt riêng không.
+- communication: cách trình bày có rõ ràng, mạch lạc không.
+- attitude: thái độ tích cực hay tiêu cực.
+
+Mỗi câu có thêm "overall_score" (số nguyên 0-100) và "feedback" (nhận xét ngắn cho câu đó).
+
+2) Dựa vào toàn bộ cuộc trao đổi, đưa ra đánh giá tổng thể: "overall_score" (0-100, mức độ phù hợp chung),
+"strengths", "weaknesses" (mỗi mục một đoạn văn ngắn) và "hiring_recommendation"
+('Rất khuyến khích', 'Có tiềm năng, cân nhắc cho vòng sau', hoặc 'Không phù hợp').
+
+⚠️ YÊU CẦU QUAN TRỌNG:
+
+- Trả về **đúng một đối tượng JSON hợp lệ**, không code block, không text ngoài JSON.
+- "questions" phải có đủ {count} phần tử, giữ nguyên id như trên (dạng chuỗi).
+- Không dùng "x/10", chỉ dùng số nguyên.
+
+Cấu trúc JSON:
+{{
+  "questions": [
+    {{"id": "1", "correctness": 8, "coverage": 7, "reasoning": 5, "creativity": 4, "communication": 9, "attitude": 10, "overall_score": 78, "feedback": "..."}}
+  ],
+  "overall_feedback": {{"overall_score": 75, "strengths": "...", "weaknesses": "...", "hiring_recommendation": "..."}}
+}}
+"""
+
+def build_batch_prompt(items, candidate_name, job_title):
+    """Một prompt cho cả bài: rubric chỉ xuất hiện một lần, mỗi câu kèm id để ghép kết quả.
+    id là số thứ tự (1..n) của câu trong items, không phải id câu hỏi (có thể trùng hoặc "unknown")."""
+    qa_blocks = "\n".join(
+        f"[id={pos}]\nCâu hỏi: {question}\nTrả lời: {answer}\n"
+        for pos, (_, question, answer) in enumerate(items, start=1)
+    )
+    return BATCH_PROMPT_TEMPLATE.format(
+        count=len(items), candidate_name=candidate_name, job_title=job_title, qa_blocks=qa_blocks)
+
+def _parse_json_object(raw):
+    raw = raw.replace("```json", "").replace("```", "").strip()
+    raw = re.sub(r"(\d+)\/\d+", r"\1", raw)
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        start, end = raw.find("{"), raw.rfind("}")
+        if start < 0 or end <= start:
+            raise
+        return json.loads(raw[start:end + 1])
+
+def score_interview_batch(items, candidate_name, job_title):
     """
-    Hàm chính để đọc tệp đầu vào, xử lý và ghi kết quả ra tệp đầu ra.
+    Chấm mọi câu + đánh giá tổng thể trong một request có cấu trúc.
+    items: [(key, question, answer)]. Trả về ([kết quả hợp lệ hoặc None theo đúng thứ tự items],
+    overall_feedback hoặc None); câu None (thiếu/không hợp lệ) để bên gọi chấm lại riêng.
+    Kết quả ghép theo vị trí nên key trùng nhau hoặc "unknown" không đè lên nhau.
     """
-    # --- 1. Đọc dữ liệu đầu vào ---
+    # Chỉ cache khi cả bài hợp lệ; lần chấm thiếu câu sẽ được cache theo từng câu ở đường fallback
+    cached = _cached_result(
+        "batch", BATCH_PROMPT_TEMPLATE,
+        ([(_normalize_text(q), _normalize_text(a)) for _, q, a in items],
+         _normalize_text(candidate_name), _normalize_text(job_title)),
+        lambda: _score_batch_uncached(items, candidate_name, job_title),
+        cacheable=lambda r: r["overall"] is not None and all(r["scores"]),
+    )
+    return list(cached["scores"]), cached["overall"]
+
+def _score_batch_uncached(items, candidate_name, job_title):
+    """{"scores": [kết quả hoặc None theo vị trí], "overall": ...}: dict/list để đọc lại từ cache JSON y hệt."""
+    prompt = build_batch_prompt(items, candidate_name, job_title)
+    scores = [None] * len(items)
+    raw = ""
     try:
-        with open(input_filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Lỗi: Không tìm thấy tệp '{input_filepath}'.")
-        return
-    except json.JSONDecodeError as e:
-        print(f"Lỗi: Tệp JSON đầu vào không hợp lệ. Chi tiết: {e}")
-        return
+        response = gemini_gateway.generate_content(
+            get_model(), prompt, priority=gemini_gateway.PRIORITY_BACKGROUND,
+            generation_config={"response_mime_type": "application/json"},
+        )
+        raw = response.text or ""
+        data = _parse_json_object(raw)
+    except json.JSONDecodeError:
+        print(f"⚠️ Không thể phân tích JSON từ AI (chấm batch). Dữ liệu thô:\n{raw}")
+        return {"scores": scores, "overall": None}
+    except Exception as e:
+        print(f"Lỗi xảy ra khi gọi API (chấm batch): {e}")
+        return {"scores": scores, "overall": None}
+    if not isinstance(data, dict):
+        return {"scores": scores, "overall": None}
+    for entry in data.get("questions") or []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            pos = int(str(entry.get("id")).strip())
+        except ValueError:
+            continue
+        valid = validate_question_score(entry)
+        if 1 <= pos <= len(items) and valid is not None:
+            scores[pos - 1] = valid
+    return {"scores": scores, "overall": validate_overall_feedback(data.get("overall_feedback"))}
+
+def _response_fields(item):
+    """(key, câu hỏi, câu trả lời) của một item interview_logs."""
+    # Chấp nhận cả hai định dạng khóa: (id, question, response) hoặc (question_id, answer)
+    qid = item.get("id", item.get("question_id"))
+    qtext = item.get("question", item.get("question_text", ""))
+    ans = item.get("response", item.get("answer", ""))
+    return (str(qid) if qid is not None else "unknown"), qtext, ans
+
+def _score_response_item(item):
+    """
+    Chấm điểm một câu trả lời trong interview_logs; trả về (key, kết quả kèm câu hỏi/câu trả lời) hoặc (key, None).
+    """
+    key, qtext, ans = _response_fields(item)
+    print(f"Đang chấm điểm câu hỏi #{key}...")
+    res = score_answer(ans, qtext, None)
+    if not res:
+        return key, None
+    # Đính kèm cả câu hỏi & câu trả lời để lưu vào file kết quả
+    res_with_qa = dict(res)
+    res_with_qa["question"] = qtext
+    res_with_qa["answer"] = ans
+    return key, res_with_qa
 
-    # --- 2. Xử lý và chấm điểm ---
+def _evaluate_batch(responses, candidate_name, job_title, full_interview_log, workers, report):
+    """Chế độ batch: một request cho cả bài, chỉ các câu không hợp lệ mới rơi về score_answer."""
+    items = [_response_fields(item) for item in responses]
+    print(f"Đang chấm {len(items)} câu hỏi trong một request (batch)...")
+    scored, overall_feedback = score_interview_batch(items, candidate_name, job_title)
     results = {}
-    print(f"Bắt đầu chấm điểm cho tệp: {os.path.basename(input_filepath)}")
+    missing = []
+    done = 0
+    for item, (key, qtext, ans), res in zip(responses, items, scored):
+        if res is None:
+            missing.append(item)
+            continue
+        results[key] = dict(res, question=qtext, answer=ans)
+        done += 1
+        report(done, key, res)
+    if missing:
+        print(f"⚠️ {len(missing)} câu không hợp lệ trong kết quả batch, chấm lại từng câu...")
+    if overall_feedback is None:
+        print("⚠️ Đánh giá tổng thể trong batch không hợp lệ, gọi riêng...")
+    if missing or overall_feedback is None:
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing) or 1) + 1) as pool:
+            overall_future = None
+            if overall_feedback is None:
+                overall_future = pool.submit(get_overall_feedback, full_interview_log, candidate_name, job_title)
+            for fut in as_completed([pool.submit(_score_response_item, item) for item in missing]):
+                key, res = fut.result()
+                if res:
+                    results[key] = res
+                done += 1
+                report(done, key, res)
+            if overall_future is not None:
+                overall_feedback = overall_future.result()
+    # Ghép lại theo thứ tự câu hỏi
+    ordered = {key: results[key] for key, _, _ in items if key in results}
+    return ordered, overall_feedback
 
-    # Hai định dạng đầu vào được hỗ trợ:
-    # A) Định dạng cũ: {question, expected_key_points, candidate_answers}
-    # B) Định dạng interview_logs: {candidate_name, interview_date, responses: [{id, question, response, ...}]}
-    if isinstance(data, dict) and "responses" in data:
-        # Định dạng interview_logs: chấm điểm từng câu trả lời
-        responses = data.get("responses", [])
-        per_question_results = {}
-        for item in responses:
-            # Chấp nhận cả hai định dạng khóa: (id, question, response) hoặc (question_id, answer)
-            qid = item.get("id", item.get("question_id"))
-            qtext = item.get("question", item.get("question_text", ""))
-            ans = item.get("response", item.get("answer", ""))
-            print(f"Đang chấm điểm câu hỏi #{qid}...")
-            res = score_answer(ans, qtext, None)
+def _evaluate_interview_log(data, max_workers=None, on_progress=None, mode=None):
+    """
+    Chấm điểm một bài phỏng vấn định dạng interview_logs và trả về {"summary", "details"}.
+
+    Các lời gọi score_answer được chạy song song trên một thread pool giới hạn
+    (EVAL_MAX_WORKERS), đánh giá tổng thể chạy song song cùng lúc. Kết quả vẫn
+    được ghép theo đúng thứ tự câu hỏi. max_workers=1 giữ hành vi tuần tự cũ.
+    on_progress(event) (tuỳ chọn) được gọi mỗi khi chấm xong một câu hỏi.
+    mode: EVAL_MODE_PER_QUESTION hoặc EVAL_MODE_BATCH (mặc định theo EVAL_MODE).
+    """
+    responses = data.get("responses", [])
+    workers = max(1, int(max_workers or EVAL_MAX_WORKERS))
+    mode = mode or EVAL_MODE
+    total = len(responses)
+
+    def _report(done, key, res):
+        if on_progress is None:
+            return
+        try:
+            on_progress({"type": "progress", "question_id": key, "scored": bool(res), "done": done, "total": total})
+        except Exception as e:
+            print(f"⚠️ Lỗi callback tiến độ: {e}")
+
+    # Tạo chuỗi nội dung phỏng vấn đầy đủ
+    full_interview_log = ""
+    for item in responses:
+        qid = item.get("id")
+        question = item.get("question", "")
+        answer = item.get("response", "")
+        full_interview_log += f"Câu hỏi {qid}: {question}\n"
+        full_interview_log += f"Trả lời: {answer}\n\n"
+
+    # Lấy thông tin ứng viên và vị trí
+    candidate_name = data.get("candidate_name", "Ứng viên")
+    job_title = "Vị trí ứng tuyển"  # Có thể cải thiện bằng cách lưu job_title trong file interview
+
+    per_question_results = {}
+    if mode == EVAL_MODE_BATCH and responses:
+        per_question_results, overall_feedback = _evaluate_batch(
+            responses, candidate_name, job_title, full_interview_log, workers, _report)
+    elif workers == 1:
+        for idx, item in enumerate(responses):
+            key, res = _score_response_item(item)
             if res:
-                # Đính kèm cả câu hỏi & câu trả lời để lưu vào file kết quả
-                res_with_qa = dict(res)
-                res_with_qa["question"] = qtext
-                res_with_qa["answer"] = ans
-                per_question_results[str(qid) if qid is not None else "unknown"] = res_with_qa
-        # Tính điểm tổng hợp đơn giản (trung bình overall_score nếu có)
-        overall_scores = [v.get("overall_score", 0) for v in per_question_results.values() if isinstance(v.get("overall_score", None), (int, float))]
-        summary = {
-            "candidate_name": data.get("candidate_name"),
-            "interview_date": data.get("interview_date"),
-            "average_overall_score": round(sum(overall_scores) / len(overall_scores), 2) if overall_scores else 0,
-            "questions_scored": len(per_question_results)
-        }
-        
-        # --- ĐÁNH GIÁ TỔNG THỂ ---
+                per_question_results[key] = res
+            _report(idx + 1, key, res)
         print("Đang tạo đánh giá tổng thể...")
-        
-        # Tạo chuỗi nội dung phỏng vấn đầy đủ
-        full_interview_log = ""
-        for item in responses:
-            qid = item.get("id")
-            question = item.get("question", "")
-            answer = item.get("response", "")
-            full_interview_log += f"Câu hỏi {qid}: {question}\n"
-            full_interview_log += f"Trả lời: {answer}\n\n"
-        
-        # Lấy thông tin ứng viên và vị trí
-        candidate_name = data.get("candidate_name", "Ứng viên")
-        candidate_id = data.get("id", "N/A")
-        job_title = "Vị trí ứng tuyển"  # Có thể cải thiện bằng cách lưu job_title trong file interview
-        
-        # Gọi AI để đánh giá tổng thể
         overall_feedback = get_overall_feedback(full_interview_log, candidate_name, job_title)
-        
-        if overall_feedback:
-            summary["overall_feedback"] = overall_feedback
-            print("✅ Đã tạo đánh giá tổng thể")
-        else:
-            print("⚠️ Không thể tạo đánh giá tổng thể")
-            summary["overall_feedback"] = {
-                "overall_score": summary["average_overall_score"],
-                "strengths": "Không thể đánh giá",
-                "weaknesses": "Không thể đánh giá", 
-                "hiring_recommendation": "Cần xem xét thêm"
-            }
-        results = {
-            "summary": summary,
-            "details": per_question_results
-        }
     else:
-        # Định dạng cũ
-        try:
-            question = data["question"]
-            expected_key_points = data.get("expected_key_points", None)
-            candidate_answers = data["candidate_answers"]
-        except (KeyError) as e:
-            print(f"Lỗi: Tệp JSON đầu vào không hợp lệ hoặc thiếu khóa cần thiết. Chi tiết: {e}")
-            return
-        for name, ans in candidate_answers.items():
-            print(f"Đang chấm điểm cho {name}...")
-            result = score_answer(ans, question, expected_key_points)
-            if result:
-                results[name] = result
-            else:
-                print(f"⚠️ Bỏ qua {name} do phản hồi không hợp lệ.")
-
-    # --- 3. Sắp xếp kết quả ---
-    sorted_ranking = sorted(results.items(), key=lambda x: x[1].get("overall_score", 0), reverse=True)
-
-    # --- 4. Hiển thị kết quả tóm tắt trên Console ---
+        # +1 worker cho đánh giá tổng thể để không chiếm chỗ của các câu hỏi
+        with ThreadPoolExecutor(max_workers=min(workers, len(responses) or 1) + 1) as pool:
+            print("Đang tạo đánh giá tổng thể (song song)...")
+            overall_future = pool.submit(get_overall_feedback, full_interview_log, candidate_name, job_title)
+            score_futures = [pool.submit(_score_response_item, item) for item in responses]
+            for done, fut in enumerate(as_completed(score_futures), start=1):
+                _report(done, *fut.result())
+            # Ghép kết quả theo thứ tự câu hỏi, không theo thứ tự hoàn thành
+            for fut in score_futures:
+                key, res = fut.result()
+                if res:
+                    per_question_results[key] = res
+            overall_feedback = overall_future.result()
+
+    # Tính điểm tổng hợp đơn giản (trung bình overall_score nếu có)
+    overall_scores = [v.get("overall_score", 0) for v in per_question_results.values() if isinstance(v.get("overall_score", None), (int, float))]
+    summary = {
+        "candidate_name": data.get("candidate_name"),
+        "interview_date": data.get("interview_date"),
+        "average_overall_score": round(sum(overall_scores) / len(overall_scores), 2) if overall_scores else 0,
+        "questions_scored": len(per_question_results)
+    }
+
+    # --- ĐÁNH GIÁ TỔNG THỂ ---
+    if overall_feedback:
+        summary["overall_feedback"] = overall_feedback
+        print("✅ Đã tạo đánh giá tổng thể")
+    else:
+        print("⚠️ Không thể tạo đánh giá tổng thể")
+        summary["overall_feedback"] = {
+            "overall_score": summary["average_overall_score"],
+            "strengths": "Không thể đánh giá",
+            "weaknesses": "Không thể đánh giá", 
+            "hiring_recommendation": "Cần xem xét thêm"
+        }
+    return {
+        "summary": summary,
+        "details": per_question_results
+    }
+
+def evaluate(data, max_workers=None, on_progress=None, mode=None):
+    """
+    Chấm điểm hoàn toàn trong bộ nhớ: nhận dict bài phỏng vấn, trả về dict kết quả (không đọc/ghi file).
+
+    Hai định dạng đầu vào được hỗ trợ:
+    A) Định dạng cũ: {question, expected_key_points, candidate_answers} → {tên ứng viên: điểm}
+    B) Định dạng interview_logs: {candidate_name, interview_date, responses: [...]} → {"summary", "details"}
+    Đầu vào không hợp lệ → ValueError. Tham số như main().
+    """
+    if isinstance(data, dict) and "responses" in data:
+        if not isinstance(data["responses"], list) or not all(isinstance(item, dict) for item in data["responses"]):
+            raise ValueError("responses phải là danh sách các object")
+        return _evaluate_interview_log(data, max_workers=max_workers, on_progress=on_progress, mode=mode)
+    # Định dạng cũ
+    try:
+        question = data["question"]
+        expected_key_points = data.get("expected_key_points", None)
+        candidate_answers = data["candidate_answers"]
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"thiếu khóa cần thiết: {e}")
+    if not isinstance(candidate_answers, dict):
+        raise ValueError("candidate_answers phải là object {tên ứng viên: câu trả lời}")
+    results = {}
+    for name, ans in candidate_answers.items():
+        print(f"Đang chấm điểm cho {name}...")
+        result = score_answer(ans, question, expected_key_points)
+        if result:
+            results[name] = result
+        else:
+            print(f"⚠️ Bỏ qua {name} do phản hồi không hợp lệ.")
+    # Xếp hạng theo điểm (định dạng interview_logs giữ nguyên summary/details)
+    return dict(sorted(results.items(), key=lambda x: x[1].get("overall_score", 0), reverse=True))
+
+def print_scoreboard(results):
+    """Hiển thị kết quả tóm tắt trên Console."""
     print("\n=== BẢNG ĐIỂM ===")
     
     # Hiển thị kết quả theo định dạng khác nhau
@@ -243,69 +608,305 @@ def main(input_filepath):
             print(f"Khuyến nghị: {feedback.get('hiring_recommendation', 'N/A')}")
     else:
         # Định dạng cũ
-        for name, result in sorted_ranking:
+        for name, result in results.items():
             score = result.get("overall_score", 0)
             print(f"{name}: {score} / 100")
 
-    # --- 5. Ghi kết quả chi tiết ra tệp JSON ---
-    # Lưu dưới thư mục outputs/evaluate_results của dự án (từ thư mục gốc)
-    script_dir = Path(__file__).parent
-    output_dir = script_dir.parent.parent / "outputs" / "evaluate_results"
-    os.makedirs(str(output_dir), exist_ok=True)  # Tạo thư mục nếu chưa tồn tại
+# -------------------- Nơi lưu kết quả (result sink) --------------------
+# Sink nhận (name, result) và trả về tham chiếu tới kết quả đã lưu (tên file, "id:<n>"...).
+# Caller chọn sink: file (CLI, chế độ không có DB), DB (app.py), hoặc cả hai (MultiResultSink).
+def default_results_dir():
+    return Path(__file__).parent.parent.parent / "outputs" / "evaluate_results"
+
+def result_filename(name):
+    """Tên file kết quả ứng với tên bài phỏng vấn (có hoặc không có đuôi .json)."""
+    return f"{os.path.splitext(os.path.basename(name))[0]}_results.json"
+
+class FileResultSink:
+    """Ghi kết quả ra <output_dir>/<name>_results.json (ghi file tạm rồi thay thế)."""
+
+    def __init__(self, output_dir=None):
+        self.output_dir = Path(output_dir) if output_dir else default_results_dir()
+
+    def path_for(self, name):
+        return self.output_dir / result_filename(name)
+
+    def exists(self, name):
+        return self.path_for(name).exists()
+
+    def write(self, name, result):
+        os.makedirs(str(self.output_dir), exist_ok=True)
+        path = self.path_for(name)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path.name
+
+class StoreResultSink:
+    """Ghi kết quả vào kho cục bộ (interview.local_store.LocalStore) dưới tên <name>_results.json."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def result_file(self, name):
+        return result_filename(name)
+
+    def exists(self, name):
+        return self.store.has_result(self.result_file(name))
+
+    def write(self, name, result):
+        self.store.insert_evaluate_result(self.result_file(name), result, log_file=os.path.basename(name))
+        return self.result_file(name)
+
+class CallbackResultSink:
+    """Bọc một hàm write(name, result) → tham chiếu (VD: insert vào DB); None = lưu thất bại."""
+
+    def __init__(self, write, label="callback"):
+        self._write = write
+        self.label = label
+
+    def write(self, name, result):
+        ref = self._write(name, result)
+        if ref is None:
+            raise RuntimeError(f"cannot store evaluation result ({self.label})")
+        return ref
+
+class MultiResultSink:
+    """Ghi vào nhiều sink theo thứ tự; trả về tham chiếu của sink đầu tiên."""
+
+    def __init__(self, *sinks):
+        self.sinks = [s for s in sinks if s is not None]
+
+    def write(self, name, result):
+        refs = [sink.write(name, result) for sink in self.sinks]
+        return refs[0] if refs else None
+
+def evaluate_to_sink(data, name, sink, max_workers=None, on_progress=None, mode=None):
+    """Chấm trong bộ nhớ rồi lưu qua `sink` → (result, tham chiếu do sink trả về)."""
+    result = evaluate(data, max_workers=max_workers, on_progress=on_progress, mode=mode)
+    return result, sink.write(name, result)
 
-    # Tạo tên tệp đầu ra dựa trên tệp đầu vào
-    base_name = os.path.basename(input_filepath)
-    file_name_without_ext = os.path.splitext(base_name)[0]
-    output_filename = f"{file_name_without_ext}_results.json"
-    output_filepath = os.path.join(str(output_dir), output_filename)
+def main(input_filepath, max_workers=None, on_progress=None, mode=None):
+    """
+    Hàm chính để đọc tệp đầu vào, xử lý và ghi kết quả ra tệp đầu ra.
+    max_workers: số luồng chấm điểm song song (mặc định EVAL_MAX_WORKERS; 1 = tuần tự).
+    on_progress: callback nhận sự kiện tiến độ mỗi khi chấm xong một câu hỏi.
+    mode: chế độ chấm (per_question/batch), mặc định theo EVAL_MODE.
+    Trả về đường dẫn file kết quả, hoặc None nếu đầu vào không hợp lệ.
+    """
+    # --- 1. Đọc dữ liệu đầu vào ---
+    try:
+        with open(input_filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Lỗi: Không tìm thấy tệp '{input_filepath}'.")
+        return
+    except json.JSONDecodeError as e:
+        print(f"Lỗi: Tệp JSON đầu vào không hợp lệ. Chi tiết: {e}")
+        return
 
-    # Chuyển đổi danh sách đã sắp xếp thành từ điển để lưu trữ
-    final_results_dict = dict(sorted_ranking)
+    # --- 2. Xử lý và chấm điểm (trong bộ nhớ) ---
+    print(f"Bắt đầu chấm điểm cho tệp: {os.path.basename(input_filepath)}")
+    try:
+        results = evaluate(data, max_workers=max_workers, on_progress=on_progress, mode=mode)
+    except ValueError as e:
+        print(f"Lỗi: Tệp JSON đầu vào không hợp lệ hoặc thiếu khóa cần thiết. Chi tiết: {e}")
+        return
 
-    with open(output_filepath, 'w', encoding='utf-8') as f:
-        json.dump(final_results_dict, f, indent=2, ensure_ascii=False)
+    # --- 3. Hiển thị kết quả tóm tắt trên Console ---
+    print_scoreboard(results)
 
+    # --- 4. Ghi kết quả chi tiết ra outputs/evaluate_results/<tên log>_results.json ---
+    sink = FileResultSink()
+    sink.write(input_filepath, results)
+    output_filepath = str(sink.path_for(input_filepath))
     print(f"\n✅ Đã lưu kết quả chi tiết vào: {output_filepath}")
+    return output_filepath
+
+# Chấm lại hàng loạt: số log chấm đồng thời (mỗi log vẫn dùng EVAL_MAX_WORKERS luồng, chung gateway)
+EVAL_BATCH_PARALLEL = int(os.getenv("EVAL_BATCH_PARALLEL", "2"))
+BATCH_MANIFEST_NAME = "eval_batch_manifest.json"
+
+def evaluation_version(mode=None):
+    """Phiên bản chấm hiện tại: model + chế độ + hash các prompt → đổi là phải chấm lại."""
+    mode = mode or EVAL_MODE
+    templates = [SCORE_PROMPT_TEMPLATE, OVERALL_PROMPT_TEMPLATE]
+    if mode == EVAL_MODE_BATCH:
+        templates.append(BATCH_PROMPT_TEMPLATE)
+    return f"{_model_name()}:{mode}:" + prompt_version("".join(templates))
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
-def process_all_interview_logs():
+def _load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_manifest(path, manifest):
+    # Ghi file tạm rồi thay thế để checkpoint không bao giờ bị ghi dở
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _payload_sha256(payload):
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+def batch_local_store():
+    """Kho SQLite cục bộ mà backend dùng khi không có Supabase (LOCAL_STORE=sqlite, mặc định) → LocalStore;
+    None khi LOCAL_STORE=files. Đường dẫn mặc định giống app.py chạy từ thư mục backend."""
+    if os.getenv("LOCAL_STORE", "sqlite").strip().lower() != "sqlite":
+        return None
+    default_path = Path(__file__).parent.parent.parent / "outputs" / "local_store.sqlite3"
+    return LocalStore(os.getenv("LOCAL_STORE_DB", str(default_path)))
+
+def process_all_interview_logs(parallel=None, force=False, mode=None):
     """
-    Xử lý tất cả các file JSON trong thư mục interview_logs
+    Chấm (lại) các interview log theo kiểu tăng dần: trong kho SQLite cục bộ (LOCAL_STORE=sqlite, mặc định;
+    file JSON mới trong interview_logs được nhập vào kho trước) hoặc các file JSON trong interview_logs
+    (LOCAL_STORE=files). Kết quả được lưu cùng chỗ với log.
+
+    - Bỏ qua log đã có kết quả ứng với đúng nội dung (SHA-256) và phiên bản chấm hiện tại
+      (model, chế độ, hash prompt); force=True chấm lại tất cả.
+    - Chấm song song tối đa `parallel` log (mặc định EVAL_BATCH_PARALLEL).
+    - Checkpoint vào outputs/eval_batch_manifest.json sau mỗi log, nên lần chạy
+      bị ngắt giữa chừng sẽ tiếp tục từ chỗ dừng.
+    - In tổng kết thông lượng khi xong.
     """
     script_dir = Path(__file__).parent
     interview_logs_dir = script_dir.parent.parent / "outputs" / "interview_logs"
-    
-    if not interview_logs_dir.exists():
-        print(f"❌ Lỗi: Không tìm thấy thư mục interview_logs: {interview_logs_dir}")
+    results_dir = script_dir.parent.parent / "outputs" / "evaluate_results"
+
+    store = batch_local_store()
+    if store is not None:
+        # Bài nộp ở chế độ file chỉ nằm trong kho; file JSON chưa nhập (trùng tên thì bỏ qua) được nhập trước
+        store.migrate_json_dirs(str(interview_logs_dir), str(results_dir), force=True)
+        sink = StoreResultSink(store)
+        logs = store.interview_logs()
+        log_names = [name for name, _ in logs]
+        payloads = dict(logs)
+        source = store.db_path
+    else:
+        if not interview_logs_dir.exists():
+            print(f"❌ Lỗi: Không tìm thấy thư mục interview_logs: {interview_logs_dir}")
+            return
+        # Tìm tất cả file JSON trong thư mục interview_logs
+        sink = FileResultSink(results_dir)
+        log_names = sorted(p.name for p in interview_logs_dir.glob("*.json"))
+        payloads = None
+        source = interview_logs_dir
+
+    if not log_names:
+        print(f"❌ Không tìm thấy interview log nào trong: {source}")
         return
-    
-    # Tìm tất cả file JSON trong thư mục interview_logs
-    json_files = list(interview_logs_dir.glob("*.json"))
-    
-    if not json_files:
-        print(f"❌ Không tìm thấy file JSON nào trong thư mục: {interview_logs_dir}")
+
+    parallel = max(1, int(parallel or EVAL_BATCH_PARALLEL))
+    version = evaluation_version(mode)
+    os.makedirs(str(results_dir), exist_ok=True)
+    manifest_path = str(results_dir.parent / BATCH_MANIFEST_NAME)
+    manifest = _load_manifest(manifest_path)
+    manifest_lock = threading.Lock()
+
+    pending = []
+    skipped = 0
+    for name in log_names:
+        digest = _payload_sha256(payloads[name]) if payloads is not None else _file_sha256(interview_logs_dir / name)
+        entry = manifest.get(name) or {}
+        if (not force and entry.get("sha256") == digest and entry.get("version") == version
+                and sink.exists(name)):
+            skipped += 1
+            continue
+        pending.append((name, digest))
+
+    print(f"🔍 Tìm thấy {len(log_names)} interview log: {skipped} đã cập nhật (bỏ qua), {len(pending)} cần chấm "
+          f"(song song {parallel}, phiên bản {version})")
+    for name, _ in pending:
+        print(f"   - {name}")
+    if not pending:
         return
-    
-    print(f"🔍 Tìm thấy {len(json_files)} file JSON để chấm điểm:")
-    for file in json_files:
-        print(f"   - {file.name}")
-    
+
     print("\n" + "="*60)
     print("         BẮT ĐẦU CHẤM ĐIỂM TẤT CẢ FILE")
     print("="*60)
-    
-    # Xử lý từng file
-    for json_file in json_files:
-        print(f"\n📝 Đang xử lý: {json_file.name}")
-        print("-" * 40)
-        try:
-            main(str(json_file))
-            print(f"✅ Hoàn thành: {json_file.name}")
-        except Exception as e:
-            print(f"❌ Lỗi khi xử lý {json_file.name}: {e}")
-    
+
+    def _evaluate_one(name, digest):
+        print(f"\n📝 Đang xử lý: {name}")
+        if payloads is not None:
+            data = payloads[name]
+            try:
+                results, result_file = evaluate_to_sink(data, name, sink, mode=mode)
+            except ValueError as e:
+                raise RuntimeError(f"đầu vào không hợp lệ: {e}")
+            print_scoreboard(results)
+        else:
+            output_filepath = main(str(interview_logs_dir / name), mode=mode)
+            if not output_filepath:
+                raise RuntimeError("đầu vào không hợp lệ")
+            result_file = os.path.basename(output_filepath)
+            try:
+                with open(interview_logs_dir / name, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception:
+                data = {}
+        questions = len(data.get("responses", []) or [])
+        with manifest_lock:
+            manifest[name] = {
+                "sha256": digest,
+                "version": version,
+                "result_file": result_file,
+                "evaluated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            _save_manifest(manifest_path, manifest)
+        return questions
+
+    start = time.perf_counter()
+    done = failed = questions_total = 0
+    with ThreadPoolExecutor(max_workers=parallel) as pool:
+        futures = {pool.submit(_evaluate_one, name, digest): name for name, digest in pending}
+        for fut in as_completed(futures):
+            name = futures[fut]
+            try:
+                questions_total += fut.result()
+                done += 1
+                print(f"✅ Hoàn thành: {name} ({done + failed}/{len(pending)})")
+            except Exception as e:
+                failed += 1
+                print(f"❌ Lỗi khi xử lý {name}: {e}")
+    elapsed = time.perf_counter() - start
+
     print("\n" + "="*60)
     print("         KẾT THÚC CHẤM ĐIỂM TẤT CẢ FILE")
     print("="*60)
+    per_minute = 60.0 / elapsed if elapsed > 0 else 0.0
+    print(f"Đã chấm: {done} | lỗi: {failed} | bỏ qua (đã cập nhật): {skipped} | thời gian: {elapsed:.1f}s")
+    print(f"Thông lượng: {done * per_minute:.1f} log/phút, {questions_total * per_minute:.1f} câu/phút")
+    cache = get_score_cache()
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache điểm: {stats['hits']} hit / {stats['misses']} miss (hit rate {stats['hit_rate']:.0%})")
+    lanes = gemini_gateway.metrics().get("lanes", {})
+    background = lanes.get("background", {})
+    print(f"Gemini (làn background): {background.get('requests', 0)} request, "
+          f"chờ trung bình {background.get('avg_wait_ms', 0)}ms")
 
 if __name__ == "__main__":
-    process_all_interview_logs()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Chấm điểm tất cả interview log (kho SQLite cục bộ hoặc outputs/interview_logs)")
+    parser.add_argument("--parallel", type=int, default=None, help="Số log chấm đồng thời (mặc định EVAL_BATCH_PARALLEL)")
+    parser.add_argument("--force", action="store_true", help="Chấm lại cả những log đã có kết quả cập nhật")
+    parser.add_argument("--mode", choices=[EVAL_MODE_PER_QUESTION, EVAL_MODE_BATCH], default=None)
+    parser.add_argument("--clear-score-cache", action="store_true", help="Xoá cache kết quả chấm trước khi chạy")
+    args = parser.parse_args()
+    if args.clear_score_cache:
+        clear_score_cache()
+        print("🧹 Đã xoá cache kết quả chấm")
+    process_all_interview_logs(parallel=args.parallel, force=args.force, mode=args.mode)
\ No newline at end of file
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional
+
+_EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    event_key TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_key ON events(channel, event_key, id);
+"""
+
+
+class SharedEventLog:
+    """Nhật ký sự kiện dùng chung giữa nhiều process (SQLite, WAL) cho EventBroker.
+
+    Process publish ghi một dòng; mỗi process có một thread đọc các dòng mới của process khác
+    (theo id tăng dần, chu kỳ `poll_interval`) và phát cho subscriber cục bộ. Nhờ vậy client SSE
+    nối vào worker A vẫn nhận được tiến độ của job chạy ở worker B. Dòng cũ hơn
+    `retention_seconds` bị xoá dần. An toàn với fork: thread đọc được khởi động lại trong process con.
+    Nhiều broker có thể dùng chung một file, mỗi broker một `channel`.
+    """
+
+    def __init__(self, db_path: str, channel: str, poll_interval: float = 0.2, retention_seconds: float = 3600.0):
+        self.db_path = db_path
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self.origin = ''
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_EVENTS_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Khởi động thread đọc cho process hiện tại (idempotent; gọi lại sau fork thì chạy thread mới)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.origin = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+            with closing(self._connect()) as conn:
+                last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+            threading.Thread(target=self._poll_loop, args=(deliver, last_id, self.origin),
+                             name='shared-events', daemon=True).start()
+            self._pid = os.getpid()
+
+    def append(self, key: str, event: Dict[str, Any]) -> None:
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute('INSERT INTO events (channel, event_key, origin, payload, created_at) VALUES (?, ?, ?, ?, ?)',
+                             (self.channel, key, self.origin, json.dumps(event, ensure_ascii=False), time.time()))
+        except Exception as e:
+            print(f'[EVENTS] append failed: {e}')
+
+    def history(self, key: str) -> List[Dict[str, Any]]:
+        """Mọi sự kiện còn lưu của một key (cũ → mới), từ mọi process."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT payload FROM events WHERE channel = ? AND event_key = ? ORDER BY id',
+                                (self.channel, key)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def last(self, key: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT payload FROM events WHERE channel = ? AND event_key = ? ORDER BY id DESC LIMIT 1',
+                               (self.channel, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _poll_loop(self, deliver: Callable[[str, Dict[str, Any]], None], last_id: int, origin: str) -> None:
+        last_prune = 0.0
+        while self.origin == origin:
+            try:
+                with closing(self._connect()) as conn:
+                    rows = conn.execute('SELECT id, event_key, origin, payload FROM events '
+                                        'WHERE id > ? AND channel = ? ORDER BY id', (last_id, self.channel)).fetchall()
+                    now = time.time()
+                    if now - last_prune > 60:
+                        conn.execute('DELETE FROM events WHERE created_at < ?', (now - self.retention_seconds,))
+                        last_prune = now
+                for row_id, key, row_origin, payload in rows:
+                    last_id = row_id
+                    if row_origin != origin:
+                        deliver(key, json.loads(payload))
+            except Exception as e:
+                print(f'[EVENTS] poll failed: {e}')
+            time.sleep(self.poll_interval)
+
+
+class AsyncSubscription:
+    """Subscriber cho coroutine (chế độ ASGI): publish từ thread bất kỳ được chuyển vào
+    asyncio.Queue của event loop đã đăng ký."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def put(self, event: Dict[str, Any]) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:  # event loop đã đóng
+            pass
+
+    async def get(self, timeout: float) -> Dict[str, Any]:
+        """Như queue.Queue.get(timeout=...): hết giờ → queue.Empty."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            raise queue.Empty
+
+
+class EventBroker:
+    """In-process publish/subscribe keyed by a string (e.g. the log_file of a submission).
+
+    Subscribers get their own queue.Queue; the latest event per key is kept (bounded LRU)
+    so a client that connects mid-evaluation immediately sees the current progress.
+    With a SharedEventLog, events are also relayed between processes (multi-worker server).
+    """
+
+    def __init__(self, max_keys: int = 2000, shared: Optional[SharedEventLog] = None):
+        self.max_keys = max_keys
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[queue.Queue]] = {}
+        self._last: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _ensure_shared(self) -> None:
+        if self.shared is not None:
+            self.shared.start(self._deliver)
+
+    def subscribe(self, key: str) -> queue.Queue:
+        self._ensure_shared()
+        q: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(q)
+        return q
+
+    def subscribe_async(self, key: str) -> AsyncSubscription:
+        """Như subscribe nhưng cho coroutine; phải gọi bên trong event loop đang chạy."""
+        self._ensure_shared()
+        sub = AsyncSubscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(sub)  # type: ignore[arg-type]
+        return sub
+
+    def unsubscribe(self, key: str, q: Any) -> None:
+        with self._lock:
+            subs = self._subscribers.get(key)
+            if not subs:
+                return
+            try:
+                subs.remove(q)
+            except ValueError:
+                pass
+            if not subs:
+                self._subscribers.pop(key, None)
+
+    def publish(self, key: str, event: Dict[str, Any]) -> None:
+        if not key:
+            return
+        self._deliver(key, event)
+        if self.shared is not None:
+            self._ensure_shared()
+            self.shared.append(key, event)
+
+    def _deliver(self, key: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self._last[key] = event
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_keys:
+                self._last.popitem(last=False)
+            subs = list(self._subscribers.get(key, ()))
+        for q in subs:
+            q.put(event)
+
+    def last(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            event = self._last.get(key)
+        if event is None and self.shared is not None:
+            event = self.shared.last(key)
+        return event
+
+    def history(self, key: str) -> List[Dict[str, Any]]:
+        """Sự kiện đã phát của key ở mọi process (chỉ khi có SharedEventLog)."""
+        return self.shared.history(key) if self.shared is not None else []
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(v) for v in self._subscribers.values())
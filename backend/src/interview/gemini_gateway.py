@@ -0,0 +1,409 @@
+import asyncio
+import heapq
+import itertools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Tuple
+
+# Làn ưu tiên: số nhỏ hơn được phục vụ trước
+PRIORITY_INTERACTIVE = 0  # sinh câu hỏi khi ứng viên đang chờ trên trang upload
+PRIORITY_BACKGROUND = 1   # chấm điểm nền
+_LANE_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_BACKGROUND: 'background'}
+
+# Caller async không nhận notify của Condition → kiểm tra lại lượt của mình theo chu kỳ này
+ASYNC_POLL_SECONDS = 0.05
+
+# Ước lượng token cho ảnh đính kèm (Gemini tính ~258 token/ảnh)
+_IMAGE_TOKEN_ESTIMATE = 258
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `per_minute` tokens per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        missing = amount - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class LocalQuota:
+    """RPM + TPM budgets of this process (two TokenBuckets); not thread-safe, callers hold the gateway lock."""
+
+    shared = False
+
+    def __init__(self, rpm: float, tpm: float):
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.rpm_limit = self._requests.capacity
+        self.tpm_limit = self._tokens.capacity
+
+    def try_take(self, cost: float) -> float:
+        """0 = đã trừ 1 request + `cost` token; >0 = số giây cần chờ."""
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        delay = max(self._requests.time_until(1), self._tokens.time_until(cost))
+        if delay <= 0:
+            self._requests.take(1)
+            self._tokens.take(cost)
+            return 0.0
+        return delay
+
+    def charge_tokens(self, amount: float) -> None:
+        self._tokens.take(amount)
+
+    def drain_requests(self) -> None:
+        self._requests.drain()
+
+    def available(self) -> Tuple[float, float]:
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        return self._requests.tokens, self._tokens.tokens
+
+
+_QUOTA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class SharedQuota:
+    """RPM + TPM budgets stored in SQLite so every worker process draws from one server-wide quota.
+
+    Same interface as LocalQuota. Each operation refills and updates both buckets inside one
+    `BEGIN IMMEDIATE` transaction (wall-clock time, since the buckets are shared across processes),
+    so concurrent workers never spend the same tokens twice. Priority ordering still applies within
+    a process; across processes requests are served as their head-of-line callers reach the buckets.
+    Operations do disk I/O (up to the 30 s busy timeout), so the gateway calls them outside its lock
+    and, from async callers, in a worker thread.
+    """
+
+    shared = True
+
+    def __init__(self, db_path: str, rpm: float, tpm: float):
+        self.db_path = db_path
+        self.rpm_limit = float(rpm)
+        self.tpm_limit = float(tpm)
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_QUOTA_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def _update(self, change) -> Any:
+        """change(levels) -> (new_levels, result); levels = {'requests': x, 'tokens': y} đã nạp lại tới hiện tại."""
+        limits = {'requests': self.rpm_limit, 'tokens': self.tpm_limit}
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                rows = {r[0]: (r[1], r[2]) for r in conn.execute('SELECT name, tokens, updated FROM buckets')}
+                levels = {}
+                for name, limit in limits.items():
+                    tokens, updated = rows.get(name, (limit, now))
+                    levels[name] = min(limit, tokens + max(0.0, now - updated) * limit / 60.0)
+                new_levels, result = change(levels)
+                for name, tokens in new_levels.items():
+                    conn.execute('INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                                 (name, tokens, now))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return result
+
+    def try_take(self, cost: float) -> float:
+        def change(levels):
+            delay = max((1 - levels['requests']) * 60.0 / self.rpm_limit,
+                        (cost - levels['tokens']) * 60.0 / self.tpm_limit, 0.0)
+            if delay > 0:
+                return levels, delay
+            return {'requests': levels['requests'] - 1, 'tokens': levels['tokens'] - cost}, 0.0
+        return self._update(change)
+
+    def charge_tokens(self, amount: float) -> None:
+        self._update(lambda levels: (dict(levels, tokens=levels['tokens'] - amount), None))
+
+    def drain_requests(self) -> None:
+        self._update(lambda levels: (dict(levels, requests=min(levels['requests'], 0.0)), None))
+
+    def available(self) -> Tuple[float, float]:
+        return self._update(lambda levels: (levels, (levels['requests'], levels['tokens'])))
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    return type(exc).__name__ in ('ResourceExhausted', 'TooManyRequests') or '429' in str(exc)
+
+
+def estimate_tokens(contents: Any, max_output_tokens: int = 0) -> int:
+    """Rough token estimate (~4 chars/token) for prompt + expected output."""
+    parts = contents if isinstance(contents, (list, tuple)) else [contents]
+    total = 0
+    for part in parts:
+        if isinstance(part, str):
+            total += len(part) // 4 + 1
+        else:
+            total += _IMAGE_TOKEN_ESTIMATE
+    return total + max_output_tokens
+
+
+class GeminiGateway:
+    """Process-wide scheduler in front of every Gemini `generate_content` call.
+
+    Enforces requests-per-minute and tokens-per-minute budgets with two token buckets, kept in
+    this process (LocalQuota) or, with `quota_db`, in SQLite shared by every worker process of
+    the server (SharedQuota). Waiting callers are served strictly by (priority, arrival order), so interactive
+    requests overtake queued background scoring. A 429 from the server drains the
+    request bucket and the call is retried through the scheduler.
+    """
+
+    def __init__(self, rpm: float, tpm: float, expected_output_tokens: int = 1024, max_retries: int = 2,
+                 quota_db: Optional[str] = None):
+        self._quota = SharedQuota(quota_db, rpm, tpm) if quota_db else LocalQuota(rpm, tpm)
+        self.expected_output_tokens = expected_output_tokens
+        self.max_retries = max_retries
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._depth: Dict[int, int] = {p: 0 for p in _LANE_NAMES}
+        self._stats: Dict[int, Dict[str, float]] = {
+            p: {'requests': 0, 'rate_limited': 0, 'wait_total': 0.0, 'wait_max': 0.0} for p in _LANE_NAMES
+        }
+
+    def _enqueue(self, priority: int) -> Tuple[int, int]:
+        ticket = (priority, next(self._seq))
+        heapq.heappush(self._waiting, ticket)
+        self._depth[priority] = self._depth.get(priority, 0) + 1
+        return ticket
+
+    def _quota_call(self, method: str, *args: Any) -> Any:
+        """Gọi một thao tác của quota: LocalQuota dưới lock; SharedQuota (I/O SQLite) ngoài lock."""
+        if self._quota.shared:
+            return getattr(self._quota, method)(*args)
+        with self._cond:
+            return getattr(self._quota, method)(*args)
+
+    async def _quota_call_async(self, method: str, *args: Any) -> Any:
+        """Như _quota_call nhưng I/O của SharedQuota chạy trên thread pool, không chặn event loop."""
+        if self._quota.shared:
+            return await asyncio.to_thread(getattr(self._quota, method), *args)
+        return self._quota_call(method, *args)
+
+    def _leave(self, ticket: Tuple[int, int], start: float) -> float:
+        """Gọi khi giữ lock: rời hàng đợi (kể cả khi bị ngắt), đánh thức người kế tiếp, ghi thống kê."""
+        priority = ticket[0]
+        self._waiting.remove(ticket)
+        heapq.heapify(self._waiting)
+        self._depth[priority] -= 1
+        self._cond.notify_all()
+        waited = time.monotonic() - start
+        stats = self._stats.setdefault(priority, {'requests': 0, 'rate_limited': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        stats['requests'] += 1
+        stats['wait_total'] += waited
+        stats['wait_max'] = max(stats['wait_max'], waited)
+        return waited
+
+    def _acquire(self, cost: float, priority: int) -> float:
+        cost = min(cost, self._quota.tpm_limit)
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    # Chưa tới lượt → chờ notify (kiểm tra và chờ trong cùng một lần giữ lock)
+                    while self._waiting[0] != ticket:
+                        self._cond.wait()
+                # 0 = đã lấy được quota; >0 = chờ bucket nạp lại
+                delay = self._quota_call('try_take', cost)
+                if delay == 0.0:
+                    break
+                with self._cond:
+                    self._cond.wait(delay)
+        finally:
+            with self._cond:
+                waited = self._leave(ticket, start)
+        return waited
+
+    async def _acquire_async(self, cost: float, priority: int) -> float:
+        """Như _acquire nhưng chờ bằng asyncio.sleep (không chiếm thread của event loop).
+
+        Dùng chung hàng đợi ưu tiên với caller đồng bộ; caller async không nhận được notify của
+        Condition nên khi chưa tới lượt thì kiểm tra lại sau ASYNC_POLL_SECONDS.
+        """
+        cost = min(cost, self._quota.tpm_limit)
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._enqueue(priority)
+        try:
+            while True:
+                with self._cond:
+                    head = self._waiting[0] == ticket
+                delay = await self._quota_call_async('try_take', cost) if head else None
+                if delay == 0.0:
+                    break
+                await asyncio.sleep(ASYNC_POLL_SECONDS if delay is None else min(delay, 1.0))
+        finally:
+            with self._cond:
+                waited = self._leave(ticket, start)
+        return waited
+
+    @staticmethod
+    def _overrun(estimated: float, response: Any) -> float:
+        """Phần token thực tế vượt ước lượng (usage_metadata từ server), 0 nếu không có."""
+        try:
+            usage = getattr(response, 'usage_metadata', None)
+        except Exception:
+            return 0
+        actual = getattr(usage, 'total_token_count', None) if usage is not None else None
+        if not isinstance(actual, int) or actual <= estimated:
+            return 0
+        return actual - estimated
+
+    def _settle(self, estimated: float, response: Any) -> None:
+        """Trừ thêm phần token thực tế vượt ước lượng."""
+        extra = self._overrun(estimated, response)
+        if extra:
+            try:
+                self._quota_call('charge_tokens', extra)
+            except Exception as e:
+                print(f"[GEMINI] không cập nhật được quota token: {e}")
+
+    async def _settle_async(self, estimated: float, response: Any) -> None:
+        extra = self._overrun(estimated, response)
+        if extra:
+            try:
+                await self._quota_call_async('charge_tokens', extra)
+            except Exception as e:
+                print(f"[GEMINI] không cập nhật được quota token: {e}")
+
+    def generate_content(self, model: Any, contents: Any, priority: int = PRIORITY_BACKGROUND, **kwargs: Any) -> Any:
+        estimated = estimate_tokens(contents, self.expected_output_tokens)
+        attempt = 0
+        while True:
+            self._acquire(estimated, priority)
+            try:
+                response = model.generate_content(contents, **kwargs)
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                try:
+                    self._quota_call('drain_requests')
+                except Exception as drain_error:
+                    print(f"[GEMINI] không cập nhật được quota request: {drain_error}")
+                self._on_rate_limited(priority, attempt)
+                continue
+            if not kwargs.get('stream'):
+                # Response streaming chỉ có usage_metadata sau khi đọc hết → bỏ qua bước settle
+                self._settle(estimated, response)
+            return response
+
+    async def generate_content_async(self, model: Any, contents: Any, priority: int = PRIORITY_BACKGROUND,
+                                     **kwargs: Any) -> Any:
+        """Bản async (model.generate_content_async) cho chế độ ASGI; cùng quota và hàng đợi ưu tiên."""
+        estimated = estimate_tokens(contents, self.expected_output_tokens)
+        attempt = 0
+        while True:
+            await self._acquire_async(estimated, priority)
+            try:
+                response = await model.generate_content_async(contents, **kwargs)
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                try:
+                    await self._quota_call_async('drain_requests')
+                except Exception as drain_error:
+                    print(f"[GEMINI] không cập nhật được quota request: {drain_error}")
+                self._on_rate_limited(priority, attempt)
+                continue
+            if not kwargs.get('stream'):
+                await self._settle_async(estimated, response)
+            return response
+
+    def _on_rate_limited(self, priority: int, attempt: int) -> None:
+        """Gọi sau khi đã xả bucket request (429): ghi thống kê, đánh thức caller đang chờ."""
+        with self._cond:
+            self._stats[priority]['rate_limited'] += 1
+            self._cond.notify_all()
+        print(f"[GEMINI] 429 ({_LANE_NAMES.get(priority, priority)}), thử lại lần {attempt}...")
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            lanes = {}
+            for p, name in _LANE_NAMES.items():
+                st = self._stats.get(p, {})
+                n = st.get('requests', 0) or 0
+                lanes[name] = {
+                    'queue_depth': self._depth.get(p, 0),
+                    'requests': int(n),
+                    'rate_limited': int(st.get('rate_limited', 0)),
+                    'avg_wait_ms': round(st.get('wait_total', 0.0) / n * 1000, 1) if n else 0.0,
+                    'max_wait_ms': round(st.get('wait_max', 0.0) * 1000, 1),
+                }
+        requests_available, tokens_available = self._quota_call('available')
+        return {
+            'rpm_limit': self._quota.rpm_limit,
+            'tpm_limit': self._quota.tpm_limit,
+            'shared': self._quota.shared,
+            'requests_available': round(requests_available, 2),
+            'tokens_available': round(tokens_available, 0),
+            'lanes': lanes,
+        }
+
+
+_gateway: Optional[GeminiGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> GeminiGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = GeminiGateway(
+                    rpm=float(os.getenv('GEMINI_RPM', '60')),
+                    tpm=float(os.getenv('GEMINI_TPM', '1000000')),
+                    expected_output_tokens=int(os.getenv('GEMINI_EXPECTED_OUTPUT_TOKENS', '1024')),
+                    max_retries=int(os.getenv('GEMINI_429_RETRIES', '2')),
+                    quota_db=os.getenv('GEMINI_QUOTA_DB') or None,
+                )
+    return _gateway
+
+
+def generate_content(model: Any, contents: Any, priority: int = PRIORITY_BACKGROUND, **kwargs: Any) -> Any:
+    """Gọi model.generate_content thông qua gateway dùng chung của process."""
+    return get_gateway().generate_content(model, contents, priority=priority, **kwargs)
+
+
+async def generate_content_async(model: Any, contents: Any, priority: int = PRIORITY_BACKGROUND, **kwargs: Any) -> Any:
+    return await get_gateway().generate_content_async(model, contents, priority=priority, **kwargs)
+
+
+def metrics() -> Dict[str, Any]:
+    return get_gateway().metrics()
@@ -1,26 +1,38 @@
 import argparse
+import asyncio
+import hashlib
 import json
 import os
 import re
+import threading
+import unicodedata
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Generator, Iterator, List, Optional, Set, Tuple
 
-import google.generativeai as genai
 from dotenv import load_dotenv
-from PIL import Image
-import pytesseract
 
 try:
-	from pypdf import PdfReader
-except Exception:  # pragma: no cover
-	PdfReader = None  # type: ignore
+	from interview import gemini_gateway, pdf_ocr, question_bank, vector_index
+	from interview.disk_cache import DiskCache
+	from interview.lazy_import import is_available, lazy_module, preload
+except ImportError:  # chạy trực tiếp như script từ src/interview
+	import gemini_gateway  # type: ignore
+	import pdf_ocr  # type: ignore
+	import question_bank  # type: ignore
+	import vector_index  # type: ignore
+	from disk_cache import DiskCache  # type: ignore
+	from lazy_import import is_available, lazy_module, preload  # type: ignore
+
+# SDK/thư viện nặng chỉ được import khi dùng lần đầu (hoặc trong warmup), không lúc import module
+genai = lazy_module("google.generativeai")
+Image = lazy_module("PIL.Image")
+pytesseract = lazy_module("pytesseract")
+pypdf = lazy_module("pypdf")
+PYPDF_AVAILABLE = is_available("pypdf")
 
 # Optional PDF->image OCR fallback if pdf2image is installed
-try:
-	from pdf2image import convert_from_path  # type: ignore
-	PDF2IMAGE_AVAILABLE = True
-except Exception:
-	PDF2IMAGE_AVAILABLE = False
+PDF2IMAGE_AVAILABLE = pdf_ocr.PDF2IMAGE_AVAILABLE
 
 
 TEXT_MODEL_CANDIDATES = [
@@ -39,10 +51,75 @@ def read_env() -> None:
 	genai.configure(api_key=api_key)
 
 
-def pick_supported_model(preferences: List[str]) -> Optional[str]:
+# Cache danh sách model hỗ trợ generateContent (dùng chung cho mọi thread trong process).
+# genai.list_models() là một round trip mạng → chỉ gọi khi warm lúc khởi động hoặc refresh nền khi hết TTL.
+MODEL_CACHE_TTL_SECONDS = float(os.getenv("GEMINI_MODEL_CACHE_TTL", "3600"))
+_model_cache_lock = threading.Lock()
+_available_models: Optional[Set[str]] = None  # giá trị tốt gần nhất (last known-good)
+_available_models_at = 0.0
+_model_refresh_running = False
+# list_models lỗi (Gemini down): không thử lại trước _model_retry_at; backoff gấp đôi mỗi lần, tối đa TTL
+MODEL_CACHE_RETRY_SECONDS = float(os.getenv("GEMINI_MODEL_CACHE_RETRY", "30"))
+_model_refresh_failures = 0
+_model_retry_at = 0.0
+
+
+def refresh_model_cache() -> bool:
+	"""Gọi genai.list_models() và cập nhật cache. Lỗi → giữ nguyên giá trị cũ và lùi lần thử tiếp theo."""
+	global _available_models, _available_models_at, _model_refresh_failures, _model_retry_at
 	try:
 		models = list(genai.list_models())
 		available = {m.name for m in models if getattr(m, "supported_generation_methods", None) and "generateContent" in m.supported_generation_methods}
+	except Exception as e:
+		with _model_cache_lock:
+			delay = min(MODEL_CACHE_TTL_SECONDS, MODEL_CACHE_RETRY_SECONDS * (2 ** _model_refresh_failures))
+			_model_refresh_failures += 1
+			_model_retry_at = time.monotonic() + delay
+		print(f"[GEMINI] list_models failed, keeping last known-good model list (retry in {delay:.0f}s): {e}")
+		return False
+	with _model_cache_lock:
+		_available_models = available
+		_available_models_at = time.monotonic()
+		_model_refresh_failures = 0
+		_model_retry_at = 0.0
+	return True
+
+
+def _refresh_model_cache_in_background() -> None:
+	global _model_refresh_running
+	with _model_cache_lock:
+		if _model_refresh_running:
+			return
+		_model_refresh_running = True
+
+	def _run() -> None:
+		global _model_refresh_running
+		try:
+			refresh_model_cache()
+		finally:
+			with _model_cache_lock:
+				_model_refresh_running = False
+
+	threading.Thread(target=_run, name="gemini-model-cache", daemon=True).start()
+
+
+def warm_model_cache(background: bool = False) -> None:
+	"""Warm cache một lần lúc khởi động (cần genai.configure trước, xem read_env)."""
+	if background:
+		_refresh_model_cache_in_background()
+	else:
+		refresh_model_cache()
+
+
+def pick_supported_model(preferences: List[str]) -> Optional[str]:
+	with _model_cache_lock:
+		available = _available_models
+		now = time.monotonic()
+		stale = (available is None or (now - _available_models_at) > MODEL_CACHE_TTL_SECONDS) and now >= _model_retry_at
+	# Không chặn request: cache trống/hết hạn thì refresh nền (trừ khi đang backoff sau lỗi) và dùng giá trị hiện có
+	if stale:
+		_refresh_model_cache_in_background()
+	if available:
 		for cand in preferences:
 			# Some SDKs return names prefixed with "models/"
 			if cand in available:
@@ -50,52 +127,126 @@ def pick_supported_model(preferences: List[str]) -> Optional[str]:
 			prefixed = f"models/{cand}"
 			if prefixed in available:
 				return prefixed
-	except Exception:
-		pass
 	# Fallback to first preference (will let server validate)
 	return preferences[0] if preferences else None
 
 
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif"}
+
+# Cache kết quả trích xuất text (PDF/OCR) theo SHA-256 nội dung file + thiết lập OCR (DPI, số trang,
+# ngôn ngữ): upload lại cùng một CV thì bỏ qua hoàn toàn bước parse/OCR. Giới hạn dung lượng, xoá theo LRU.
+CV_TEXT_CACHE_MAX_MB = float(os.getenv("CV_TEXT_CACHE_MAX_MB", "256"))
+_cv_text_cache: Optional[DiskCache] = None
+_cv_text_cache_lock = threading.Lock()
+
+
+def get_cv_text_cache() -> Optional[DiskCache]:
+	"""DiskCache dùng chung; None nếu bị tắt (CV_TEXT_CACHE_MAX_MB=0)."""
+	global _cv_text_cache
+	if CV_TEXT_CACHE_MAX_MB <= 0:
+		return None
+	if _cv_text_cache is None:
+		with _cv_text_cache_lock:
+			if _cv_text_cache is None:
+				default_path = Path(__file__).parent.parent.parent / "cache" / "cv_text.sqlite3"
+				_cv_text_cache = DiskCache(
+					os.getenv("CV_TEXT_CACHE_PATH", str(default_path)),
+					max_bytes=int(CV_TEXT_CACHE_MAX_MB * 1024 * 1024),
+				)
+	return _cv_text_cache
+
+
+def file_sha256(path: Path) -> str:
+	h = hashlib.sha256()
+	with open(path, "rb") as f:
+		for block in iter(lambda: f.read(1024 * 1024), b""):
+			h.update(block)
+	return h.hexdigest()
+
+
 def ocr_image(image_path: Path) -> str:
 	try:
 		with Image.open(image_path) as img:
-			return pytesseract.image_to_string(img)
+			return pdf_ocr.image_to_string(img)
 	except pytesseract.TesseractNotFoundError:
 		return ""
 
 
-def extract_text_from_pdf(pdf_path: Path) -> str:
+def _extract_pdf_text_with_method(pdf_path: Path) -> Tuple[str, str]:
+	"""Trả về (text, method) với method là 'pypdf', 'ocr' hoặc 'none'."""
 	text_chunks: List[str] = []
-	if PdfReader is not None:
+	method = "none"
+	page_count = 0
+	if PYPDF_AVAILABLE:
 		try:
-			reader = PdfReader(str(pdf_path))
+			reader = pypdf.PdfReader(str(pdf_path))
+			page_count = len(reader.pages)
 			for page in reader.pages:
 				page_text = page.extract_text() or ""
 				if page_text.strip():
 					text_chunks.append(page_text)
 		except Exception:
 			pass
-	if not any(chunk.strip() for chunk in text_chunks) and PDF2IMAGE_AVAILABLE:
+	if any(chunk.strip() for chunk in text_chunks):
+		method = "pypdf"
+	elif PDF2IMAGE_AVAILABLE:
+		# OCR từng trang trên process pool (rasterize lần lượt, giới hạn DPI/số trang), ghép theo thứ tự trang
 		try:
-			images = convert_from_path(str(pdf_path))
-			for img in images:
-				text = pytesseract.image_to_string(img)
+			for text in pdf_ocr.ocr_pdf(str(pdf_path), page_count=page_count or None):
 				if text.strip():
 					text_chunks.append(text)
 		except Exception:
 			pass
-	return "\n\n".join(t.strip() for t in text_chunks if t.strip())
+		if text_chunks:
+			method = "ocr"
+	return "\n\n".join(t.strip() for t in text_chunks if t.strip()), method
 
 
-def extract_text_from_cv(path: Path) -> str:
+def _extract_cv_text_with_method(path: Path) -> Tuple[str, str]:
 	suffix = path.suffix.lower()
-	if suffix in {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif"}:
-		return ocr_image(path)
+	if suffix in IMAGE_SUFFIXES:
+		text = ocr_image(path)
+		return text, ("ocr" if text.strip() else "none")
 	if suffix == ".pdf":
-		return extract_text_from_pdf(path)
+		return _extract_pdf_text_with_method(path)
 	raise ValueError(f"Unsupported file type: {suffix}")
 
 
+def _cached_extract(path: Path, extractor: Callable[[Path], Tuple[str, str]]) -> str:
+	cache = get_cv_text_cache()
+	if cache is None:
+		return extractor(path)[0]
+	try:
+		digest = file_sha256(path)
+		key = f"{digest}:{pdf_ocr.ocr_settings()}"
+		hit = cache.get_entry(key)
+	except Exception as e:
+		print(f"[CV_CACHE] lookup failed: {e}")
+		return extractor(path)[0]
+	if hit is not None:
+		print(f"[CV_CACHE] hit {digest[:12]} ({hit['meta'].get('method')})")
+		return hit["value"]
+	text, method = extractor(path)
+	# Không cache kết quả rỗng (VD: chưa cài Tesseract) để lần sau còn thử lại
+	if text.strip():
+		try:
+			cache.set(key, text, meta={"method": method, "source_name": path.name, "chars": len(text)})
+		except Exception as e:
+			print(f"[CV_CACHE] store failed: {e}")
+	return text
+
+
+def extract_text_from_pdf(pdf_path: Path) -> str:
+	return _cached_extract(pdf_path, _extract_pdf_text_with_method)
+
+
+def extract_text_from_cv(path: Path) -> str:
+	suffix = path.suffix.lower()
+	if suffix not in IMAGE_SUFFIXES and suffix != ".pdf":
+		raise ValueError(f"Unsupported file type: {suffix}")
+	return _cached_extract(path, _extract_cv_text_with_method)
+
+
 SYSTEM_PROMPT = (
 	"You are a professional HR interviewer.\n\n"
 	"Given the following candidate CV:\n\n[CV_TEXT]\n\n"
@@ -145,9 +296,45 @@ SYSTEM_PROMPT = (
 )
 
 
-def build_prompt(cv_text: str, job_title: str, level: str, jd_text: Optional[str] = None) -> str:
+# Khi opening/behavioral/creative lấy từ question bank: Gemini chỉ sinh các slot phụ thuộc CV
+CV_SLOT_CATEGORIES = ("technical", "cv_based")
+CV_SLOTS_PROMPT = (
+	"You are a professional HR interviewer.\n\n"
+	"Given the following candidate CV:\n\n[CV_TEXT]\n\n"
+	"And the target job position: [JOB_TITLE]\n\n"
+	"And the candidate seniority level: [LEVEL]\n\n"
+	"Generate exactly 5 interview questions in structured JSON format:\n"
+	"- 3 technical questions tailored to the job AND the candidate level (e.g., Intern/Fresher: fundamentals; Junior: practical basics; Senior: architecture, trade-offs, scaling; Lead: leadership, design, strategy). Prioritize topics that match skills/technologies explicitly present in the CV when they are relevant to the job.\n"
+	"- 2 questions specifically about the candidate's past projects or experience mentioned in their CV\n\n"
+	"Ensure each question has:\n"
+	"- id: sequential number (1-5)\n"
+	"- question: the actual interview question\n"
+	"- category: 'technical' or 'cv_based'\n"
+	"- purpose: brief explanation of what this question aims to assess\n"
+	"Also include for technical items a 'focus' field summarizing the specific technology/topic (e.g., SQL, data modeling, REST, concurrency).\n"
+	"Return only the JSON array, for example:\n"
+	"[\n"
+	"  {\n"
+	"    \"id\": 1,\n"
+	"    \"question\": \"When working on [JOB_TITLE] tasks at a [LEVEL] level, how would you design a normalized schema to track orders and customers, and when would denormalization be appropriate?\",\n"
+	"    \"category\": \"technical\",\n"
+	"    \"purpose\": \"Evaluate technical depth appropriate to level and role, and ability to reason about trade-offs\",\n"
+	"    \"focus\": \"SQL/data modeling\"\n"
+	"  },\n"
+	"  {\n"
+	"    \"id\": 2,\n"
+	"    \"question\": \"Can you walk me through your experience with the project mentioned in your CV?\",\n"
+	"    \"category\": \"cv_based\",\n"
+	"    \"purpose\": \"Understand specific project experience and achievements\"\n"
+	"  }\n"
+	"]\n\n"
+)
+
+
+def build_prompt(cv_text: str, job_title: str, level: str, jd_text: Optional[str] = None,
+		past_questions: Optional[List[str]] = None, template: str = SYSTEM_PROMPT) -> str:
     base = (
-        SYSTEM_PROMPT
+        template
             .replace("[CV_TEXT]", cv_text.strip()[:40000])
             .replace("[JOB_TITLE]", job_title)
             .replace("[LEVEL]", level)
@@ -159,19 +346,118 @@ def build_prompt(cv_text: str, job_title: str, level: str, jd_text: Optional[str
             "[JD_TEXT]\n\n"
         )
         base = base + extra.replace("[JD_TEXT]", jd_text.strip()[:20000])
+    if past_questions:
+        extra = (
+            "\nThese questions were already asked in similar past interviews. Do not repeat them verbatim; "
+            "prefer fresh questions grounded in this CV, or clearly rephrased variants:\n"
+        )
+        base = base + extra + "\n".join(f"- {q}" for q in past_questions) + "\n"
     return base
 
 
+# Số câu hỏi cũ gần nhất (vector index) đưa vào prompt để tránh lặp; 0 = tắt
+QUESTION_SEED_K = int(os.getenv("QUESTION_SEED_K", "8"))
+
+
+def similar_past_questions(cv_text: str, job_title: str, level: str, k: Optional[int] = None,
+		exclude_source: Optional[str] = None) -> List[str]:
+	"""Câu hỏi đã sinh trước đây gần nhất với CV/vị trí; [] nếu index không khả dụng."""
+	k = QUESTION_SEED_K if k is None else k
+	index = vector_index.get_vector_index()
+	if index is None or k <= 0:
+		return []
+	try:
+		hits = index.similar_questions(f"{job_title} {canonical_level(level)}\n{cv_text[:2000]}", k=k,
+			exclude_source=exclude_source)
+	except Exception as e:
+		print(f"[VECTOR] similar questions lookup failed: {e}")
+		return []
+	out: List[str] = []
+	seen: Set[str] = set()
+	for hit in hits:
+		norm = _normalize_text(hit.get("text"))
+		if norm and norm not in seen:
+			seen.add(norm)
+			out.append(hit["text"])
+	return out
+
+
+def _index_questions_in_background(path: Path, job_title: str, level: str) -> None:
+	index = vector_index.get_vector_index()
+	if index is None or not vector_index.can_write():
+		return  # worker khác giữ quyền ghi index: file được index ở lượt sync kế tiếp của leader
+
+	def _run() -> None:
+		try:
+			index.index_questions_file(path, meta={"job_title": job_title, "level": canonical_level(level)})
+		except Exception as e:
+			print(f"[VECTOR] index {path.name} failed: {e}")
+
+	threading.Thread(target=_run, name="vector-index-questions", daemon=True).start()
+
+
+# GenerativeModel dùng lại giữa các request: client (kết nối gRPC) được tạo một lần cho mỗi model/process
+_model_handles: Dict[str, "genai.GenerativeModel"] = {}
+
+
+def _model_handle(candidates: List[str]) -> "genai.GenerativeModel":
+	model_name = pick_supported_model(candidates) or candidates[0]
+	handle = _model_handles.get(model_name)
+	if handle is None:
+		handle = _model_handles.setdefault(model_name, genai.GenerativeModel(model_name))
+	return handle
+
+
+def warm_gemini_models(background: bool = False) -> None:
+	"""Warm danh sách model rồi tạo sẵn handle cho model text/vision (gọi trong mỗi worker process)."""
+	def _run() -> None:
+		refresh_model_cache()
+		_model_handle(TEXT_MODEL_CANDIDATES)
+		_model_handle(VISION_MODEL_CANDIDATES)
+
+	if background:
+		threading.Thread(target=_run, name="gemini-warm", daemon=True).start()
+	else:
+		_run()
+
+
+def warm_imports() -> Dict[str, float]:
+	"""Import trước các thư viện nặng của pipeline sinh câu hỏi → thời gian import từng module (giây)."""
+	modules = [genai, Image, pytesseract]
+	if PYPDF_AVAILABLE:
+		modules.append(pypdf)
+	if PDF2IMAGE_AVAILABLE:
+		modules.append(pdf_ocr.pdf2image)
+	return preload(modules)
+
+
+def reset_gemini_clients() -> None:
+	"""Sau fork: bỏ handle/kết nối kế thừa từ process cha; SDK chưa import thì được cấu hình khi dùng lần đầu."""
+	_model_handles.clear()
+	if genai.loaded:
+		read_env()
+
+
 def call_gemini_text(prompt: str) -> str:
-	model_name = pick_supported_model(TEXT_MODEL_CANDIDATES) or TEXT_MODEL_CANDIDATES[0]
-	model = genai.GenerativeModel(model_name)
-	response = model.generate_content(prompt)
+	model = _model_handle(TEXT_MODEL_CANDIDATES)
+	response = gemini_gateway.generate_content(model, prompt, priority=gemini_gateway.PRIORITY_INTERACTIVE)
 	return response.text or ""
 
 
-def call_gemini_with_image(image_path: Path, job_title: str, level: str) -> str:
-	model_name = pick_supported_model(VISION_MODEL_CANDIDATES) or VISION_MODEL_CANDIDATES[0]
-	model = genai.GenerativeModel(model_name)
+def stream_gemini_text(prompt: str) -> Iterator[str]:
+	"""Như call_gemini_text nhưng trả về từng đoạn text ngay khi server gửi tới."""
+	model = _model_handle(TEXT_MODEL_CANDIDATES)
+	response = gemini_gateway.generate_content(model, prompt, priority=gemini_gateway.PRIORITY_INTERACTIVE, stream=True)
+	for chunk in response:
+		try:
+			text = chunk.text
+		except Exception:  # chunk không có part text (vd. chỉ có safety metadata)
+			continue
+		if text:
+			yield text
+
+
+def _image_instruction(job_title: str, level: str) -> str:
 	instruction = (
 		"You are a professional HR interviewer. Given the following CV image and the target job position and level: "
 		f"{job_title} at {level} level. "
@@ -217,11 +503,44 @@ def call_gemini_with_image(image_path: Path, job_title: str, level: str) -> str:
 		"  }\n"
 		"]\n\n"
 	)
+	return instruction.replace("[JOB_TITLE]", job_title).replace("[LEVEL]", level)
+
+
+def call_gemini_with_image(image_path: Path, job_title: str, level: str) -> str:
+	model = _model_handle(VISION_MODEL_CANDIDATES)
 	with Image.open(image_path) as img:
-		response = model.generate_content([instruction.replace("[JOB_TITLE]", job_title).replace("[LEVEL]", level), img])
+		response = gemini_gateway.generate_content(
+			model,
+			[_image_instruction(job_title, level), img],
+			priority=gemini_gateway.PRIORITY_INTERACTIVE,
+		)
+	return response.text or ""
+
+
+async def call_gemini_text_async(prompt: str) -> str:
+	"""Như call_gemini_text nhưng không chặn thread (chế độ ASGI)."""
+	model = _model_handle(TEXT_MODEL_CANDIDATES)
+	response = await gemini_gateway.generate_content_async(model, prompt, priority=gemini_gateway.PRIORITY_INTERACTIVE)
 	return response.text or ""
 
 
+async def call_gemini_with_image_async(image_path: Path, job_title: str, level: str) -> str:
+	model = _model_handle(VISION_MODEL_CANDIDATES)
+	img = await asyncio.to_thread(_load_image, image_path)
+	response = await gemini_gateway.generate_content_async(
+		model,
+		[_image_instruction(job_title, level), img],
+		priority=gemini_gateway.PRIORITY_INTERACTIVE,
+	)
+	return response.text or ""
+
+
+def _load_image(image_path: Path) -> "Image.Image":
+	with Image.open(image_path) as img:
+		img.load()
+		return img.copy()
+
+
 def try_parse_json(s: str) -> Optional[List[dict]]:
 	try:
 		return json.loads(s)
@@ -242,29 +561,437 @@ def try_parse_json(s: str) -> Optional[List[dict]]:
 	return None
 
 
-def process_file(file_path: Path, job_title: str, level: str, out_dir: Path, jd_text: Optional[str] = None) -> None:
-	print(f"Processing: {file_path}")
-	cv_text = extract_text_from_cv(file_path)
-	prompt: Optional[str] = None
-	raw: str = ""
+class IncrementalJsonArrayParser:
+	"""Tách các object của mảng JSON cấp ngoài cùng ngay khi từng object khép lại.
+
+	Bỏ qua phần mở đầu (lời dẫn, ```json) tới dấu `[` đầu tiên; theo dõi độ sâu ngoặc
+	nhọn, chuỗi và ký tự escape để không bị đánh lừa bởi `{`/`}` nằm trong chuỗi.
+	"""
+
+	def __init__(self) -> None:
+		self._buf = ""
+		self._pos = 0
+		self._started = False
+		self._finished = False
+		self._depth = 0
+		self._in_string = False
+		self._escaped = False
+		self._obj_start: Optional[int] = None
+
+	def feed(self, chunk: str) -> List[dict]:
+		items: List[dict] = []
+		if self._finished:
+			return items
+		self._buf += chunk
+		buf = self._buf
+		i = self._pos
+		while i < len(buf):
+			c = buf[i]
+			if not self._started:
+				if c == "[":
+					self._started = True
+			elif self._in_string:
+				if self._escaped:
+					self._escaped = False
+				elif c == "\\":
+					self._escaped = True
+				elif c == '"':
+					self._in_string = False
+			elif c == '"':
+				self._in_string = True
+			elif c == "{":
+				if self._depth == 0:
+					self._obj_start = i
+				self._depth += 1
+			elif c == "}" and self._depth > 0:
+				self._depth -= 1
+				if self._depth == 0 and self._obj_start is not None:
+					try:
+						obj = json.loads(buf[self._obj_start:i + 1])
+					except Exception:
+						obj = None
+					if isinstance(obj, dict):
+						items.append(obj)
+					self._obj_start = None
+			elif c == "]" and self._depth == 0:
+				self._finished = True
+				break
+			i += 1
+		# Giữ lại phần object đang dở, bỏ phần đã xử lý
+		keep_from = self._obj_start if self._obj_start is not None else i
+		self._buf = buf[keep_from:]
+		self._pos = i - keep_from
+		if self._obj_start is not None:
+			self._obj_start = 0
+		return items
+
+
+# Normalize common Vietnamese/English casing variations
+LEVEL_CANONICAL_MAP = {
+	"intern": "Intern",
+	"fresher": "Fresher",
+	"junior": "Junior",
+	"senior": "Senior",
+	"lead": "Lead",
+	"leader": "Lead",
+}
+
+
+def canonical_level(level: str) -> str:
+	level = (level or "").strip()
+	return LEVEL_CANONICAL_MAP.get(level.lower(), level)
+
+
+# Cache bộ câu hỏi đã sinh theo (CV đã chuẩn hoá, vị trí, level, JD): upload lại cùng CV cho cùng
+# vị trí/level thì trả về ngay, không gọi Gemini. Prompt thay đổi → khoá thay đổi theo.
+QUESTION_CACHE_TTL_HOURS = float(os.getenv("QUESTION_CACHE_TTL_HOURS", "168"))
+QUESTION_CACHE_MAX_MB = float(os.getenv("QUESTION_CACHE_MAX_MB", "64"))
+_question_cache: Optional[DiskCache] = None
+_question_cache_lock = threading.Lock()
+
+
+def get_question_cache() -> Optional[DiskCache]:
+	"""DiskCache dùng chung; None nếu bị tắt (QUESTION_CACHE_MAX_MB=0)."""
+	global _question_cache
+	if QUESTION_CACHE_MAX_MB <= 0:
+		return None
+	if _question_cache is None:
+		with _question_cache_lock:
+			if _question_cache is None:
+				default_path = Path(__file__).parent.parent.parent / "cache" / "questions.sqlite3"
+				_question_cache = DiskCache(
+					os.getenv("QUESTION_CACHE_PATH", str(default_path)),
+					max_bytes=int(QUESTION_CACHE_MAX_MB * 1024 * 1024),
+					ttl_seconds=QUESTION_CACHE_TTL_HOURS * 3600,
+				)
+	return _question_cache
+
+
+def _normalize_text(text: Optional[str]) -> str:
+	text = unicodedata.normalize("NFC", text or "")
+	return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def _question_set_mode() -> str:
+	"""Cách ghép bộ câu hỏi: cùng bank (opening/behavioral/creative) + CV_SLOTS_PROMPT, hay chỉ SYSTEM_PROMPT."""
+	if not question_bank.QUESTION_BANK_ENABLED:
+		return "full"
+	return "bank:" + json.dumps(question_bank.BANK_SLOTS, sort_keys=True)
+
+
+def question_cache_key(cv_text: str, job_title: str, level: str, jd_text: Optional[str] = None) -> str:
+	parts = [
+		hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest(),
+		hashlib.sha256(CV_SLOTS_PROMPT.encode("utf-8")).hexdigest(),
+		_question_set_mode(),
+		hashlib.sha256(_normalize_text(cv_text).encode("utf-8")).hexdigest(),
+		_normalize_text(job_title),
+		canonical_level(level),
+		hashlib.sha256(_normalize_text(jd_text).encode("utf-8")).hexdigest(),
+	]
+	return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def _question_cache_slot(file_path: Path, cv_text: str, job_title: str, level: str,
+		jd_text: Optional[str]) -> Tuple[Optional[DiskCache], Optional[str]]:
+	"""(cache, key) cho một CV; key None khi cache tắt hoặc không có gì để băm."""
+	cache = get_question_cache()
+	if cache is None:
+		return None, None
 	if cv_text.strip():
-		prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text)
-		raw = call_gemini_text(prompt)
+		return cache, question_cache_key(cv_text, job_title, level, jd_text)
+	if file_path.suffix.lower() in IMAGE_SUFFIXES:
+		return cache, question_cache_key(f"image:{file_sha256(file_path)}", job_title, level, None)
+	return cache, None
+
+
+def _cached_questions(cache: Optional[DiskCache], cache_key: Optional[str], file_path: Path) -> Optional[List[dict]]:
+	if not cache_key:
+		return None
+	try:
+		parsed = cache.get(cache_key)
+	except Exception as e:
+		print(f"[QUESTION_CACHE] lookup failed: {e}")
+		return None
+	if parsed is not None:
+		print(f"[QUESTION_CACHE] hit {cache_key[:12]} for {file_path.name}")
+	return parsed
+
+
+def _bank_selection(cv_text: str, job_title: str, level: str) -> Optional[dict]:
+	"""Câu opening/behavioral/creative từ question bank; None nếu bank tắt hoặc chưa đủ câu."""
+	bank = question_bank.get_question_bank()
+	if bank is None:
+		return None
+	try:
+		return bank.select(job_title, canonical_level(level), context=f"{job_title} {level}\n{cv_text[:2000]}")
+	except Exception as e:
+		print(f"[QUESTION_BANK] select failed: {e}")
+		return None
+
+
+def _cv_slot_items(items: Optional[List[dict]]) -> List[dict]:
+	return [q for q in items or [] if isinstance(q, dict) and (q.get("category") or "").lower() in CV_SLOT_CATEGORIES]
+
+
+def _with_id(question: dict, qid: int) -> dict:
+	out = {"id": qid}
+	out.update({k: v for k, v in question.items() if k not in ("id", "source")})
+	return out
+
+
+def _assemble_with_bank(bank_items: dict, generated: List[dict]) -> List[dict]:
+	"""Ghép theo thứ tự của SYSTEM_PROMPT: opening, behavioral, technical, cv_based, creative."""
+	technical = [q for q in generated if q.get("category") == "technical"]
+	cv_based = [q for q in generated if q.get("category") != "technical"]
+	ordered = bank_items["opening"] + bank_items["behavioral"] + technical + cv_based + bank_items["creative"]
+	return [_with_id(q, i) for i, q in enumerate(ordered, start=1)]
+
+
+def _grow_bank_in_background(questions: List[dict], job_title: str, level: str, source: str) -> None:
+	"""Bổ sung câu không phụ thuộc CV của bộ câu hỏi vừa lưu vào bank (câu trùng/cá nhân hoá bị bỏ)."""
+	bank = question_bank.get_question_bank()
+	if bank is None:
+		return
+
+	def _run() -> None:
+		try:
+			bank.add_questions(questions, job_title, canonical_level(level), source=source)
+		except Exception as e:
+			print(f"[QUESTION_BANK] add failed: {e}")
+
+	threading.Thread(target=_run, name="question-bank-add", daemon=True).start()
+
+
+def question_file_meta() -> Callable[[str], Tuple[Optional[str], Optional[str]]]:
+	"""Tra (vị trí, level) của một file `<stem>.questions.json` từ meta của cache câu hỏi."""
+	by_stem: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+	cache = get_question_cache()
+	if cache is not None:
+		try:
+			for meta in cache.metas():
+				if meta.get("source_name"):
+					by_stem[Path(meta["source_name"]).stem] = (meta.get("job_title"), meta.get("level"))
+		except Exception as e:
+			print(f"[QUESTION_BANK] metadata lookup failed: {e}")
+	return lambda name: by_stem.get(name[:-len(".questions.json")], (None, None))
+
+
+def warm_question_bank(directory: Optional[Path] = None, background: bool = False) -> None:
+	"""Khai thác các file câu hỏi chưa có trong bank (chỉ file mới/đã đổi)."""
+	bank = question_bank.get_question_bank()
+	if bank is None:
+		return
+	directory = directory or Path(__file__).parent.parent.parent / "interview_question"
+
+	def _run() -> None:
+		try:
+			files, added = bank.mine_directory(str(directory), meta_lookup=question_file_meta())
+			if files:
+				print(f"[QUESTION_BANK] mined {files} files, {added} new questions")
+		except Exception as e:
+			print(f"[QUESTION_BANK] mining failed: {e}")
+
+	if background:
+		threading.Thread(target=_run, name="question-bank-mine", daemon=True).start()
 	else:
-		if file_path.suffix.lower() in {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif"}:
-			raw = call_gemini_with_image(file_path, job_title, level)
+		_run()
+
+
+def _save_questions(parsed: List[dict], file_path: Path, job_title: str, level: str, out_dir: Path,
+		cache: Optional[DiskCache], cache_key: Optional[str], from_cache: bool) -> Path:
+	if cache_key and not from_cache:
+		try:
+			cache.set(cache_key, parsed, meta={"job_title": job_title, "level": canonical_level(level), "source_name": file_path.name})
+		except Exception as e:
+			print(f"[QUESTION_CACHE] store failed: {e}")
+	out_path = out_dir / f"{file_path.stem}.questions.json"
+	out_path.write_text(json.dumps(parsed, ensure_ascii=False, indent=2), encoding="utf-8")
+	print(f"Saved: {out_path}")
+	_index_questions_in_background(out_path, job_title, level)
+	_grow_bank_in_background(parsed, job_title, level, out_path.name)
+	return out_path
+
+
+# Một bước gọi Gemini mà _process_steps cần: ("text", prompt) hoặc ("image", None)
+GeminiRequest = Tuple[str, Optional[str]]
+
+
+def _process_steps(file_path: Path, job_title: str, level: str, out_dir: Path, jd_text: Optional[str] = None,
+		force_regenerate: bool = False) -> Generator[GeminiRequest, str, None]:
+	"""Logic của process_file, tách khỏi lời gọi Gemini: yield yêu cầu, nhận lại text phản hồi.
+
+	process_file chạy nó với lời gọi đồng bộ, process_file_async với lời gọi async.
+	"""
+	print(f"Processing: {file_path}")
+	cv_text = extract_text_from_cv(file_path)
+	is_image = file_path.suffix.lower() in IMAGE_SUFFIXES
+	cache, cache_key = _question_cache_slot(file_path, cv_text, job_title, level, jd_text)
+	parsed = None if force_regenerate else _cached_questions(cache, cache_key, file_path)
+	from_cache = parsed is not None
+	if parsed is None:
+		prompt: Optional[str] = None
+		raw: str = ""
+		bank_items = None
+		if cv_text.strip():
+			past = similar_past_questions(cv_text, job_title, level)
+			bank_items = _bank_selection(cv_text, job_title, level)
+			if bank_items:
+				# Chỉ sinh slot technical/cv_based; prompt và output ngắn hơn hẳn
+				prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text,
+					past_questions=past, template=CV_SLOTS_PROMPT)
+				generated = _cv_slot_items(try_parse_json((yield ("text", prompt))))
+				if not generated:
+					print("[QUESTION_BANK] CV-slot generation invalid, falling back to full prompt")
+					prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text,
+						past_questions=past)
+					raw = yield ("text", prompt)
+					# Như stream_questions: giữ câu từ bank, chỉ lấy slot technical/cv_based của bộ đầy đủ
+					generated = _cv_slot_items(try_parse_json(raw))
+				if generated:
+					parsed = _assemble_with_bank(bank_items, generated)
+			else:
+				prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text,
+					past_questions=past)
+				raw = yield ("text", prompt)
 		else:
-			print(f"Warning: No text extracted from {file_path.name}. Skipping.")
+			if is_image:
+				raw = yield ("image", None)
+			else:
+				print(f"Warning: No text extracted from {file_path.name}. Skipping.")
+				return
+		if parsed is None and not bank_items:
+			parsed = try_parse_json(raw)
+		if parsed is None:
+			print(f"Model did not return valid JSON for {file_path.name}. Saving raw.")
+			out_path = out_dir / f"{file_path.stem}.questions.raw.txt"
+			out_path.write_text(raw, encoding="utf-8")
 			return
-	parsed = try_parse_json(raw)
+	_save_questions(parsed, file_path, job_title, level, out_dir, cache, cache_key, from_cache)
+
+
+def process_file(file_path: Path, job_title: str, level: str, out_dir: Path, jd_text: Optional[str] = None,
+		force_regenerate: bool = False) -> None:
+	steps = _process_steps(file_path, job_title, level, out_dir, jd_text, force_regenerate)
+	step = _advance(steps, None)
+	while step is not None:
+		kind, prompt = step
+		raw = call_gemini_text(prompt) if kind == "text" else call_gemini_with_image(file_path, job_title, level)
+		step = _advance(steps, raw)
+
+
+async def process_file_async(file_path: Path, job_title: str, level: str, out_dir: Path, jd_text: Optional[str] = None,
+		force_regenerate: bool = False) -> None:
+	"""Như process_file cho chế độ ASGI: lời gọi Gemini là coroutine, phần việc CPU/đĩa
+	(trích xuất text, cache, ghi file) chạy trong thread pool nên không chặn event loop."""
+	steps = _process_steps(file_path, job_title, level, out_dir, jd_text, force_regenerate)
+	step = await asyncio.to_thread(_advance, steps, None)
+	while step is not None:
+		kind, prompt = step
+		if kind == "text":
+			raw = await call_gemini_text_async(prompt)
+		else:
+			raw = await call_gemini_with_image_async(file_path, job_title, level)
+		step = await asyncio.to_thread(_advance, steps, raw)
+
+
+def _advance(steps: Generator[GeminiRequest, str, None], value: Optional[str]) -> Optional[GeminiRequest]:
+	# Không để StopIteration thoát ra ngoài (asyncio.to_thread không truyền được StopIteration)
+	try:
+		return steps.send(value)
+	except StopIteration:
+		return None
+
+
+def _stream_items(prompt: str, chunks: List[str], categories: Optional[Tuple[str, ...]] = None) -> Iterator[dict]:
+	"""Stream prompt và yield từng object khi khép lại; cuối cùng đối chiếu với bản parse toàn văn
+	để bổ sung phần parser tăng dần bỏ lỡ. Text thô được gom vào `chunks`."""
+	def _keep(item: dict) -> bool:
+		return categories is None or (item.get("category") or "").lower() in categories
+
+	parser = IncrementalJsonArrayParser()
+	count = 0
+	for chunk in stream_gemini_text(prompt):
+		chunks.append(chunk)
+		for item in parser.feed(chunk):
+			if _keep(item):
+				count += 1
+				yield item
+	full = [q for q in try_parse_json("".join(chunks)) or [] if isinstance(q, dict) and _keep(q)]
+	for item in full[count:]:
+		yield item
+
+
+def stream_questions(file_path: Path, job_title: str, level: str, out_dir: Path, jd_text: Optional[str] = None,
+		force_regenerate: bool = False) -> Iterator[dict]:
+	"""Như process_file nhưng yield từng câu hỏi ngay khi object JSON của nó khép lại.
+
+	Dùng API streaming của Gemini; khi stream kết thúc, bộ câu hỏi đầy đủ được ghi ra
+	`<stem>.questions.json` và lưu cache giống hệt process_file. Cache hit → yield toàn bộ ngay.
+	CV dạng ảnh (không có text) dùng lời gọi thường rồi yield lần lượt.
+	"""
+	print(f"Processing (stream): {file_path}")
+	cv_text = extract_text_from_cv(file_path)
+	cache, cache_key = _question_cache_slot(file_path, cv_text, job_title, level, jd_text)
+	cached = None if force_regenerate else _cached_questions(cache, cache_key, file_path)
+	if cached is not None:
+		yield from cached
+		_save_questions(cached, file_path, job_title, level, out_dir, cache, cache_key, True)
+		return
+	emitted: List[dict] = []
+	chunks: List[str] = []
+	if cv_text.strip():
+		past = similar_past_questions(cv_text, job_title, level)
+		bank_items = _bank_selection(cv_text, job_title, level)
+		if bank_items:
+			# Slot từ bank có ngay; chỉ technical/cv_based chờ Gemini (stream), creative ở cuối
+			for q in bank_items["opening"] + bank_items["behavioral"]:
+				emitted.append(_with_id(q, len(emitted) + 1))
+				yield emitted[-1]
+			head = len(emitted)
+			prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text,
+				past_questions=past, template=CV_SLOTS_PROMPT)
+			for q in _stream_items(prompt, chunks, CV_SLOT_CATEGORIES):
+				emitted.append(_with_id(q, len(emitted) + 1))
+				yield emitted[-1]
+			if len(emitted) == head:
+				print("[QUESTION_BANK] CV-slot generation invalid, falling back to full prompt")
+				full = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text, past_questions=past)
+				raw = call_gemini_text(full)
+				for q in _cv_slot_items(try_parse_json(raw)):
+					emitted.append(_with_id(q, len(emitted) + 1))
+					yield emitted[-1]
+				if len(emitted) == head:
+					# Không lưu/cache bộ chỉ có câu từ bank (như process_file)
+					print(f"Model did not return valid JSON for {file_path.name}. Saving raw.")
+					(out_dir / f"{file_path.stem}.questions.raw.txt").write_text(raw, encoding="utf-8")
+					return
+			for q in bank_items["creative"]:
+				emitted.append(_with_id(q, len(emitted) + 1))
+				yield emitted[-1]
+			_save_questions(emitted, file_path, job_title, level, out_dir, cache, cache_key, False)
+			return
+		else:
+			prompt = build_prompt(cv_text=cv_text, job_title=job_title, level=level, jd_text=jd_text,
+				past_questions=past)
+			for q in _stream_items(prompt, chunks):
+				emitted.append(q)
+				yield q
+		raw = "".join(chunks)
+	elif file_path.suffix.lower() in IMAGE_SUFFIXES:
+		raw = call_gemini_with_image(file_path, job_title, level)
+		for q in try_parse_json(raw) or []:
+			emitted.append(q)
+			yield q
+	else:
+		print(f"Warning: No text extracted from {file_path.name}. Skipping.")
+		return
+	parsed = emitted or None
 	if parsed is None:
 		print(f"Model did not return valid JSON for {file_path.name}. Saving raw.")
-		out_path = out_dir / f"{file_path.stem}.questions.raw.txt"
-		out_path.write_text(raw, encoding="utf-8")
+		(out_dir / f"{file_path.stem}.questions.raw.txt").write_text(raw, encoding="utf-8")
 		return
-	out_path = out_dir / f"{file_path.stem}.questions.json"
-	out_path.write_text(json.dumps(parsed, ensure_ascii=False, indent=2), encoding="utf-8")
-	print(f"Saved: {out_path}")
+	_save_questions(parsed, file_path, job_title, level, out_dir, cache, cache_key, False)
 
 
 def main() -> None:
@@ -273,8 +1000,10 @@ def main() -> None:
 	parser.add_argument("--job", required=False, help="Target job title, e.g. 'Data Scientist'")
 	parser.add_argument("--level", required=False, help="Candidate level, e.g. 'Intern', 'Fresher', 'Junior', 'Senior', 'Lead'")
 	parser.add_argument("--out", default="interview_question", help="Directory to write JSON outputs")
+	parser.add_argument("--force", action="store_true", help="Bỏ qua cache câu hỏi, luôn gọi Gemini")
 	args = parser.parse_args()
 	read_env()
+	warm_model_cache()
 	# Lấy đường dẫn tuyệt đối từ thư mục gốc của dự án
 	project_root = Path(__file__).parent.parent.parent
 	cv_dir = project_root / args.cv_dir
@@ -299,17 +1028,7 @@ def main() -> None:
 			level = ""
 	if not level:
 		raise SystemExit("Level ứng tuyển không được để trống.")
-	# Normalize common Vietnamese/English casing variations
-	level_canonical_map = {
-		"intern": "Intern",
-		"fresher": "Fresher",
-		"junior": "Junior",
-		"senior": "Senior",
-		"lead": "Lead",
-		"leader": "Lead",
-	}
-	level_key = level.lower()
-	level = level_canonical_map.get(level_key, level)
+	level = canonical_level(level)
 	if not cv_dir.exists():
 		raise FileNotFoundError(f"CV directory not found: {cv_dir}")
 	supported_exts = {".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".tif", ".pdf"}
@@ -319,7 +1038,7 @@ def main() -> None:
 		return
 	for f in sorted(files):
 		try:
-			process_file(f, job_title, level, out_dir)
+			process_file(f, job_title, level, out_dir, force_regenerate=args.force)
 		except Exception as e:
 			print(f"Error processing {f.name}: {e}")
 
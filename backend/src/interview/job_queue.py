@@ -0,0 +1,340 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Trạng thái job
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_process_token: Optional[Tuple[int, str]] = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    job_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after);
+CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(job_key);
+"""
+
+
+class JobQueue:
+    """Persistent (SQLite) job queue with a fixed-size worker pool and retry/backoff.
+
+    Handlers are registered per job kind and receive the decoded payload dict (plus, with
+    `with_attempt=True`, the 1-based attempt number so a retry can behave differently). A handler
+    returning normally marks the job done (its return value is stored as the job result);
+    raising schedules a retry with exponential backoff until max_attempts is reached.
+    Several processes may share one database (multi-worker server): claims are atomic and each
+    running job records its owner ("host:pid") and a heartbeat thread refreshes `updated_at` of
+    the jobs this process is running every `heartbeat_interval` seconds. Jobs left in 'running' by
+    a dead owner on this host, or whose heartbeat stopped for `stale_after` seconds (owner on
+    another host died), are re-queued (on start() and periodically). Done/failed jobs older than
+    `retention` seconds are deleted during the same periodic check (None = keep forever).
+    With `kinds`, this queue's workers only claim jobs of those kinds, so several queues (each
+    with its own pool size) can share one database.
+    """
+
+    def __init__(self, db_path: str, workers: int = 2, max_attempts: int = 3,
+                 backoff_base: float = 5.0, poll_interval: float = 1.0, stale_after: float = 300.0,
+                 kinds: Optional[Iterable[str]] = None, heartbeat_interval: float = 30.0,
+                 retention: Optional[float] = 7 * 86400.0):
+        self.db_path = db_path
+        self.kinds = tuple(kinds) if kinds else ()
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        # heartbeat phải dày hơn nhiều so với stale_after, nếu không job đang chạy bị coi là mồ côi
+        self.heartbeat_interval = max(0.1, min(heartbeat_interval, stale_after / 3))
+        self.retention = retention
+        self._last_orphan_check = 0.0
+        self._running: set = set()
+        self._running_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._handlers: Dict[str, Tuple[Callable[..., Any], bool]] = {}
+        self._listeners: List[Callable[[Dict[str, Any], str], None]] = []
+        self._wakeup = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            # DB tạo bởi phiên bản cũ chưa có cột owner
+            columns = {r['name'] for r in conn.execute('PRAGMA table_info(jobs)')}
+            if 'owner' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def register(self, kind: str, handler: Callable[..., Any], with_attempt: bool = False) -> None:
+        self._handlers[kind] = (handler, with_attempt)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any], str], None]) -> None:
+        """listener(job, status) is called on every state change (running/queued for retry/done/failed)."""
+        self._listeners.append(listener)
+
+    def _notify(self, job: Dict[str, Any], status: str, **extra: Any) -> None:
+        info = dict(job, status=status, **extra)
+        for listener in self._listeners:
+            try:
+                listener(info, status)
+            except Exception:
+                traceback.print_exc()
+
+    # -------------------- producer side --------------------
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> int:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                'INSERT INTO jobs (kind, job_key, payload, status, attempts, max_attempts, run_after, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, 0, ?, ?, ?, ?)',
+                (kind, key, json.dumps(payload, ensure_ascii=False), QUEUED,
+                 int(max_attempts or self.max_attempts), now, now, now),
+            )
+            job_id = int(cur.lastrowid)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """Latest job for a key (e.g. the log_file returned by /submit_interview)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE job_key = ? ORDER BY id DESC LIMIT 1', (key,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def states_for(self, keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Latest job per key for many keys in one query."""
+        keys = [k for k in keys if k]
+        if not keys:
+            return {}
+        out: Dict[str, Dict[str, Any]] = {}
+        with closing(self._connect()) as conn:
+            # SQLite giới hạn số tham số mỗi câu lệnh → chia lô
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ','.join('?' for _ in chunk)
+                rows = conn.execute(
+                    f'SELECT * FROM jobs WHERE job_key IN ({marks}) ORDER BY id ASC', chunk
+                ).fetchall()
+                for row in rows:
+                    out[row['job_key']] = self._row_to_dict(row)
+        return out
+
+    def stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT status, COUNT(*) AS n FROM jobs WHERE 1 = 1' + self._kind_filter()
+                                + ' GROUP BY status', self.kinds).fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update({r['status']: int(r['n']) for r in rows})
+        return counts
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        d = dict(row)
+        for field in ('payload', 'result'):
+            if d.get(field):
+                try:
+                    d[field] = json.loads(d[field])
+                except Exception:
+                    pass
+        return d
+
+    # -------------------- worker side --------------------
+    def start(self) -> None:
+        if self._threads:
+            return
+        self.requeue_orphans()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f'job-worker-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping = True
+        self._stop_event.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+        self._stopping = False
+        self._stop_event.clear()
+
+    @staticmethod
+    def _owner() -> str:
+        # token phân biệt process mới trùng pid với process cũ (vd. pid 1 trong container khởi động lại)
+        global _process_token
+        if _process_token is None or _process_token[0] != os.getpid():
+            _process_token = (os.getpid(), uuid.uuid4().hex[:8])
+        return f'{socket.gethostname()}:{os.getpid()}:{_process_token[1]}'
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        parts = (owner or '').rsplit(':', 2)
+        if len(parts) != 3:
+            return False  # job từ phiên bản cũ (chưa ghi owner)
+        host, pid, _ = parts
+        if host != socket.gethostname():
+            return True  # process ở máy khác: chỉ dựa vào stale_after
+        if owner == self._owner():
+            return True
+        if pid == str(os.getpid()):
+            return False  # cùng pid nhưng khác token → process cũ đã chết
+        try:
+            os.kill(int(pid), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def requeue_orphans(self) -> int:
+        """Job 'running' của process đã chết (hoặc quá stale_after giây không có heartbeat) → đưa lại hàng đợi.
+        Đồng thời xoá job done/failed cũ hơn `retention` giây để bảng jobs không phình mãi."""
+        now = time.time()
+        self._last_orphan_check = now
+        with closing(self._connect()) as conn:
+            if self.retention is not None:
+                conn.execute('DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?' + self._kind_filter(),
+                             (DONE, FAILED, now - self.retention) + self.kinds)
+            rows = conn.execute('SELECT id, owner, updated_at FROM jobs WHERE status = ?' + self._kind_filter(),
+                                (RUNNING,) + self.kinds).fetchall()
+            orphans = [r['id'] for r in rows
+                       if not self._owner_alive(r['owner']) or now - r['updated_at'] > self.stale_after]
+            for job_id in orphans:
+                conn.execute('UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status = ?',
+                             (QUEUED, now, job_id, RUNNING))
+        return len(orphans)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop_event.wait(self.heartbeat_interval):
+            with self._running_lock:
+                job_ids = list(self._running)
+            if not job_ids:
+                continue
+            try:
+                marks = ','.join('?' for _ in job_ids)
+                with closing(self._connect()) as conn:
+                    conn.execute(f'UPDATE jobs SET updated_at = ? WHERE status = ? AND owner = ? AND id IN ({marks})',
+                                 [time.time(), RUNNING, self._owner()] + job_ids)
+            except Exception:
+                traceback.print_exc()
+
+    def _kind_filter(self) -> str:
+        return f" AND kind IN ({','.join('?' for _ in self.kinds)})" if self.kinds else ''
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? AND run_after <= ?' + self._kind_filter()
+                + ' ORDER BY run_after, id LIMIT 1',
+                (QUEUED, now) + self.kinds,
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute(
+                'UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, updated_at = ? WHERE id = ?',
+                (RUNNING, self._owner(), now, row['id']),
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            try:
+                conn.execute('ROLLBACK')
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+        job = self._row_to_dict(row)
+        job['attempts'] = int(job['attempts']) + 1
+        return job
+
+    def _finish(self, job_id: int, status: str, result: Any = None, error: Optional[str] = None,
+                run_after: Optional[float] = None) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, error = ?, run_after = COALESCE(?, run_after), updated_at = ? WHERE id = ?',
+                (status, json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error, run_after, now, job_id),
+            )
+
+    def _worker_loop(self) -> None:
+        while not self._stopping:
+            try:
+                job = self._claim()
+            except Exception:
+                traceback.print_exc()
+                job = None
+            if job is None:
+                if time.time() - self._last_orphan_check > 60:
+                    try:
+                        self.requeue_orphans()
+                    except Exception:
+                        traceback.print_exc()
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            handler, with_attempt = self._handlers.get(job['kind'], (None, False))
+            with self._running_lock:
+                self._running.add(job['id'])
+            self._notify(job, RUNNING)
+            try:
+                if handler is None:
+                    raise RuntimeError(f"no handler for job kind '{job['kind']}'")
+                result = handler(job['payload'], job['attempts']) if with_attempt else handler(job['payload'])
+                self._finish(job['id'], DONE, result=result)
+                self._notify(job, DONE, result=result)
+            except Exception as e:
+                if job['attempts'] < int(job['max_attempts']):
+                    delay = self.backoff_base * (2 ** (job['attempts'] - 1))
+                    print(f"[JOBS] job #{job['id']} ({job['kind']}) lỗi lần {job['attempts']}: {e} → thử lại sau {delay:.0f}s")
+                    self._finish(job['id'], QUEUED, error=str(e), run_after=time.time() + delay)
+                    self._notify(job, QUEUED, error=str(e), retry_in=delay)
+                else:
+                    print(f"[JOBS] job #{job['id']} ({job['kind']}) thất bại sau {job['attempts']} lần: {e}")
+                    traceback.print_exc()
+                    self._finish(job['id'], FAILED, error=str(e))
+                    self._notify(job, FAILED, error=str(e))
+            finally:
+                with self._running_lock:
+                    self._running.discard(job['id'])
@@ -0,0 +1,70 @@
+import importlib
+import importlib.util
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Iterable, Optional
+
+# Thời gian import thực tế (giây) của từng module nặng đã được nạp qua LazyModule
+_load_times: Dict[str, float] = {}
+
+
+class LazyModule:
+    """Proxy cho một module nặng (SDK Gemini, Supabase, OCR...): chỉ import khi truy cập thuộc tính đầu tiên.
+
+    Dùng thay cho `import x as y` ở đầu file, nên import module của app không phải trả chi phí
+    của SDK chưa dùng tới. Thuộc tính luôn được đọc từ module thật tại thời điểm gọi, nên việc
+    thay thế thuộc tính của module thật (VD: model giả lập trong benchmark) vẫn có hiệu lực.
+    """
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module: Optional[ModuleType] = None
+        self._lazy_lock = threading.Lock()
+
+    def load(self) -> ModuleType:
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self._lazy_name)
+                    _load_times.setdefault(self._lazy_name, time.perf_counter() - start)
+                    self._lazy_module = module
+        return self._lazy_module
+
+    @property
+    def loaded(self) -> bool:
+        return self._lazy_module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._lazy_module is not None else 'not loaded'
+        return f'<lazy module {self._lazy_name!r} ({state})>'
+
+
+def lazy_module(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+def is_available(name: str) -> bool:
+    """Module có cài hay không, không import nó (chỉ tìm spec)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def preload(modules: Iterable[LazyModule]) -> Dict[str, float]:
+    """Import trước các module (dùng trong warmup); module thiếu/lỗi được bỏ qua."""
+    for module in modules:
+        try:
+            module.load()
+        except Exception as e:
+            print(f'[WARMUP] cannot import {module._lazy_name}: {e}')
+    return load_times()
+
+
+def load_times() -> Dict[str, float]:
+    return {name: round(seconds, 4) for name, seconds in _load_times.items()}
@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cùng các bảng với Supabase (candidates, interview_logs, evaluate_results); log/kết quả được khoá
+# thêm theo tên file cũ (log_file, result_file) nên URL, key SSE và lịch sử ở chế độ file giữ nguyên
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    candidate_id TEXT PRIMARY KEY,
+    candidate_name TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS interview_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    log_file TEXT NOT NULL UNIQUE,
+    candidate_id TEXT,
+    candidate_name TEXT,
+    interview_date TEXT,
+    responses TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_created ON interview_logs(created_at, id);
+CREATE TABLE IF NOT EXISTS evaluate_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_file TEXT NOT NULL UNIQUE,
+    interview_log_id INTEGER REFERENCES interview_logs(id),
+    result TEXT NOT NULL,
+    summary TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_created ON evaluate_results(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_results_log ON evaluate_results(interview_log_id, id);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    done_at REAL NOT NULL,
+    detail TEXT
+);
+"""
+
+JSON_DIRS_MIGRATION = 'json_dirs_v1'
+
+
+class LocalStore:
+    """Kho dữ liệu cục bộ (SQLite, WAL) cho chế độ không có Supabase, thay cho các thư mục JSON
+    outputs/interview_logs và outputs/evaluate_results.
+
+    Danh sách lịch sử/kết quả là truy vấn keyset trên index (created_at, id) và chỉ đọc cột summary
+    (tách sẵn lúc ghi), thay vì glob + stat + parse toàn bộ file ở mỗi request. Nhiều process dùng
+    chung được một file. migrate_json_dirs() nhập các file JSON có sẵn (một lần, ghi vào `migrations`).
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # -------------------- ghi --------------------
+    def upsert_candidate(self, candidate_id: str, candidate_name: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute('INSERT INTO candidates (candidate_id, candidate_name, created_at) VALUES (?, ?, ?) '
+                         'ON CONFLICT(candidate_id) DO UPDATE SET candidate_name = excluded.candidate_name',
+                         (candidate_id, candidate_name, time.time()))
+
+    def insert_interview_log(self, log_file: str, payload: Dict[str, Any], created_at: Optional[float] = None) -> int:
+        with closing(self._connect()) as conn:
+            return self._insert_log(conn, log_file, payload, created_at)
+
+    @staticmethod
+    def _insert_log(conn: sqlite3.Connection, log_file: str, payload: Dict[str, Any],
+                    created_at: Optional[float] = None) -> int:
+        responses = payload.get('responses') if isinstance(payload.get('responses'), list) else []
+        conn.execute(
+            'INSERT INTO interview_logs (log_file, candidate_id, candidate_name, interview_date, responses, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(log_file) DO NOTHING',
+            (log_file, payload.get('id'), payload.get('candidate_name'), payload.get('interview_date'),
+             json.dumps(responses, ensure_ascii=False), created_at or time.time()),
+        )
+        return int(conn.execute('SELECT id FROM interview_logs WHERE log_file = ?', (log_file,)).fetchone()['id'])
+
+    def insert_evaluate_result(self, result_file: str, result: Dict[str, Any], log_file: Optional[str] = None,
+                               created_at: Optional[float] = None) -> int:
+        """Lưu kết quả (ghi đè nếu result_file đã có, như ghi lại file) → id."""
+        with closing(self._connect()) as conn:
+            return self._insert_result(conn, result_file, result, log_file, created_at)
+
+    @staticmethod
+    def _insert_result(conn: sqlite3.Connection, result_file: str, result: Dict[str, Any],
+                       log_file: Optional[str] = None, created_at: Optional[float] = None) -> int:
+        row = conn.execute('SELECT id FROM interview_logs WHERE log_file = ?', (log_file,)).fetchone() if log_file else None
+        summary = result.get('summary') if isinstance(result.get('summary'), dict) else None
+        conn.execute(
+            'INSERT INTO evaluate_results (result_file, interview_log_id, result, summary, created_at) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(result_file) DO UPDATE SET interview_log_id = COALESCE(excluded.interview_log_id, interview_log_id), '
+            'result = excluded.result, summary = excluded.summary, created_at = excluded.created_at',
+            (result_file, row['id'] if row else None, json.dumps(result, ensure_ascii=False),
+             json.dumps(summary, ensure_ascii=False) if summary is not None else None, created_at or time.time()),
+        )
+        return int(conn.execute('SELECT id FROM evaluate_results WHERE result_file = ?', (result_file,)).fetchone()['id'])
+
+    # -------------------- đọc --------------------
+    def get_result(self, result_file: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT result FROM evaluate_results WHERE result_file = ?', (result_file,)).fetchone()
+        return json.loads(row['result']) if row else None
+
+    def has_result(self, result_file: str) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute('SELECT 1 FROM evaluate_results WHERE result_file = ?', (result_file,)).fetchone() is not None
+
+    def result_files(self) -> List[str]:
+        with closing(self._connect()) as conn:
+            return [r['result_file'] for r in conn.execute(
+                'SELECT result_file FROM evaluate_results ORDER BY created_at DESC, id DESC')]
+
+    @staticmethod
+    def _keyset(conn: sqlite3.Connection, table: str, key_column: str, before: Optional[str]) -> Tuple[str, list]:
+        """Điều kiện "đứng sau phần tử `before`" theo (created_at, id) giảm dần."""
+        if not before:
+            return '', []
+        row = conn.execute(f'SELECT created_at, id FROM {table} WHERE {key_column} = ?', (before,)).fetchone()
+        if row is None:
+            return '', []
+        return ' WHERE (created_at < ? OR (created_at = ? AND id < ?))', [row['created_at'], row['created_at'], row['id']]
+
+    def list_results(self, limit: int, before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Một trang kết quả mới nhất trước (chỉ summary) → (items, còn trang sau)."""
+        with closing(self._connect()) as conn:
+            where, params = self._keyset(conn, 'evaluate_results', 'result_file', before)
+            rows = conn.execute(f'SELECT result_file, summary, created_at FROM evaluate_results{where} '
+                                'ORDER BY created_at DESC, id DESC LIMIT ?', params + [limit + 1]).fetchall()
+        items = []
+        for row in rows[:limit]:
+            entry = {'filename': row['result_file'], 'modified': row['created_at']}
+            if row['summary'] is not None:
+                entry['summary'] = json.loads(row['summary'])
+            items.append(entry)
+        return items, len(rows) > limit
+
+    def list_history(self, limit: int, before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Một trang interview log mới nhất trước, kèm kết quả mới nhất của mỗi log → (items, còn trang sau)."""
+        with closing(self._connect()) as conn:
+            where, params = self._keyset(conn, 'interview_logs', 'log_file', before)
+            logs = conn.execute(f'SELECT id, log_file, candidate_name, interview_date, created_at FROM interview_logs{where} '
+                                'ORDER BY created_at DESC, id DESC LIMIT ?', params + [limit + 1]).fetchall()
+            page = logs[:limit]
+            latest: Dict[int, sqlite3.Row] = {}
+            if page:
+                marks = ','.join('?' for _ in page)
+                for row in conn.execute(f'SELECT interview_log_id, result_file, summary FROM evaluate_results '
+                                        f'WHERE interview_log_id IN ({marks}) ORDER BY id', [lg['id'] for lg in page]):
+                    latest[row['interview_log_id']] = row
+        items = []
+        for lg in page:
+            ev = latest.get(lg['id'])
+            entry = {
+                'log_file': lg['log_file'],
+                'result_file': ev['result_file'] if ev else None,
+                'status': 'done' if ev else 'pending',
+                'modified': lg['created_at'],
+            }
+            if ev and ev['summary'] is not None:
+                entry['summary'] = json.loads(ev['summary'])
+            elif not ev:
+                entry['summary'] = {'candidate_name': lg['candidate_name'], 'interview_date': lg['interview_date'],
+                                    'type': 'job'}
+            items.append(entry)
+        return items, len(logs) > limit
+
+    def interview_logs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """[(log_file, payload)] cũ nhất trước; payload có dạng của file log (id, candidate_name, interview_date, responses)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT log_file, candidate_id, candidate_name, interview_date, responses '
+                                'FROM interview_logs ORDER BY created_at, id').fetchall()
+        return [(r['log_file'], {'id': r['candidate_id'], 'candidate_name': r['candidate_name'],
+                                 'interview_date': r['interview_date'], 'responses': json.loads(r['responses'])})
+                for r in rows]
+
+    def results_after(self, last_id: int, limit: int = 200) -> List[Tuple[int, str, Dict[str, Any]]]:
+        """[(id, result_file, result)] có id > last_id (sync vector index theo checkpoint)."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT id, result_file, result FROM evaluate_results WHERE id > ? ORDER BY id LIMIT ?',
+                                (last_id, limit)).fetchall()
+        return [(int(r['id']), r['result_file'], json.loads(r['result'])) for r in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                      for table in ('candidates', 'interview_logs', 'evaluate_results')}
+            migrations = {r['name']: json.loads(r['detail'] or '{}') for r in conn.execute('SELECT * FROM migrations')}
+        return dict(counts, path=self.db_path, migrations=migrations)
+
+    # -------------------- migrator --------------------
+    def migrate_json_dirs(self, logs_dir: str, results_dir: str, force: bool = False) -> Optional[Dict[str, int]]:
+        """Nhập các file JSON cũ (một lần). Trả số log/kết quả đã nhập; None nếu đã migrate trước đó.
+
+        File đã có trong kho (trùng tên) được bỏ qua nên chạy lại (force) an toàn. created_at lấy
+        theo mtime của file để thứ tự lịch sử giữ nguyên. File JSON không bị xoá.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')  # nhiều process khởi động cùng lúc: chỉ một process migrate
+            if not force and conn.execute('SELECT 1 FROM migrations WHERE name = ?', (JSON_DIRS_MIGRATION,)).fetchone():
+                conn.execute('COMMIT')
+                return None
+            counts = {'interview_logs': 0, 'evaluate_results': 0, 'candidates': 0, 'skipped': 0}
+            for path in sorted(Path(logs_dir).glob('*.json')) if os.path.isdir(logs_dir) else []:
+                if conn.execute('SELECT 1 FROM interview_logs WHERE log_file = ?', (path.name,)).fetchone():
+                    counts['skipped'] += 1
+                    continue
+                data = self._load_json(path)
+                if data is None:
+                    counts['skipped'] += 1
+                    continue
+                self._insert_log(conn, path.name, data, created_at=path.stat().st_mtime)
+                counts['interview_logs'] += 1
+                if data.get('id'):
+                    conn.execute('INSERT INTO candidates (candidate_id, candidate_name, created_at) VALUES (?, ?, ?) '
+                                 'ON CONFLICT(candidate_id) DO NOTHING',
+                                 (str(data['id']), data.get('candidate_name'), path.stat().st_mtime))
+                    counts['candidates'] += 1
+            for path in sorted(Path(results_dir).glob('*.json')) if os.path.isdir(results_dir) else []:
+                if conn.execute('SELECT 1 FROM evaluate_results WHERE result_file = ?', (path.name,)).fetchone():
+                    counts['skipped'] += 1
+                    continue
+                data = self._load_json(path)
+                if data is None:
+                    counts['skipped'] += 1
+                    continue
+                log_file = path.name.replace('_results.json', '.json')
+                self._insert_result(conn, path.name, data, log_file=log_file, created_at=path.stat().st_mtime)
+                counts['evaluate_results'] += 1
+            conn.execute('INSERT OR REPLACE INTO migrations (name, done_at, detail) VALUES (?, ?, ?)',
+                         (JSON_DIRS_MIGRATION, time.time(), json.dumps(counts)))
+            conn.execute('COMMIT')
+            return counts
+        except Exception:
+            try:
+                conn.execute('ROLLBACK')
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _load_json(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else None
+        except Exception as e:
+            print(f'[LOCAL-STORE] skip {path.name}: {e}')
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Nhập outputs/interview_logs và outputs/evaluate_results vào kho SQLite')
+    parser.add_argument('--db', default=os.getenv('LOCAL_STORE_DB', os.path.join('outputs', 'local_store.sqlite3')))
+    parser.add_argument('--logs-dir', default=os.path.join('outputs', 'interview_logs'))
+    parser.add_argument('--results-dir', default=os.path.join('outputs', 'evaluate_results'))
+    parser.add_argument('--force', action='store_true', help='Chạy lại kể cả khi đã migrate (bỏ qua file đã nhập)')
+    args = parser.parse_args()
+    store = LocalStore(args.db)
+    counts = store.migrate_json_dirs(args.logs_dir, args.results_dir, force=args.force)
+    print(f'[LOCAL-STORE] {args.db}: ' + ('đã migrate trước đó (dùng --force để chạy lại)' if counts is None else json.dumps(counts)))
+
+
+if __name__ == '__main__':
+    main()
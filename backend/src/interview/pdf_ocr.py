@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+try:
+    from interview.lazy_import import is_available, lazy_module
+except ImportError:  # chạy trực tiếp như script từ src/interview
+    from lazy_import import is_available, lazy_module  # type: ignore
+
+# Module nhẹ (không import Gemini SDK) để process worker khởi động nhanh;
+# pytesseract/pdf2image chỉ được import khi OCR lần đầu.
+pytesseract = lazy_module('pytesseract')
+pdf2image = lazy_module('pdf2image')
+PDF2IMAGE_AVAILABLE = is_available('pdf2image')
+
+OCR_DPI = int(os.getenv('OCR_DPI', '200'))
+OCR_MAX_PAGES = int(os.getenv('OCR_MAX_PAGES', '10'))
+# Ngôn ngữ Tesseract (VD: 'vie+eng'); trống = mặc định của Tesseract
+OCR_LANG = os.getenv('OCR_LANG', '').strip()
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', str(os.cpu_count() or 1)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: an toàn khi process cha đang chạy nhiều thread (Flask)
+                _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def ocr_settings() -> str:
+    """Các thiết lập làm thay đổi text OCR; đưa vào khoá cache text CV/JD."""
+    return f'dpi={OCR_DPI};max_pages={OCR_MAX_PAGES};lang={OCR_LANG or "default"}'
+
+
+def image_to_string(image) -> str:
+    return pytesseract.image_to_string(image, lang=OCR_LANG) if OCR_LANG else pytesseract.image_to_string(image)
+
+
+def ocr_pdf_page(args: Tuple[str, int, int]) -> str:
+    """Rasterize đúng một trang rồi OCR; chỉ một ảnh trang nằm trong bộ nhớ mỗi worker."""
+    pdf_path, page_number, dpi = args
+    images = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    try:
+        return '\n'.join(image_to_string(img) for img in images)
+    finally:
+        for img in images:
+            img.close()
+
+
+def pdf_page_count(pdf_path: str) -> int:
+    try:
+        return int(pdf2image.pdfinfo_from_path(pdf_path).get('Pages', 0))
+    except Exception:
+        return 0
+
+
+def ocr_pdf(pdf_path: str, page_count: Optional[int] = None, dpi: Optional[int] = None,
+            max_pages: Optional[int] = None, workers: Optional[int] = None) -> List[str]:
+    """OCR từng trang PDF (theo thứ tự trang) trên process pool.
+
+    Trang được rasterize riêng lẻ trong worker nên bộ nhớ đỉnh ~ số worker x một trang,
+    thay vì toàn bộ tài liệu. Trả về danh sách text theo thứ tự trang.
+    """
+    if not PDF2IMAGE_AVAILABLE:
+        return []
+    dpi = dpi or OCR_DPI
+    max_pages = OCR_MAX_PAGES if max_pages is None else max_pages
+    workers = OCR_WORKERS if workers is None else workers
+    pages = page_count or pdf_page_count(pdf_path)
+    if pages <= 0:
+        return []
+    if max_pages > 0:
+        pages = min(pages, max_pages)
+    tasks = [(pdf_path, i, dpi) for i in range(1, pages + 1)]
+    if workers > 1 and pages > 1:
+        try:
+            return list(_get_pool().map(ocr_pdf_page, tasks))
+        except (BrokenProcessPool, OSError) as e:
+            # Pool hỏng hoặc môi trường không cho tạo process → chạy tuần tự
+            print(f'[OCR] process pool failed, falling back to sequential OCR: {e}')
+            _reset_pool()
+    return [ocr_pdf_page(task) for task in tasks]
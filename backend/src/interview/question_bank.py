@@ -0,0 +1,394 @@
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import closing
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Các slot không phụ thuộc CV: lấy từ ngân hàng câu hỏi thay vì sinh lại bằng Gemini.
+# Số lượng khớp với SYSTEM_PROMPT (3 opening, 2 behavioral, 1 creative).
+BANK_SLOTS = {'opening': 3, 'behavioral': 2, 'creative': 1}
+GENERIC_JOB = '*'
+GENERIC_LEVEL = '*'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_key TEXT NOT NULL,
+    level TEXT NOT NULL,
+    category TEXT NOT NULL,
+    slot INTEGER NOT NULL DEFAULT 0,
+    question TEXT NOT NULL,
+    purpose TEXT,
+    norm TEXT NOT NULL,
+    embedding TEXT,
+    uses INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE(category, slot, norm)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_category_slot ON questions(category, slot);
+CREATE TABLE IF NOT EXISTS mined_sources (
+    name TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS source_meta (
+    name TEXT PRIMARY KEY,
+    job_title TEXT,
+    level TEXT
+);
+"""
+
+# Tăng khi _PERSONAL_PATTERNS / bộ lọc câu đổi: bank được dựng lại từ đầu (khai thác lại mọi file)
+# (2: dấu nháy đơn như "what's" không còn bị coi là trích dẫn từ CV;
+#  3: chặn thêm câu nhắc lại CV/lời chuyển tiếp hội thoại, ghi level khi khai thác)
+_FILTER_VERSION = 3
+
+# Dấu hiệu câu hỏi gắn với một CV cụ thể → không đưa vào ngân hàng
+_PERSONAL_PATTERNS = re.compile(
+    r"\byou (?:mentioned|list|listed|noted|described|worked|developed|built|led"
+    r"|highlight(?:ed|s)?|express(?:ed)?|emphasi[sz]e[sd]?|stated|shared|showed)\b"
+    r"|\byou've\b|\byour (?:cv|resume|profile)\b"
+    r"|\byou(?:'re|’re| are) (?:a|an) (?:[\w-]+ ){0,6}student\b"
+    r"|\bin your (?:\w+ ){0,3}(?:role|experience|project|internship|position at)\b"
+    # trích nguyên văn từ CV: "...", “...”, ‘...’ và '...' quanh từ; dấu nháy trong từ (what's, don't) không tính
+    r"|[\"“][^\"”]+[\"”]|‘[^’]+’|(?<!\w)'[^'\n]+'(?!\w)"
+    r"|^(?:thank you|thanks|hi|hello|good (?:morning|afternoon|evening))[,!]?\s+\w+[.,!]"
+    r"|^(?:thank you for|thanks for|building on)\b|^(?:thank you|thanks)[.!]"
+    r"|^as (?:a|an|someone) (?:[\w-]+ ){0,6}(?:student|learner|individual|graduate|person|someone)\b"
+    r"|\bgiven your\b|\byour (?:background|summary|experience|profile) (?:shows|mentions|indicates|highlights)\b",
+    re.IGNORECASE,
+)
+# Câu nhắc tới một cấp bậc cụ thể ("As an intern...") chỉ hợp với level đó → cần biết level khi khai thác
+_LEVEL_SPECIFIC = re.compile(r"\b(?:intern|internship|fresher|junior|senior|student|graduate)\b"
+                             r"|\bas (?:a|an) (?:team )?(?:lead|leader)\b", re.IGNORECASE)
+# Viết tắt toàn chữ hoa (tên công ty/dự án trong CV), trừ các thuật ngữ phổ biến
+_ACRONYM = re.compile(r"\b[A-Z]{2,}\b")
+_COMMON_ACRONYMS = {'AI', 'API', 'HR', 'IT', 'KPI', 'QA', 'SQL', 'UI', 'UX'}
+_LEVEL_WORDS = r"(?:Intern|Fresher|Junior|Senior|Lead|Leader)"
+# "... the Data Analyst Intern position/role" trong câu opening → suy ra vị trí khi không có metadata
+_POSITION_PHRASE = re.compile(r"\b(?:the|this|a|our) ((?:[A-Z][\w/+.#-]*\s){1,6})(?:position|role)\b")
+# Chuỗi >= 2 từ viết hoa liên tiếp (tên người, tên công ty/dự án) sau khi đã thay [JOB_TITLE]/[LEVEL]
+_PROPER_NOUN_RUN = re.compile(r"(?<![.?!]\s)(?<!^)\b[A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)+")
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize('NFC', text or '').lower()
+    text = re.sub(r'[^\w\s\[\]]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _replace_ci(text: str, needle: str, repl: str) -> str:
+    needle = (needle or '').strip()
+    if not needle:
+        return text
+    return re.sub(re.escape(needle), repl, text, flags=re.IGNORECASE)
+
+
+def templatize(text: str, job_title: Optional[str], level: Optional[str]) -> str:
+    """Thay vị trí/level cụ thể bằng placeholder để câu hỏi dùng lại được cho ứng viên khác."""
+    text = _replace_ci(text, job_title or '', '[JOB_TITLE]')
+    text = _replace_ci(text, level or '', '[LEVEL]')
+    # Level dính liền vị trí ("Fresher [JOB_TITLE]", "[JOB_TITLE] Intern") cũng thành placeholder
+    text = re.sub(rf"\b{_LEVEL_WORDS}\s+\[JOB_TITLE\]", '[LEVEL] [JOB_TITLE]', text, flags=re.IGNORECASE)
+    return re.sub(rf"\[JOB_TITLE\]\s+{_LEVEL_WORDS}\b", '[JOB_TITLE] [LEVEL]', text, flags=re.IGNORECASE)
+
+
+def render(text: str, job_title: str, level: str) -> str:
+    return text.replace('[JOB_TITLE]', job_title).replace('[LEVEL]', level)
+
+
+def infer_job_title(questions: List[Dict]) -> Optional[str]:
+    for q in questions or []:
+        if isinstance(q, dict) and (q.get('category') or '').lower() == 'opening':
+            match = _POSITION_PHRASE.search(q.get('question') or '')
+            if match:
+                return match.group(1).strip()
+    return None
+
+
+def is_generic(text: str) -> bool:
+    """True nếu câu hỏi không nhắc tới chi tiết riêng của một ứng viên (tên, dự án, CV...)."""
+    if _PERSONAL_PATTERNS.search(text):
+        return False
+    stripped = text.replace('[JOB_TITLE]', 'role').replace('[LEVEL]', 'level')
+    if any(a not in _COMMON_ACRONYMS for a in _ACRONYM.findall(stripped)):
+        return False
+    return _PROPER_NOUN_RUN.search(stripped) is None
+
+
+def _jaccard(a: str, b: str) -> float:
+    sa, sb = set(a.split()), set(b.split())
+    return len(sa & sb) / len(sa | sb) if sa and sb else 0.0
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+# Từ chỉ vai trò/cấp bậc trong tên vị trí: không mang tính chuyên ngành
+_ROLE_WORDS = {'intern', 'fresher', 'junior', 'senior', 'lead', 'manager', 'developer', 'engineer',
+               'dev', 'specialist', 'executive', 'staff', 'assistant', 'officer'}
+
+
+def _fits_job(row: Dict, job_key: str) -> bool:
+    """Câu khai thác từ vị trí khác vẫn nhắc chuyên ngành của vị trí đó ("a career in data") → không dùng."""
+    if row['job_key'] in (GENERIC_JOB, job_key):
+        return True
+    domain = set(row['job_key'].split()) - _ROLE_WORDS - set(job_key.split())
+    return not domain & set(normalize(row['question']).split())
+
+
+class QuestionBank:
+    """Ngân hàng câu hỏi không phụ thuộc CV (opening/behavioral/creative), SQLite.
+
+    - Khai thác từ kho `interview_question/` và từ mỗi bộ câu hỏi mới sinh đầy đủ; câu hỏi
+      cá nhân hoá bị loại, vị trí/level được thay bằng placeholder, câu gần trùng bị bỏ
+      (Jaccard trên từ, và cosine embedding nếu có `embedder`).
+    - Opening giữ vị trí (slot 1: giới thiệu, 2: điểm mạnh/yếu, 3: lý do ứng tuyển).
+    - Level của bộ câu hỏi được ghi kèm (meta_lookup khi khai thác); câu không rõ level mà nhắc tới
+      một cấp bậc bị bỏ. select() chỉ dùng câu cùng level hoặc không gắn level.
+    - select() chọn theo: khớp vị trí/level, độ gần embedding với ngữ cảnh (CV + vị trí)
+      nếu có embedder, rồi ít được dùng nhất – để các ứng viên không nhận y hệt nhau.
+    """
+
+    def __init__(self, db_path: str, embedder: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 near_duplicate: float = 0.8, near_duplicate_cosine: float = 0.92):
+        self.db_path = db_path
+        self.embedder = embedder
+        self.near_duplicate = near_duplicate
+        self.near_duplicate_cosine = near_duplicate_cosine
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_questions_level ON questions(level)')
+            if conn.execute('PRAGMA user_version').fetchone()[0] < _FILTER_VERSION:
+                # Bộ lọc đổi → dựng lại bank: câu đã lọt bộ lọc cũ bị xoá, mọi file được khai thác lại
+                conn.execute('DELETE FROM questions')
+                conn.execute('DELETE FROM mined_sources')
+                conn.execute(f'PRAGMA user_version = {_FILTER_VERSION}')
+        # Cache các dòng của bảng questions (embedding đã parse), làm mới khi MAX(id) đổi (có câu mới)
+        self._rows: List[Dict] = []
+        self._rows_max_id: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        if self.embedder is None or not texts:
+            return None
+        try:
+            return self.embedder(texts)
+        except Exception as e:
+            print(f'[QUESTION_BANK] embedding failed: {e}')
+            return None
+
+    # -------------------- ghi --------------------
+    def _candidates(self, questions: List[Dict]) -> Iterable[Tuple[str, int, Dict]]:
+        opening_slot = 0
+        for q in questions or []:
+            if not isinstance(q, dict):
+                continue
+            category = (q.get('category') or '').strip().lower()
+            if category not in BANK_SLOTS:
+                continue
+            slot = 0
+            if category == 'opening':
+                opening_slot += 1
+                slot = opening_slot
+                if slot > BANK_SLOTS['opening']:
+                    continue
+            yield category, slot, q
+
+    def add_questions(self, questions: List[Dict], job_title: Optional[str] = None, level: Optional[str] = None,
+                      source: Optional[str] = None) -> int:
+        """Thêm các câu opening/behavioral/creative hợp lệ của một bộ câu hỏi; trả về số câu mới."""
+        job_key = normalize(job_title) if job_title else GENERIC_JOB
+        level_key = (level or GENERIC_LEVEL).strip() or GENERIC_LEVEL
+        if source and (job_title or level):
+            # Giữ qua các lần dựng lại bank: khai thác lại file này vẫn biết vị trí/level
+            with closing(self._connect()) as conn:
+                conn.execute('INSERT OR REPLACE INTO source_meta (name, job_title, level) VALUES (?, ?, ?)',
+                             (source, job_title, level))
+        rows = []
+        for category, slot, q in self._candidates(questions):
+            text = templatize((q.get('question') or '').strip(), job_title, level)
+            if not text or not is_generic(text):
+                continue
+            if level_key == GENERIC_LEVEL and _LEVEL_SPECIFIC.search(text):
+                continue  # không biết level của bộ câu hỏi → không dùng câu gắn với một cấp bậc
+            purpose = templatize((q.get('purpose') or '').strip(), job_title, level)
+            rows.append((category, slot, text, purpose, normalize(text)))
+        if not rows:
+            return 0
+        embeddings = self._embed([r[2] for r in rows]) or [None] * len(rows)
+        added = 0
+        now = time.time()
+        with self._lock, closing(self._connect()) as conn:
+            for (category, slot, text, purpose, norm), emb in zip(rows, embeddings):
+                existing = conn.execute(
+                    'SELECT norm, embedding FROM questions WHERE category = ? AND slot = ?', (category, slot)
+                ).fetchall()
+                if any(_jaccard(norm, r['norm']) >= self.near_duplicate for r in existing):
+                    continue
+                if emb is not None and any(
+                    r['embedding'] and _cosine(emb, json.loads(r['embedding'])) >= self.near_duplicate_cosine
+                    for r in existing
+                ):
+                    continue
+                cur = conn.execute(
+                    'INSERT OR IGNORE INTO questions (job_key, level, category, slot, question, purpose, norm, '
+                    'embedding, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (job_key, level_key, category, slot, text, purpose, norm,
+                     json.dumps(emb) if emb is not None else None, source, now),
+                )
+                added += cur.rowcount
+        return added
+
+    def mine_directory(self, directory: str, meta_lookup: Optional[Callable[[str], Tuple[Optional[str], Optional[str]]]] = None) -> Tuple[int, int]:
+        """Khai thác các `*.questions.json` chưa xử lý (hoặc đã đổi). Trả về (số file, số câu mới).
+
+        Vị trí/level của mỗi file: metadata đã ghi khi file được sinh, rồi meta_lookup(tên file),
+        rồi suy ra từ câu opening (chỉ vị trí)."""
+        files = added = 0
+        with closing(self._connect()) as conn:
+            mined = {r['name']: r['mtime'] for r in conn.execute('SELECT name, mtime FROM mined_sources')}
+            known = {r['name']: (r['job_title'], r['level'])
+                     for r in conn.execute('SELECT name, job_title, level FROM source_meta')}
+        for path in sorted(Path(directory).glob('*.questions.json')):
+            mtime = path.stat().st_mtime
+            if mined.get(path.name) == mtime:
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    questions = json.load(f)
+            except Exception as e:
+                print(f'[QUESTION_BANK] skip {path.name}: {e}')
+                continue
+            job_title, level = known.get(path.name) or (meta_lookup(path.name) if meta_lookup else (None, None))
+            if not job_title and isinstance(questions, list):
+                job_title = infer_job_title(questions)
+            added += self.add_questions(questions if isinstance(questions, list) else [], job_title, level, source=path.name)
+            files += 1
+            with closing(self._connect()) as conn:
+                conn.execute('INSERT OR REPLACE INTO mined_sources (name, mtime) VALUES (?, ?)', (path.name, mtime))
+        return files, added
+
+    # -------------------- đọc --------------------
+    def _load_rows(self, conn: sqlite3.Connection) -> List[Dict]:
+        """Các dòng của bảng questions; chỉ đọc lại cả bảng khi có câu mới (kể cả từ process khác)."""
+        max_id = conn.execute('SELECT MAX(id) FROM questions').fetchone()[0]
+        with self._lock:
+            if max_id != self._rows_max_id:
+                rows = []
+                for r in conn.execute('SELECT id, job_key, level, category, slot, question, purpose, embedding, uses '
+                                      'FROM questions'):
+                    row = dict(r)
+                    row['embedding'] = json.loads(row['embedding']) if row['embedding'] else None
+                    rows.append(row)
+                self._rows, self._rows_max_id = rows, max_id
+            return self._rows
+
+    def select(self, job_title: str, level: str, context: str = '') -> Optional[Dict[str, List[Dict]]]:
+        """Chọn câu cho mọi slot của BANK_SLOTS; None nếu ngân hàng chưa đủ câu cho vị trí/level này.
+        Chỉ dùng câu khai thác từ cùng level hoặc không gắn với level nào."""
+        job_key = normalize(job_title)
+        level = (level or '').strip()
+        with closing(self._connect()) as conn:
+            rows = self._load_rows(conn)
+        by_slot: Dict[Tuple[str, int], List[Dict]] = {}
+        for r in rows:
+            if r['level'] in (GENERIC_LEVEL, level) and _fits_job(r, job_key):
+                by_slot.setdefault((r['category'], r['slot']), []).append(r)
+        wanted: List[Tuple[str, int, int]] = [('opening', s, 1) for s in range(1, BANK_SLOTS['opening'] + 1)]
+        wanted += [(c, 0, n) for c, n in BANK_SLOTS.items() if c != 'opening']
+        if any(len(by_slot.get((c, s), [])) < n for c, s, n in wanted):
+            return None
+
+        context_emb = None
+        if context and self.embedder is not None:
+            emb = self._embed([context[:4000]])
+            context_emb = emb[0] if emb else None
+
+        def _rank(r: Dict) -> float:
+            score = 0.0
+            if r['job_key'] == job_key:
+                score += 1.0
+            if r['level'] == level:
+                score += 0.3
+            if context_emb is not None and r['embedding']:
+                score += _cosine(context_emb, r['embedding'])
+            # Ưu tiên câu ít dùng, thêm chút ngẫu nhiên để xoay vòng
+            return score - 0.05 * r['uses'] + random.random() * 0.05
+
+        picked: Dict[str, List[Dict]] = {c: [] for c in BANK_SLOTS}
+        used = []
+        for category, slot, n in wanted:
+            for r in sorted(by_slot[(category, slot)], key=_rank, reverse=True)[:n]:
+                used.append(r)
+                item = {'question': render(r['question'], job_title, level), 'category': category,
+                        'purpose': render(r['purpose'] or '', job_title, level), 'source': 'bank'}
+                picked[category].append(item)
+        with closing(self._connect()) as conn:
+            conn.executemany('UPDATE questions SET uses = uses + 1 WHERE id = ?', [(r['id'],) for r in used])
+        with self._lock:
+            for r in used:
+                r['uses'] += 1  # bản cache trong process; process khác thấy khi đọc lại bảng
+        return picked
+
+    def stats(self) -> Dict:
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT category, slot, COUNT(*) AS n FROM questions GROUP BY category, slot').fetchall()
+            sources = conn.execute('SELECT COUNT(*) FROM mined_sources').fetchone()[0]
+        return {
+            'slots': {f"{r['category']}#{r['slot']}" if r['category'] == 'opening' else r['category']: r['n'] for r in rows},
+            'mined_sources': sources,
+            'embeddings': self.embedder is not None,
+        }
+
+
+QUESTION_BANK_ENABLED = os.getenv('QUESTION_BANK_ENABLED', '1') == '1'
+_bank: Optional[QuestionBank] = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank() -> Optional[QuestionBank]:
+    """Ngân hàng dùng chung; None nếu bị tắt (QUESTION_BANK_ENABLED=0)."""
+    global _bank
+    if not QUESTION_BANK_ENABLED:
+        return None
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                try:
+                    from interview import vector_index
+                except ImportError:  # chạy trực tiếp như script từ src/interview
+                    import vector_index  # type: ignore
+                index = vector_index.get_vector_index()
+                default_path = Path(__file__).parent.parent.parent / 'cache' / 'question_bank.sqlite3'
+                _bank = QuestionBank(os.getenv('QUESTION_BANK_PATH', str(default_path)),
+                                     embedder=index.embed if index is not None else None)
+    return _bank
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Khai thác ngân hàng câu hỏi từ interview_question/')
+    parser.add_argument('--dir', default=str(Path(__file__).parent.parent.parent / 'interview_question'))
+    args = parser.parse_args()
+    bank = get_question_bank()
+    if bank is None:
+        print('Question bank đang tắt (QUESTION_BANK_ENABLED=0)')
+    else:
+        n_files, n_added = bank.mine_directory(args.dir)
+        print(f'Đã khai thác {n_files} file, thêm {n_added} câu hỏi')
+        print(json.dumps(bank.stats(), ensure_ascii=False, indent=2))
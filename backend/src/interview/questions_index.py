@@ -0,0 +1,144 @@
+import bisect
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+QUESTIONS_SUFFIX = '.questions.json'
+
+
+class QuestionsIndex:
+    """In-memory index of `*.questions.json` files in one directory.
+
+    Replaces the glob + stat-per-candidate scans of the resolver endpoints:
+    - exact name: dict lookup
+    - UUID prefix (stem startswith): bisect over sorted names
+    - original-name suffix (name endswith): bisect over sorted reversed names
+    - latest file: tracked on write
+    The index is updated incrementally via add()/remove() by writers, and a polling
+    watcher rescans the directory whenever its mtime changes (files added by other
+    processes or by hand).
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 5.0):
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._mtimes: Dict[str, float] = {}
+        self._sorted: List[str] = []
+        self._sorted_rev: List[str] = []
+        self._latest: Optional[str] = None
+        self._dir_mtime: Optional[float] = None
+        self._watcher: Optional[threading.Thread] = None
+        self.rescan()
+
+    # -------------------- maintenance --------------------
+    def rescan(self) -> None:
+        mtimes: Dict[str, float] = {}
+        try:
+            dir_mtime = self.directory.stat().st_mtime
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(QUESTIONS_SUFFIX) and entry.is_file():
+                        mtimes[entry.name] = entry.stat().st_mtime
+        except FileNotFoundError:
+            dir_mtime = None
+        with self._lock:
+            self._mtimes = mtimes
+            self._sorted = sorted(mtimes)
+            self._sorted_rev = sorted(name[::-1] for name in mtimes)
+            self._latest = max(mtimes, key=mtimes.get) if mtimes else None
+            self._dir_mtime = dir_mtime
+
+    def refresh_if_changed(self) -> bool:
+        try:
+            dir_mtime = self.directory.stat().st_mtime
+        except FileNotFoundError:
+            dir_mtime = None
+        if dir_mtime == self._dir_mtime:
+            return False
+        self.rescan()
+        return True
+
+    def add(self, path: Path) -> None:
+        name = Path(path).name
+        if not name.endswith(QUESTIONS_SUFFIX):
+            return
+        try:
+            mtime = Path(path).stat().st_mtime
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if name not in self._mtimes:
+                bisect.insort(self._sorted, name)
+                bisect.insort(self._sorted_rev, name[::-1])
+            self._mtimes[name] = mtime
+            if self._latest is None or mtime >= self._mtimes.get(self._latest, 0):
+                self._latest = name
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            if self._mtimes.pop(name, None) is None:
+                return
+            del self._sorted[bisect.bisect_left(self._sorted, name)]
+            del self._sorted_rev[bisect.bisect_left(self._sorted_rev, name[::-1])]
+            if self._latest == name:
+                self._latest = max(self._mtimes, key=self._mtimes.get) if self._mtimes else None
+
+    def start_watcher(self) -> None:
+        if self._watcher is not None:
+            return
+
+        def _watch() -> None:
+            stop = threading.Event()
+            while not stop.wait(self.poll_interval):
+                try:
+                    self.refresh_if_changed()
+                except Exception as e:
+                    print('[QUESTIONS_INDEX] watcher error:', e)
+
+        self._watcher = threading.Thread(target=_watch, name='questions-index-watcher', daemon=True)
+        self._watcher.start()
+
+    # -------------------- queries --------------------
+    @staticmethod
+    def _range(sorted_list: List[str], prefix: str) -> List[str]:
+        lo = bisect.bisect_left(sorted_list, prefix)
+        hi = bisect.bisect_left(sorted_list, prefix + '\U0010ffff')
+        return sorted_list[lo:hi]
+
+    def _newest(self, names: List[str]) -> Optional[str]:
+        return max(names, key=lambda n: self._mtimes.get(n, 0)) if names else None
+
+    def __len__(self) -> int:
+        return len(self._mtimes)
+
+    def latest(self) -> Optional[str]:
+        with self._lock:
+            return self._latest
+
+    def resolve(self, hint: str) -> Optional[str]:
+        """Best match for a hint: full name, uuid prefix, suffix after first underscore, or substring."""
+        if not hint:
+            return None
+        with self._lock:
+            if hint in self._mtimes:
+                return hint
+            # uuid prefix (before first underscore) – newest wins
+            prefix = hint.split('_')[0]
+            if prefix:
+                best = self._newest(self._range(self._sorted, prefix))
+                if best:
+                    return best
+            # suffix match (after the first underscore) – ignore UUID differences
+            if '_' in hint:
+                suffix = hint.split('_', 1)[1]
+                if suffix:
+                    best = self._newest([r[::-1] for r in self._range(self._sorted_rev, suffix[::-1])])
+                    if best:
+                        return best
+            # last resort: substring (in-memory, không stat)
+            for name in self._sorted:
+                if hint in name:
+                    return name
+        return None
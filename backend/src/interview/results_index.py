@@ -0,0 +1,121 @@
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+RESULTS_SUFFIX = '.json'
+
+
+class ResultsIndex:
+    """In-memory, mtime-sorted index of the result files (`*.json`) in one directory.
+
+    Backs the files-mode `/api/results` pagination without a scandir + stat of every
+    file per page:
+    - order: (mtime, name) kept sorted on write, newest page = tail slice
+    - cursor (`before` = file name): dict lookup + bisect
+    - summary: parsed lazily for the rows of the requested page only, then kept
+      until the file's mtime/size changes
+    Writers update it via add(); files added by other processes or by hand are
+    picked up by refresh_if_changed() (directory mtime), like QuestionsIndex.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._order: List[Tuple[float, str]] = []
+        self._dir_mtime: Optional[float] = None
+        self.rescan()
+
+    # -------------------- maintenance --------------------
+    def rescan(self) -> None:
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            dir_mtime = self.directory.stat().st_mtime
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(RESULTS_SUFFIX) and entry.is_file():
+                        st = entry.stat()
+                        entries[entry.name] = {'mtime': st.st_mtime, 'size': st.st_size}
+        except FileNotFoundError:
+            dir_mtime = None
+        with self._lock:
+            # Giữ summary đã parse của file không đổi
+            for name, item in entries.items():
+                old = self._entries.get(name)
+                if old and 'summary' in old and old['mtime'] == item['mtime'] and old['size'] == item['size']:
+                    item['summary'] = old['summary']
+            self._entries = entries
+            self._order = sorted((item['mtime'], name) for name, item in entries.items())
+            self._dir_mtime = dir_mtime
+
+    def refresh_if_changed(self) -> bool:
+        try:
+            dir_mtime = self.directory.stat().st_mtime
+        except FileNotFoundError:
+            dir_mtime = None
+        if dir_mtime == self._dir_mtime:
+            return False
+        self.rescan()
+        return True
+
+    def add(self, path: Path) -> None:
+        name = Path(path).name
+        if not name.endswith(RESULTS_SUFFIX):
+            return
+        try:
+            st = (self.directory / name).stat()
+            dir_mtime = self.directory.stat().st_mtime
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._drop(name)
+            self._entries[name] = {'mtime': st.st_mtime, 'size': st.st_size}
+            bisect.insort(self._order, (st.st_mtime, name))
+            # Lần ghi này đã có trong index: không để refresh_if_changed quét lại cả thư mục
+            if self._dir_mtime is not None:
+                self._dir_mtime = dir_mtime
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._drop(name)
+
+    def _drop(self, name: str) -> None:
+        item = self._entries.pop(name, None)
+        if item is not None:
+            del self._order[bisect.bisect_left(self._order, (item['mtime'], name))]
+
+    def _summary(self, name: str, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if 'summary' not in item:
+            try:
+                with open(self.directory / name, 'r', encoding='utf-8') as fp:
+                    data = json.load(fp)
+                item['summary'] = data.get('summary') or {}
+            except Exception:
+                return None
+        return item['summary']
+
+    # -------------------- queries --------------------
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def page(self, limit: int, before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """Trang kết quả mới nhất trước (mtime, rồi tên giảm dần) sau cursor `before`;
+        cursor không còn trong index thì trả trang đầu. → (items, còn trang sau)."""
+        with self._lock:
+            end = len(self._order)
+            item = self._entries.get(before) if before else None
+            if item is not None:
+                end = bisect.bisect_left(self._order, (item['mtime'], before))
+            start = max(0, end - limit)
+            rows = [(name, self._entries[name]) for _, name in reversed(self._order[start:end])]
+        items = []
+        for name, row in rows:
+            entry = {'filename': name, 'modified': row['mtime']}
+            summary = self._summary(name, row)
+            if summary is not None:
+                entry['summary'] = summary
+            items.append(entry)
+        return items, start > 0
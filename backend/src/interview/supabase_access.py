@@ -0,0 +1,269 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, TYPE_CHECKING
+
+import httpx
+
+try:
+    from interview.lazy_import import is_available, lazy_module
+except ImportError:  # chạy trực tiếp trong thư mục src/interview
+    from lazy_import import is_available, lazy_module  # type: ignore
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client  # type: ignore
+
+# SDK chỉ được import khi tạo client lần đầu hoặc trong warmup
+supabase_sdk = lazy_module('supabase')
+SUPABASE_AVAILABLE = is_available('supabase')
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Request bị chặn vì Supabase đang được coi là down (circuit open)."""
+
+
+class CircuitBreaker:
+    """Circuit breaker closed → open → half-open.
+
+    `failure_threshold` lỗi liên tiếp thì mở mạch: mọi lời gọi bị từ chối ngay trong
+    `reset_timeout` giây. Hết thời gian đó, đúng một lời gọi thử (half-open) được đi qua:
+    thành công thì đóng mạch, lỗi thì mở lại. Lời gọi thử không báo kết quả sau
+    `reset_timeout` giây được coi là mất và một lời gọi khác được thử.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_at = 0.0
+        self.last_error: Optional[str] = None
+        self.opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_at = now
+                return True
+            if self.state == HALF_OPEN and now - self._trial_at >= self.reset_timeout:
+                self._trial_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self) -> bool:
+        """False (đếm là bị từ chối) khi mạch đang mở và chưa tới lúc thử lại. Không đổi trạng thái và
+        không dùng lượt thử half-open: lượt đó chỉ dành cho request thật (allow() ở transport)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                print('[SUPABASE] circuit closed')
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self, error: Any) -> None:
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                print(f'[SUPABASE] circuit open for {self.reset_timeout:.0f}s after {self.failures} failure(s): {self.last_error}')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if self.state == OPEN else 0.0
+            return {'state': self.state, 'failures': self.failures, 'opened': self.opened,
+                    'rejected': self.rejected, 'retry_in': round(retry_in, 1), 'last_error': self.last_error}
+
+
+def _is_failure(response: httpx.Response) -> bool:
+    # 4xx (RLS, sai schema...) là lỗi của request, không phải Supabase down
+    return response.status_code >= 500
+
+
+class _BreakerTransport(httpx.BaseTransport):
+    """Transport của pool dùng chung: breaker được kiểm tra và ghi nhận quanh từng request thật
+    (mạch mở → chặn; half-open → chỉ một request thử đi qua, các request khác bị chặn)."""
+
+    def __init__(self, breaker: CircuitBreaker, transport: httpx.BaseTransport):
+        self.breaker = breaker
+        self.transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError('Supabase circuit open', request=request)
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError as e:
+            self.breaker.record_failure(e)
+            raise
+        if _is_failure(response):
+            self.breaker.record_failure(f'HTTP {response.status_code}')
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class _AsyncBreakerTransport(httpx.AsyncBaseTransport):
+    def __init__(self, breaker: CircuitBreaker, transport: httpx.AsyncBaseTransport):
+        self.breaker = breaker
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError('Supabase circuit open', request=request)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError as e:
+            self.breaker.record_failure(e)
+            raise
+        if _is_failure(response):
+            self.breaker.record_failure(f'HTTP {response.status_code}')
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class SupabaseAccess:
+    """Lớp truy cập Supabase dùng chung cho app Flask và chế độ ASGI.
+
+    - Cấu hình lỗi (thiếu SDK/URL/key, create_client lỗi) được nhớ `config_retry` giây: trong
+      thời gian đó client() trả None ngay, không đọc lại .env và không thử tạo client.
+    - Circuit breaker: khi Supabase down, client() trả None ngay (caller chuyển sang chế độ file)
+      thay vì mỗi request chờ timeout kết nối. Lấy client không dùng lượt thử half-open (caller chỉ
+      kiểm tra `client is not None` không làm mất lượt đó); breaker được kiểm tra và ghi nhận quanh
+      từng request HTTP thật, nên execute() bị chặn sẽ raise CircuitOpenError.
+    - Mọi request đi qua một pool HTTP keep-alive dùng chung, có timeout cho từng lời gọi.
+    """
+
+    def __init__(self, load_env: Callable[[], None], timeout: float = 5.0, connect_timeout: float = 2.0,
+                 pool_size: int = 20, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 config_retry: float = 60.0):
+        self.load_env = load_env
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.pool_size = pool_size
+        self.config_retry = config_retry
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._lock = threading.Lock()
+        self._client: Optional["Client"] = None
+        self._async_client: Optional["AsyncClient"] = None
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._config_error: Optional[str] = None
+        self._config_retry_at = 0.0
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size,
+                            keepalive_expiry=30.0)
+
+    def _config(self) -> Optional[Tuple[str, str]]:
+        """(url, key) hoặc None; lỗi cấu hình được cache `config_retry` giây (gọi khi giữ lock)."""
+        if self._config_error is not None and time.monotonic() < self._config_retry_at:
+            return None
+        self.load_env()
+        url = os.getenv('SUPABASE_URL')
+        key = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('SUPABASE_ANON_KEY')
+        if not SUPABASE_AVAILABLE:
+            error = 'SDK not available (pip install supabase).'
+        elif not url:
+            error = 'Missing SUPABASE_URL in environment.'
+        elif not key:
+            error = 'Missing SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY in environment.'
+        else:
+            return url, key
+        self._config_failed(error)
+        return None
+
+    def _config_failed(self, error: str) -> None:
+        self._config_error = error
+        self._config_retry_at = time.monotonic() + self.config_retry
+        print(f'[SUPABASE] {error} (retry in {self.config_retry:.0f}s)')
+
+    def client(self) -> Optional["Client"]:
+        """Client sync dùng chung, hoặc None (chưa cấu hình / mạch đang mở) để caller dùng chế độ file."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    config = self._config()
+                    if config is None:
+                        return None
+                    http = httpx.Client(timeout=self._timeout(), limits=self._limits(), follow_redirects=True,
+                                        transport=_BreakerTransport(self.breaker, httpx.HTTPTransport(
+                                            limits=self._limits(), http2=is_available('h2'))))
+                    try:
+                        options = supabase_sdk.ClientOptions(httpx_client=http)
+                        self._client = supabase_sdk.create_client(config[0], config[1], options=options)
+                    except Exception as e:
+                        http.close()
+                        self._config_failed(f'create_client failed: {e}')
+                        return None
+                    self._config_error = None
+        return self._client if self.breaker.available() else None
+
+    async def async_client(self) -> Optional["AsyncClient"]:
+        """Như client() cho chế độ ASGI (AsyncClient, pool httpx.AsyncClient riêng, cùng breaker)."""
+        if self._async_client is None:
+            if self._async_lock is None:
+                self._async_lock = asyncio.Lock()
+            async with self._async_lock:
+                if self._async_client is None:
+                    with self._lock:
+                        config = self._config()
+                    if config is None:
+                        return None
+                    http = httpx.AsyncClient(timeout=self._timeout(), limits=self._limits(), follow_redirects=True,
+                                             transport=_AsyncBreakerTransport(self.breaker, httpx.AsyncHTTPTransport(
+                                                 limits=self._limits(), http2=is_available('h2'))))
+                    try:
+                        options = supabase_sdk.AsyncClientOptions(httpx_client=http)
+                        self._async_client = await supabase_sdk.acreate_client(config[0], config[1], options=options)
+                    except Exception as e:
+                        await http.aclose()
+                        with self._lock:
+                            self._config_failed(f'acreate_client failed: {e}')
+                        return None
+        return self._async_client if self.breaker.available() else None
+
+    def reset(self) -> None:
+        """Bỏ client, pool và trạng thái breaker (sau fork: socket của process cha không dùng lại)."""
+        with self._lock:
+            self._client = None
+            self._async_client = None
+            self._async_lock = None
+            self._config_error = None
+            self.breaker = CircuitBreaker(self.breaker.failure_threshold, self.breaker.reset_timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        config_retry_in = max(0.0, self._config_retry_at - time.monotonic()) if self._config_error else 0.0
+        return {'client': self._client is not None, 'config_error': self._config_error,
+                'config_retry_in': round(config_retry_in, 1), 'timeout': self.timeout,
+                'pool_size': self.pool_size, 'circuit': self.breaker.stats()}
@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from interview.lazy_import import is_available, lazy_module
+except ImportError:  # chạy trực tiếp như script từ src/interview
+    from lazy_import import is_available, lazy_module  # type: ignore
+
+# chromadb / sentence-transformers là phụ thuộc tuỳ chọn (nặng): thiếu thì index bị tắt,
+# mọi lời gọi trả về rỗng và luồng chính không bị ảnh hưởng. Có cài thì chỉ import khi
+# index được dùng lần đầu (mở collection / embed), không lúc import module.
+chromadb = lazy_module('chromadb')
+sentence_transformers = lazy_module('sentence_transformers')
+VECTOR_INDEX_AVAILABLE = is_available('chromadb') and is_available('sentence_transformers')
+
+VECTOR_INDEX_ENABLED = os.getenv('VECTOR_INDEX_ENABLED', '1') == '1'
+# Model đa ngôn ngữ (câu hỏi/câu trả lời tiếng Việt lẫn tiếng Anh)
+VECTOR_INDEX_MODEL = os.getenv('VECTOR_INDEX_MODEL', 'paraphrase-multilingual-MiniLM-L12-v2')
+VECTOR_INDEX_BATCH = int(os.getenv('VECTOR_INDEX_BATCH', '64'))
+
+QUESTIONS_COLLECTION = 'questions'
+ANSWERS_COLLECTION = 'answers'
+_STATE_FILE = 'state.json'
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class VectorIndex:
+    """Embedding index (Chroma, persist trên đĩa) của câu hỏi đã sinh và câu trả lời đã chấm.
+
+    - collection `questions`: mỗi câu hỏi trong `*.questions.json` (metadata: source, category,
+      job_title/level nếu biết)
+    - collection `answers`: mỗi cặp câu hỏi + câu trả lời trong kết quả chấm (metadata: source,
+      candidate_name, question_id, overall_score)
+    Nguồn đã index được ghi trong state.json (mtime file / id DB lớn nhất), nên sync chỉ
+    embed phần mới hoặc đã đổi; embed và upsert theo lô `batch_size`.
+    """
+
+    def __init__(self, persist_dir: str, model_name: str = VECTOR_INDEX_MODEL, batch_size: int = VECTOR_INDEX_BATCH):
+        self.persist_dir = persist_dir
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.RLock()
+        self._client = None
+        self._model = None
+        self._collections: Dict[str, Any] = {}
+        os.makedirs(persist_dir, exist_ok=True)
+        self._state_path = os.path.join(persist_dir, _STATE_FILE)
+        self._state = self._load_state()
+
+    # -------------------- internals --------------------
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self._state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        state.setdefault('sources', {})
+        state.setdefault('checkpoints', {})
+        return state
+
+    def _save_state(self) -> None:
+        tmp = f'{self._state_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, ensure_ascii=False)
+        os.replace(tmp, self._state_path)
+
+    def _collection(self, name: str):
+        if name not in self._collections:
+            with self._lock:
+                if self._client is None:
+                    self._client = chromadb.PersistentClient(path=self.persist_dir)
+                if name not in self._collections:
+                    self._collections[name] = self._client.get_or_create_collection(
+                        name, metadata={'hnsw:space': 'cosine'})
+        return self._collections[name]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    print(f'[VECTOR] loading embedding model {self.model_name}...')
+                    self._model = sentence_transformers.SentenceTransformer(self.model_name)
+        vectors = self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                     show_progress_bar=False)
+        return [list(map(float, v)) for v in vectors]
+
+    def _upsert(self, collection: str, docs: List[Tuple[str, str, Dict[str, Any]]]) -> int:
+        col = self._collection(collection)
+        for batch in _chunks(docs, self.batch_size):
+            ids = [d[0] for d in batch]
+            texts = [d[1] for d in batch]
+            metas = [{k: v for k, v in d[2].items() if isinstance(v, (str, int, float, bool))} for d in batch]
+            col.upsert(ids=ids, documents=texts, embeddings=self.embed(texts), metadatas=metas)
+        return len(docs)
+
+    def _replace_source(self, collection: str, source: str, docs: List[Tuple[str, str, Dict[str, Any]]],
+                        version: Any) -> int:
+        """Thay toàn bộ vector của một nguồn (file/row) rồi ghi nhận phiên bản đã index."""
+        with self._lock:
+            self._collection(collection).delete(where={'source': source})
+            count = self._upsert(collection, docs)
+            self._state['sources'][f'{collection}:{source}'] = version
+            self._save_state()
+        return count
+
+    def _is_current(self, collection: str, source: str, version: Any) -> bool:
+        return self._state['sources'].get(f'{collection}:{source}') == version
+
+    def reload_state(self) -> None:
+        """Đọc lại state.json (process vừa nhận quyền ghi: state trong bộ nhớ có thể đã cũ)."""
+        with self._lock:
+            self._state = self._load_state()
+
+    # -------------------- indexing --------------------
+    def index_questions(self, source: str, questions: List[Dict[str, Any]], meta: Optional[Dict[str, Any]] = None,
+                        version: Any = None) -> int:
+        docs = []
+        for i, q in enumerate(questions or []):
+            text = (q.get('question') or '').strip() if isinstance(q, dict) else ''
+            if not text:
+                continue
+            docs.append((f'{source}#{i}', text, dict(meta or {}, source=source, category=q.get('category') or '')))
+        return self._replace_source(QUESTIONS_COLLECTION, source, docs, version)
+
+    def index_questions_file(self, path: Path, meta: Optional[Dict[str, Any]] = None) -> int:
+        path = Path(path)
+        mtime = path.stat().st_mtime
+        if meta is None and self._is_current(QUESTIONS_COLLECTION, path.name, mtime):
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        return self.index_questions(path.name, questions if isinstance(questions, list) else [], meta, version=mtime)
+
+    def index_result(self, source: str, result: Dict[str, Any], version: Any = None) -> int:
+        """Index một kết quả chấm ({summary, details}); mỗi câu là một vector câu hỏi + câu trả lời."""
+        summary = result.get('summary') or {}
+        details = result.get('details') or {}
+        candidate = summary.get('candidate_name') or ''
+        docs = []
+        for qid, item in details.items():
+            if not isinstance(item, dict):
+                continue
+            text = f"{item.get('question', '')}\n{item.get('answer', '')}".strip()
+            if not text:
+                continue
+            meta = {'source': source, 'candidate_name': candidate, 'question_id': str(qid)}
+            if isinstance(item.get('overall_score'), (int, float)):
+                meta['overall_score'] = item['overall_score']
+            docs.append((f'{source}#{qid}', text, meta))
+        return self._replace_source(ANSWERS_COLLECTION, source, docs, version)
+
+    def sync_questions_dir(self, directory: str,
+                           meta_lookup: Optional[Callable[[str], Tuple[Optional[str], Optional[str]]]] = None) -> int:
+        """Index file câu hỏi mới/đã đổi; `meta_lookup(tên file) -> (job_title, level)` bổ sung metadata
+        cho file do process khác sinh ra (process đó không tự ghi index, xem `can_write`)."""
+        total = 0
+        for path in sorted(Path(directory).glob('*.questions.json')):
+            try:
+                if self._is_current(QUESTIONS_COLLECTION, path.name, path.stat().st_mtime):
+                    continue
+                job_title, level = meta_lookup(path.name) if meta_lookup is not None else (None, None)
+                meta = {k: v for k, v in (('job_title', job_title), ('level', level)) if v}
+                total += self.index_questions_file(path, meta or None)
+            except Exception as e:
+                print(f'[VECTOR] skip {path.name}: {e}')
+        return total
+
+    def sync_results_dir(self, directory: str) -> int:
+        total = 0
+        for path in sorted(Path(directory).glob('*_results.json')):
+            mtime = path.stat().st_mtime
+            if self._is_current(ANSWERS_COLLECTION, path.name, mtime):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = json.load(f)
+                if isinstance(result, dict):
+                    total += self.index_result(path.name, result, version=mtime)
+            except Exception as e:
+                print(f'[VECTOR] skip {path.name}: {e}')
+        return total
+
+    def get_checkpoint(self, name: str) -> Any:
+        return self._state['checkpoints'].get(name)
+
+    def set_checkpoint(self, name: str, value: Any) -> None:
+        with self._lock:
+            self._state['checkpoints'][name] = value
+            self._save_state()
+
+    # -------------------- queries --------------------
+    def _query(self, collection: str, text: str, k: int, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        col = self._collection(collection)
+        if not text.strip() or col.count() == 0:
+            return []
+        res = col.query(query_embeddings=self.embed([text]), n_results=min(k, col.count()), where=where or None)
+        out = []
+        for doc, meta, dist in zip(res['documents'][0], res['metadatas'][0], res['distances'][0]):
+            out.append({'text': doc, 'score': round(1.0 - float(dist), 4), **(meta or {})})
+        return out
+
+    def similar_questions(self, text: str, k: int = 10, exclude_source: Optional[str] = None) -> List[Dict[str, Any]]:
+        where = {'source': {'$ne': exclude_source}} if exclude_source else None
+        return self._query(QUESTIONS_COLLECTION, text, k, where)
+
+    def similar_candidates(self, text: str, k: int = 10) -> List[Dict[str, Any]]:
+        """Xếp hạng bài phỏng vấn (nguồn kết quả) theo câu trả lời gần nhất với `text`."""
+        best: Dict[str, Dict[str, Any]] = {}
+        for hit in self._query(ANSWERS_COLLECTION, text, k * 5):
+            source = hit.get('source')
+            entry = best.setdefault(source, {'source': source, 'candidate_name': hit.get('candidate_name'),
+                                             'score': hit['score'], 'matches': []})
+            entry['score'] = max(entry['score'], hit['score'])
+            if len(entry['matches']) < 3:
+                entry['matches'].append({'question_id': hit.get('question_id'), 'text': hit['text'],
+                                         'score': hit['score'], 'overall_score': hit.get('overall_score')})
+        return sorted(best.values(), key=lambda e: e['score'], reverse=True)[:k]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'available': True,
+            'model': self.model_name,
+            'path': self.persist_dir,
+            'questions': self._collection(QUESTIONS_COLLECTION).count(),
+            'answers': self._collection(ANSWERS_COLLECTION).count(),
+            'sources': len(self._state['sources']),
+            'checkpoints': dict(self._state['checkpoints']),
+        }
+
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+# Chroma (PersistentClient) và state.json không an toàn khi nhiều process cùng ghi: với nhiều worker,
+# app đặt gate để chỉ process leader ghi trực tiếp, process khác để phần mới cho lượt sync của leader.
+_write_gate: Optional[Callable[[], bool]] = None
+
+
+def set_write_gate(gate: Optional[Callable[[], bool]]) -> None:
+    global _write_gate
+    _write_gate = gate
+
+
+def can_write() -> bool:
+    """Process này có được ghi index ngay (index_*) không; mặc định (một process) luôn được."""
+    return _write_gate is None or _write_gate()
+
+
+def get_vector_index() -> Optional[VectorIndex]:
+    """Index dùng chung của process; None nếu thiếu thư viện hoặc bị tắt (VECTOR_INDEX_ENABLED=0)."""
+    global _index
+    if not (VECTOR_INDEX_AVAILABLE and VECTOR_INDEX_ENABLED):
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                default_path = Path(__file__).parent.parent.parent / 'cache' / 'vector_index'
+                _index = VectorIndex(os.getenv('VECTOR_INDEX_PATH', str(default_path)))
+    return _index
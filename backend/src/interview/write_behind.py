@@ -0,0 +1,390 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS interview_log_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    candidate_id TEXT NOT NULL,
+    candidate_name TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    db_id INTEGER,
+    owner TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    flushed_at REAL,
+    dead_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_journal_pending ON interview_log_journal(flushed_at, id);
+CREATE INDEX IF NOT EXISTS idx_journal_db_id ON interview_log_journal(db_id);
+CREATE TABLE IF NOT EXISTS result_journal (
+    local_id INTEGER PRIMARY KEY,
+    result TEXT NOT NULL,
+    db_id INTEGER,
+    owner TEXT,
+    claimed_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    flushed_at REAL,
+    dead_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_result_journal_pending ON result_journal(flushed_at, local_id);
+"""
+
+# upsert_candidates(rows [{candidate_id, candidate_name}]) -> bool
+UpsertCandidates = Callable[[List[Dict[str, Any]]], bool]
+# insert_logs(payloads) -> id DB theo đúng thứ tự, hoặc None nếu lỗi
+InsertLogs = Callable[[List[Dict[str, Any]]], Optional[Sequence[int]]]
+# insert_result(id DB của log, kết quả chấm) -> id DB của kết quả, hoặc None nếu lỗi
+InsertResult = Callable[[int, Dict[str, Any]], Optional[int]]
+
+
+class WriteBehindJournal:
+    """Write-behind cho interview log và ứng viên: nộp bài không chờ Supabase.
+
+    append() ghi bài vào một journal SQLite (WAL, chỉ thêm dòng) và trả ngay id cục bộ; bài đã bền
+    vững từ lúc đó. Một thread nền gom các dòng chưa ghi thành lô: một request upsert nhiều ứng viên
+    (bỏ qua ứng viên đã upsert, nhớ trong bộ nhớ) và một request insert nhiều log, rồi lưu id DB của
+    từng dòng (resolve()/wait_for() để đổi id cục bộ → id DB). Lô lỗi (Supabase down) được giữ lại và
+    thử lại với backoff. Nhiều process có thể dùng chung một file: mỗi lô được claim (owner, lease
+    `claim_lease` giây) nên không bị ghi hai lần. Ghi theo kiểu at-least-once: process chết giữa lúc
+    insert xong và lúc lưu id DB thì lô đó được ghi lại.
+
+    Kết quả chấm của một bài chưa có id DB được gửi vào journal (attach_result()) thay vì bắt worker
+    chấm điểm chờ: flusher ghi kết quả (`insert_result`) ngay sau khi log của nó có id DB.
+
+    Lô bị từ chối được ghi lại từng dòng, nên một dòng hỏng (VD: payload Supabase không nhận) không
+    chặn các bài sau. Dòng lỗi trong khi các dòng khác cùng lượt ghi được tính một lần thất bại; đủ
+    `max_attempts` lần thì bị đưa vào dead-letter (`dead_at`, giữ lại để xem xét, không thử nữa).
+    Khi mọi dòng đều lỗi (Supabase down) thì không tính, cả lô được thử lại với backoff.
+    """
+
+    def __init__(self, db_path: str, upsert_candidates: UpsertCandidates, insert_logs: InsertLogs,
+                 insert_result: Optional[InsertResult] = None, batch_size: int = 50, flush_interval: float = 0.5, max_backoff: float = 30.0,
+                 claim_lease: float = 120.0, retention_seconds: float = 7 * 86400.0, known_max: int = 100000,
+                 max_attempts: int = 5):
+        self.db_path = db_path
+        self.upsert_candidates = upsert_candidates
+        self.insert_logs = insert_logs
+        self.insert_result = insert_result
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.claim_lease = claim_lease
+        self.retention_seconds = retention_seconds
+        self.known_max = known_max
+        self.max_attempts = max(1, int(max_attempts))
+        self._known: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._pid: Optional[int] = None
+        self._owner = ''
+        self._failures = 0
+        self._last_prune = 0.0
+        self.batches = 0
+        self.rows_flushed = 0
+        self.results_flushed = 0
+        self.candidates_skipped = 0
+        self.dead_lettered = 0
+        self.last_error: Optional[str] = None
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(_SCHEMA)
+            # journal tạo bởi phiên bản cũ chưa có cột dead_at
+            for table in ('interview_log_journal', 'result_journal'):
+                columns = {r['name'] for r in conn.execute(f'PRAGMA table_info({table})')}
+                if 'dead_at' not in columns:
+                    conn.execute(f'ALTER TABLE {table} ADD COLUMN dead_at REAL')
+                    # attempts trước đây đếm số lần claim, không phải số lần dòng lỗi riêng lẻ
+                    conn.execute(f'UPDATE {table} SET attempts = 0')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # -------------------- producer side --------------------
+    def append(self, candidate_id: str, candidate_name: str, payload: Dict[str, Any]) -> int:
+        """Ghi bài vào journal (bền vững ngay) → id cục bộ."""
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                'INSERT INTO interview_log_journal (candidate_id, candidate_name, payload, created_at) VALUES (?, ?, ?, ?)',
+                (candidate_id, candidate_name, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+            local_id = int(cur.lastrowid)
+        self.start()
+        with self._flushed:
+            self._flushed.notify_all()
+        return local_id
+
+    def resolve(self, local_id: int) -> Optional[int]:
+        """id DB của một dòng journal, None nếu chưa ghi lên Supabase."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT db_id FROM interview_log_journal WHERE id = ?', (local_id,)).fetchone()
+        return int(row['db_id']) if row and row['db_id'] is not None else None
+
+    def wait_for(self, local_id: int, timeout: float) -> Optional[int]:
+        """Chờ tối đa `timeout` giây tới khi dòng được ghi (flusher của process bất kỳ) → id DB."""
+        deadline = time.monotonic() + timeout
+        while True:
+            db_id = self.resolve(local_id)
+            remaining = deadline - time.monotonic()
+            if db_id is not None or remaining <= 0:
+                return db_id
+            with self._flushed:
+                self._flushed.wait(min(remaining, self.flush_interval))
+
+    def local_ids_for(self, db_ids: Iterable[int]) -> Dict[int, int]:
+        """{id DB: id cục bộ} cho các log đã ghi qua journal."""
+        db_ids = [int(i) for i in db_ids]
+        out: Dict[int, int] = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(db_ids), 500):
+                chunk = db_ids[i:i + 500]
+                marks = ','.join('?' for _ in chunk)
+                for row in conn.execute(f'SELECT id, db_id FROM interview_log_journal WHERE db_id IN ({marks})', chunk):
+                    out[int(row['db_id'])] = int(row['id'])
+        return out
+
+    def attach_result(self, local_id: int, result: Dict[str, Any]) -> None:
+        """Gửi kết quả chấm của một bài trong journal; được ghi lên Supabase sau log của nó."""
+        with closing(self._connect()) as conn:
+            conn.execute('INSERT INTO result_journal (local_id, result, created_at) VALUES (?, ?, ?) '
+                         'ON CONFLICT(local_id) DO UPDATE SET result = excluded.result WHERE flushed_at IS NULL',
+                         (local_id, json.dumps(result, ensure_ascii=False), time.time()))
+        self.start()
+        with self._flushed:
+            self._flushed.notify_all()
+
+    def result_id(self, local_id: int) -> Optional[int]:
+        """id DB của kết quả gửi qua attach_result(), None nếu chưa ghi."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT db_id FROM result_journal WHERE local_id = ?', (local_id,)).fetchone()
+        return int(row['db_id']) if row and row['db_id'] is not None else None
+
+    def pending_result(self, local_id: int) -> Optional[Dict[str, Any]]:
+        """Kết quả đang chờ ghi (đọc được ngay, trước khi lên Supabase)."""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT result FROM result_journal WHERE local_id = ?', (local_id,)).fetchone()
+        return json.loads(row['result']) if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT COUNT(*) AS pending, MIN(created_at) AS oldest FROM interview_log_journal '
+                               'WHERE flushed_at IS NULL AND dead_at IS NULL').fetchone()
+            pending_results = conn.execute('SELECT COUNT(*) FROM result_journal '
+                                           'WHERE flushed_at IS NULL AND dead_at IS NULL').fetchone()[0]
+            dead = conn.execute('SELECT COUNT(*) FROM interview_log_journal WHERE dead_at IS NOT NULL').fetchone()[0]
+            dead_results = conn.execute('SELECT COUNT(*) FROM result_journal WHERE dead_at IS NOT NULL').fetchone()[0]
+        return {'pending': int(row['pending']), 'pending_results': int(pending_results),
+                'dead': int(dead), 'dead_results': int(dead_results),
+                'results_flushed': self.results_flushed,
+                'oldest_pending_age': round(time.time() - row['oldest'], 1) if row['oldest'] else 0.0,
+                'batches': self.batches, 'rows_flushed': self.rows_flushed,
+                'candidates_skipped': self.candidates_skipped, 'known_candidates': len(self._known),
+                'last_error': self.last_error}
+
+    # -------------------- flusher --------------------
+    def start(self) -> None:
+        """Khởi động flusher cho process hiện tại (idempotent; sau fork chạy thread mới)."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+            self._known.clear()
+            threading.Thread(target=self._flush_loop, args=(self._owner,), name='write-behind', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _claim(self, table: str = 'interview_log_journal', key: str = 'id', select: Optional[str] = None) -> List[sqlite3.Row]:
+        """Claim tối đa batch_size dòng chưa ghi của `table` (`select`: truy vấn chọn dòng, tham số lease + limit)."""
+        now = time.time()
+        select = select or (f'SELECT * FROM {table} WHERE flushed_at IS NULL AND dead_at IS NULL '
+                            f'AND (owner IS NULL OR claimed_at < ?) ORDER BY {key} LIMIT ?')
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(select, (now - self.claim_lease, self.batch_size)).fetchall()
+            if rows:
+                marks = ','.join('?' for _ in rows)
+                conn.execute(f'UPDATE {table} SET owner = ?, claimed_at = ? '
+                             f'WHERE {key} IN ({marks})', [self._owner, now] + [r[key] for r in rows])
+            conn.execute('COMMIT')
+        except Exception:
+            try:
+                conn.execute('ROLLBACK')
+            except Exception:
+                pass
+            raise
+        finally:
+            conn.close()
+        return rows
+
+    def _release(self, rows: List[sqlite3.Row], error: str, table: str = 'interview_log_journal', key: str = 'id') -> None:
+        marks = ','.join('?' for _ in rows)
+        with closing(self._connect()) as conn:
+            conn.execute(f'UPDATE {table} SET owner = NULL, claimed_at = NULL, error = ? '
+                         f'WHERE {key} IN ({marks}) AND owner = ?', [error] + [r[key] for r in rows] + [self._owner])
+
+    def _strike(self, failed: List[Tuple[sqlite3.Row, str]], table: str = 'interview_log_journal',
+                key: str = 'id') -> None:
+        """Dòng lỗi trong khi dòng khác ghi được: +1 lần thất bại, đủ max_attempts → dead-letter."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            for r, error in failed:
+                conn.execute(f'UPDATE {table} SET owner = NULL, claimed_at = NULL, error = ?, attempts = attempts + 1, '
+                             f'dead_at = CASE WHEN attempts + 1 >= ? THEN ? END WHERE {key} = ? AND owner = ?',
+                             (error, self.max_attempts, now, r[key], self._owner))
+                dead = conn.execute(f'SELECT dead_at FROM {table} WHERE {key} = ?', (r[key],)).fetchone()
+                if dead and dead['dead_at'] is not None:
+                    self.dead_lettered += 1
+                    print(f'[WRITE-BEHIND] {table} #{r[key]} → dead-letter sau {self.max_attempts} lần lỗi: {error}')
+
+    def _write_logs(self, rows: List[sqlite3.Row]) -> Sequence[int]:
+        """Upsert ứng viên + insert log của các dòng → id DB theo thứ tự (lỗi thì raise)."""
+        # Một request upsert không được chạm cùng candidate_id hai lần (Postgres từ chối cả lệnh):
+        # gộp theo candidate_id, giữ tên của bài mới nhất
+        latest: "OrderedDict[str, str]" = OrderedDict()
+        for r in rows:
+            latest.pop(r['candidate_id'], None)
+            latest[r['candidate_id']] = r['candidate_name']
+        candidates = []
+        for cid, name in latest.items():
+            if (cid, name) in self._known:
+                self.candidates_skipped += 1
+            else:
+                candidates.append((cid, name))
+        if candidates and not self.upsert_candidates(
+                [{'candidate_id': cid, 'candidate_name': name} for cid, name in candidates]):
+            raise RuntimeError('candidate upsert failed')
+        for key in candidates:
+            self._known[key] = None
+        while len(self._known) > self.known_max:
+            self._known.popitem(last=False)
+        db_ids = self.insert_logs([json.loads(r['payload']) for r in rows])
+        if db_ids is None or len(db_ids) != len(rows):
+            raise RuntimeError('interview log insert failed')
+        return db_ids
+
+    def _mark_flushed(self, pairs: List[Tuple[sqlite3.Row, int]]) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.executemany('UPDATE interview_log_journal SET db_id = ?, flushed_at = ?, owner = NULL, error = NULL WHERE id = ?',
+                             [(int(db_id), now, r['id']) for r, db_id in pairs])
+        self.rows_flushed += len(pairs)
+        with self._flushed:
+            self._flushed.notify_all()
+
+    def flush_once(self) -> int:
+        """Ghi một lô; trả số dòng đã ghi (0: không còn gì; lỗi thì raise và lô được trả lại).
+
+        Lô lỗi được ghi lại từng dòng để một dòng hỏng không chặn cả journal."""
+        rows = self._claim()
+        if not rows:
+            return 0
+        try:
+            db_ids = self._write_logs(rows)
+        except Exception as e:
+            if len(rows) == 1:
+                self._release(rows, str(e))
+                raise
+            flushed, failed = [], []
+            for r in rows:
+                try:
+                    flushed.append((r, self._write_logs([r])[0]))
+                except Exception as row_error:
+                    failed.append((r, str(row_error)))
+            if not flushed:
+                # Mọi dòng đều lỗi: nhiều khả năng Supabase down → thử lại cả lô, không tính lỗi từng dòng
+                self._release(rows, str(e))
+                raise
+            self._mark_flushed(flushed)
+            self._strike(failed)
+            self.batches += 1
+            return len(flushed)
+        self._mark_flushed(list(zip(rows, db_ids)))
+        self.batches += 1
+        return len(rows)
+
+    def flush_results_once(self) -> int:
+        """Ghi một lô kết quả mà log đã có id DB; trả số kết quả đã ghi (mọi dòng lỗi thì raise và lô được trả lại)."""
+        if self.insert_result is None:
+            return 0
+        rows = self._claim('result_journal', 'local_id', (
+            'SELECT r.local_id, r.result, l.db_id AS log_db_id FROM result_journal r '
+            'JOIN interview_log_journal l ON l.id = r.local_id '
+            'WHERE r.flushed_at IS NULL AND r.dead_at IS NULL AND l.db_id IS NOT NULL '
+            'AND (r.owner IS NULL OR r.claimed_at < ?) ORDER BY r.local_id LIMIT ?'))
+        written = 0
+        failed: List[Tuple[sqlite3.Row, str]] = []
+        for r in rows:
+            try:
+                db_id = self.insert_result(int(r['log_db_id']), json.loads(r['result']))
+                if db_id is None:
+                    raise RuntimeError('evaluate result insert failed')
+            except Exception as e:
+                failed.append((r, str(e)))
+                continue
+            with closing(self._connect()) as conn:
+                conn.execute('UPDATE result_journal SET db_id = ?, flushed_at = ?, owner = NULL, error = NULL '
+                             'WHERE local_id = ?', (int(db_id), time.time(), r['local_id']))
+            self.results_flushed += 1
+            written += 1
+        if failed and not written:
+            self._release([r for r, _ in failed], failed[0][1], 'result_journal', 'local_id')
+            raise RuntimeError(failed[0][1])
+        if failed:
+            self._strike(failed, 'result_journal', 'local_id')
+        if written:
+            with self._flushed:
+                self._flushed.notify_all()
+        return written
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        with closing(self._connect()) as conn:
+            conn.execute('DELETE FROM interview_log_journal WHERE flushed_at IS NOT NULL AND flushed_at < ? '
+                         'AND id NOT IN (SELECT local_id FROM result_journal WHERE flushed_at IS NULL)',
+                         (now - self.retention_seconds,))
+            conn.execute('DELETE FROM result_journal WHERE flushed_at IS NOT NULL AND flushed_at < ?',
+                         (now - self.retention_seconds,))
+
+    def _flush_loop(self, owner: str) -> None:
+        while self._owner == owner:
+            delay = self.flush_interval
+            try:
+                # Ghi liên tục khi còn lô đầy, nghỉ khi journal trống
+                while self.flush_once() >= self.batch_size:
+                    pass
+                while self.flush_results_once() >= self.batch_size:
+                    pass
+                self._failures = 0
+                self._prune()
+            except Exception as e:
+                self._failures += 1
+                self.last_error = str(e)
+                delay = min(self.max_backoff, self.flush_interval * (2 ** self._failures))
+                print(f'[WRITE-BEHIND] flush failed ({self._failures}): {e} → retry in {delay:.1f}s')
+                if not isinstance(e, RuntimeError):
+                    traceback.print_exc()
+                # Không để lô mới đánh thức flusher trước khi hết backoff
+                time.sleep(delay)
+                continue
+            with self._flushed:
+                self._flushed.wait(delay)
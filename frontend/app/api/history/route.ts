@@ -1,9 +1,13 @@
 export const runtime = 'nodejs';
 export const dynamic = 'force-dynamic';
 
-export async function GET() {
-  const resp = await fetch('http://localhost:5000/api/history');
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const qs = searchParams.toString();
+  const resp = await fetch(`http://localhost:5000/api/history${qs ? `?${qs}` : ''}`);
   const text = await resp.text();
   if (!resp.ok) return Response.json({ error: 'Failed to fetch history', status: resp.status, bodyPreview: text.slice(0,500) }, { status: resp.status });
-  try { const data = JSON.parse(text); return Response.json(data); } catch { return Response.json({ error: 'Invalid JSON', bodyPreview: text.slice(0,500) }, { status: 502 }); }
+  const nextCursor = resp.headers.get('X-Next-Cursor');
+  const headers = nextCursor ? { 'X-Next-Cursor': nextCursor } : undefined;
+  try { const data = JSON.parse(text); return Response.json(data, { headers }); } catch { return Response.json({ error: 'Invalid JSON', bodyPreview: text.slice(0,500) }, { status: 502 }); }
 }
@@ -0,0 +1,22 @@
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const questionsFile = searchParams.get('questions_file') || '';
+  const resp = await fetch(`http://localhost:5000/api/questions_events?questions_file=${encodeURIComponent(questionsFile)}`, {
+    headers: { Accept: 'text/event-stream' },
+    signal: request.signal,
+  });
+  if (!resp.ok || !resp.body) {
+    const text = await resp.text();
+    return Response.json({ error: 'Failed to open questions events', status: resp.status, bodyPreview: text.slice(0, 500) }, { status: resp.status || 502 });
+  }
+  return new Response(resp.body, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      Connection: 'keep-alive',
+    },
+  });
+}
@@ -0,0 +1,22 @@
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const log = searchParams.get('log') || '';
+  const resp = await fetch(`http://localhost:5000/api/result_events?log=${encodeURIComponent(log)}`, {
+    headers: { Accept: 'text/event-stream' },
+    signal: request.signal,
+  });
+  if (!resp.ok || !resp.body) {
+    const text = await resp.text();
+    return Response.json({ error: 'Failed to open result events', status: resp.status, bodyPreview: text.slice(0, 500) }, { status: resp.status || 502 });
+  }
+  return new Response(resp.body, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      Connection: 'keep-alive',
+    },
+  });
+}
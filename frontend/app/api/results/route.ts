@@ -1,15 +1,18 @@
 export const runtime = 'nodejs';
 export const dynamic = 'force-dynamic';
 
-export async function GET() {
-  const resp = await fetch('http://localhost:5000/api/results');
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url);
+  const qs = searchParams.toString();
+  const resp = await fetch(`http://localhost:5000/api/results${qs ? `?${qs}` : ''}`);
   const text = await resp.text();
   if (!resp.ok) {
     return Response.json({ error: 'Failed to fetch results', status: resp.status, bodyPreview: text.slice(0, 500) }, { status: resp.status });
   }
   try {
     const data = JSON.parse(text);
-    return Response.json(data);
+    const nextCursor = resp.headers.get('X-Next-Cursor');
+    return Response.json(data, nextCursor ? { headers: { 'X-Next-Cursor': nextCursor } } : undefined);
   } catch {
     return Response.json({ error: 'Invalid JSON from backend', bodyPreview: text.slice(0, 500) }, { status: 502 });
   }
@@ -0,0 +1,28 @@
+// Proxy tới /api/upload_cv/async của Flask: trả về job_id ngay (202), sinh câu hỏi chạy nền
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+export async function POST(request: Request) {
+  try {
+    const inForm = await request.formData();
+    const outForm = new FormData();
+    for (const [k, v] of inForm.entries()) outForm.append(k, v as any);
+
+    const resp = await fetch('http://localhost:5000/api/upload_cv/async', {
+      method: 'POST',
+      body: outForm,
+    });
+
+    const text = await resp.text();
+    let json: any;
+    try { json = JSON.parse(text); } catch { json = { raw: text }; }
+
+    if (!resp.ok) {
+      return Response.json({ error: 'Upload failed', status: resp.status, bodyPreview: text.slice(0, 500), json }, { status: resp.status });
+    }
+
+    return Response.json(json, { status: resp.status });
+  } catch (err) {
+    return Response.json({ error: 'Proxy error', message: err instanceof Error ? err.message : String(err) }, { status: 500 });
+  }
+}
@@ -0,0 +1,36 @@
+// Proxy streaming upload: forwards the form to Flask and pipes the SSE response back
+
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+export async function POST(request: Request) {
+  try {
+    const inForm = await request.formData();
+    const outForm = new FormData();
+    for (const [k, v] of inForm.entries()) outForm.append(k, v as any);
+
+    const resp = await fetch('http://localhost:5000/api/upload_cv/stream', {
+      method: 'POST',
+      body: outForm,
+      headers: { Accept: 'text/event-stream' },
+      signal: request.signal,
+    });
+
+    if (!resp.ok || !resp.body) {
+      const text = await resp.text();
+      let json: any;
+      try { json = JSON.parse(text); } catch { json = { raw: text }; }
+      return Response.json({ error: 'Upload failed', status: resp.status, bodyPreview: text.slice(0, 500), json }, { status: resp.status || 502 });
+    }
+
+    return new Response(resp.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        Connection: 'keep-alive',
+      },
+    });
+  } catch (err) {
+    return Response.json({ error: 'Proxy error', message: err instanceof Error ? err.message : String(err) }, { status: 500 });
+  }
+}
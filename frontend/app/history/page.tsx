@@ -7,7 +7,7 @@ import { api } from '@/lib/api';
 import { useRouter } from 'next/navigation';
 
 export default function HistoryPage() {
-  const [items, setItems] = useState<Array<{ log_file: string; result_file?: string | null; status: 'pending' | 'done'; summary?: any }>>([]);
+  const [items, setItems] = useState<Array<{ log_file: string; result_file?: string | null; status: 'pending' | 'done' | 'failed'; job_status?: string; summary?: any }>>([]);
   const [filterType, setFilterType] = useState('all');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
@@ -90,7 +90,7 @@ export default function HistoryPage() {
                 {filtered.map((it, idx) => {
                   const s = it.summary || {};
                   const title = s?.candidate_name || it.log_file;
-                  const statusText = it.status === 'done' ? 'Đã chấm' : 'Đang chấm...';
+                  const statusText = it.status === 'done' ? 'Đã chấm' : it.status === 'failed' ? 'Lỗi chấm điểm' : it.job_status === 'queued' ? 'Đang chờ chấm...' : 'Đang chấm...';
                   return (
                     <tr key={idx}>
                       <td className="px-6 py-4 text-sm">{title}</td>
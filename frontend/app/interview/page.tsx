@@ -18,6 +18,7 @@ export default function InterviewPage() {
   const searchParams = useSearchParams();
   const router = useRouter();
   const questionsFile = searchParams.get('questions_file');
+  const streamMode = searchParams.get('stream') === '1';
   
   const [questions, setQuestions] = useState<Question[]>([]);
   const [currentQuestionIndex, setCurrentQuestionIndex] = useState(0);
@@ -26,6 +27,8 @@ export default function InterviewPage() {
   const [candidateId, setCandidateId] = useState('');
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
+  // Chế độ stream: câu hỏi tiếp theo vẫn đang được sinh ở backend
+  const [generating, setGenerating] = useState(streamMode);
 
   useEffect(() => {
     if (!questionsFile) {
@@ -58,10 +61,42 @@ export default function InterviewPage() {
       }
     };
 
-    fetchWithRetry();
+    if (!streamMode || typeof window === 'undefined' || !('EventSource' in window)) {
+      setGenerating(false);
+      fetchWithRetry();
+      return () => { cancelled = true; };
+    }
+
+    // Nhận từng câu hỏi ngay khi backend sinh xong; lỗi kết nối thì quay về tải cả file
+    const es = new EventSource(`/api/questions-events?questions_file=${encodeURIComponent(questionsFile)}`);
+    es.addEventListener('question', (ev) => {
+      const data = JSON.parse((ev as MessageEvent).data);
+      if (cancelled) return;
+      setQuestions(prev => (data.index >= prev.length ? [...prev, data.question] : prev));
+      setLoading(false);
+    });
+    es.addEventListener('done', () => {
+      es.close();
+      if (!cancelled) setGenerating(false);
+    });
+    es.addEventListener('error', (ev) => {
+      es.close();
+      if (cancelled) return;
+      setGenerating(false);
+      const raw = (ev as MessageEvent).data;
+      if (raw) {
+        // Lỗi do server gửi (sinh câu hỏi thất bại)
+        const data = JSON.parse(raw);
+        alert(`Không thể tạo câu hỏi. Vui lòng thử lại.\nChi tiết: ${data.message || ''}`);
+        setLoading(false);
+        return;
+      }
+      setQuestions([]);
+      fetchWithRetry();
+    });
 
-    return () => { cancelled = true; };
-  }, [questionsFile, router]);
+    return () => { cancelled = true; es.close(); };
+  }, [questionsFile, streamMode, router]);
 
   const handleAnswerChange = (value: string) => {
     setAnswers(prev => ({
@@ -129,7 +164,8 @@ export default function InterviewPage() {
 
   const currentQuestion = questions[currentQuestionIndex];
   const currentAnswer = answers[currentQuestion.id] || '';
-  const isLastQuestion = currentQuestionIndex === questions.length - 1;
+  const isLastAvailable = currentQuestionIndex === questions.length - 1;
+  const isLastQuestion = isLastAvailable && !generating;
   const allAnswered = questions.every(q => answers[q.id] && answers[q.id].trim() !== '');
 
   return (
@@ -168,7 +204,7 @@ export default function InterviewPage() {
         <div className="bg-white rounded-lg shadow-sm p-6 mb-6">
           <div className="flex justify-between items-center mb-4">
             <span className="text-sm text-gray-600">
-              Câu hỏi {currentQuestionIndex + 1} / {questions.length}
+              Câu hỏi {currentQuestionIndex + 1} / {questions.length}{generating ? '+' : ''}
             </span>
             <span className="text-sm text-gray-600">
               Đã trả lời: {Object.keys(answers).filter(k => answers[parseInt(k)]?.trim()).length} / {questions.length}
@@ -224,6 +260,13 @@ export default function InterviewPage() {
             >
               {submitting ? 'Đang nộp...' : 'Nộp bài'}
             </button>
+          ) : isLastAvailable ? (
+            <button
+              disabled
+              className="px-6 py-3 bg-[#0065ca] text-white rounded-lg opacity-50 cursor-not-allowed"
+            >
+              Đang tạo câu tiếp theo...
+            </button>
           ) : (
             <button
               onClick={handleNext}
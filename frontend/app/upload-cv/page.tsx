@@ -35,24 +35,47 @@ export default function UploadCVPage() {
         formData.append('jd_file', jdFile);
       }
 
-      // Call Next.js proxy route to avoid CORS and capture redirect
-      const res = await fetch('/api/upload-cv', {
+      // Streaming upload: câu hỏi được sinh dần, chuyển sang trang phỏng vấn ngay khi có câu đầu tiên
+      const res = await fetch('/api/upload-cv/stream', {
         method: 'POST',
         body: formData,
       });
 
-      const data = await res.json();
-
-      if (!res.ok || !data?.success) {
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => ({}));
         throw new Error(JSON.stringify(data));
       }
 
-      if (data.questions_file) {
-        router.push(`/interview?questions_file=${encodeURIComponent(data.questions_file)}`);
-        return;
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let questionsFile = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const frames = buffer.split('\n\n');
+        buffer = frames.pop() || '';
+        for (const frame of frames) {
+          const eventLine = frame.split('\n').find(l => l.startsWith('event: '));
+          const dataLine = frame.split('\n').find(l => l.startsWith('data: '));
+          if (!eventLine || !dataLine) continue;
+          const type = eventLine.slice(7);
+          const payload = JSON.parse(dataLine.slice(6));
+          if (type === 'meta') {
+            questionsFile = payload.questions_file;
+          } else if (type === 'error') {
+            throw new Error(payload.message || 'Có lỗi xảy ra khi tạo câu hỏi phỏng vấn');
+          } else if ((type === 'question' || type === 'done') && questionsFile) {
+            // Việc sinh tiếp tục ở backend; trang phỏng vấn nhận phần còn lại qua SSE
+            reader.cancel().catch(() => {});
+            router.push(`/interview?questions_file=${encodeURIComponent(questionsFile)}&stream=1`);
+            return;
+          }
+        }
       }
 
-      router.push('/interview');
+      throw new Error('Không nhận được câu hỏi nào');
     } catch (err) {
       setError('Có lỗi xảy ra: ' + (err instanceof Error ? err.message : 'Unknown error'));
     } finally {
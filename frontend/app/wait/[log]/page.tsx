@@ -13,8 +13,43 @@ export default function WaitPage() {
   const log = decodeURIComponent(params.log);
   const [count, setCount] = useState(0);
   const [error, setError] = useState('');
+  const [progress, setProgress] = useState<{ done: number; total: number } | null>(null);
+  const [useSse, setUseSse] = useState(true);
 
+  // Ưu tiên nhận kết quả qua Server-Sent Events; lỗi kết nối thì quay về poll /api/result-status
   useEffect(() => {
+    if (!useSse) return;
+    if (typeof EventSource === 'undefined') {
+      setUseSse(false);
+      return;
+    }
+    const es = new EventSource(`/api/result-events?log=${encodeURIComponent(log)}`);
+    const done = (ev: MessageEvent) => {
+      const data = JSON.parse(ev.data);
+      if (data?.ready && data?.result_file) {
+        es.close();
+        router.push(`/results/${encodeURIComponent(data.result_file)}`);
+      }
+    };
+    es.addEventListener('result', done as EventListener);
+    es.addEventListener('progress', ((ev: MessageEvent) => {
+      const data = JSON.parse(ev.data);
+      if (typeof data?.done === 'number' && typeof data?.total === 'number') setProgress({ done: data.done, total: data.total });
+    }) as EventListener);
+    es.addEventListener('failed', ((ev: MessageEvent) => {
+      const data = JSON.parse(ev.data);
+      setError(data?.error ? `Chấm điểm thất bại: ${data.error}` : 'Chấm điểm thất bại');
+      es.close();
+    }) as EventListener);
+    es.onerror = () => {
+      es.close();
+      setUseSse(false);
+    };
+    return () => es.close();
+  }, [log, router, useSse]);
+
+  useEffect(() => {
+    if (useSse) return;
     let cancelled = false;
 
     const tick = async () => {
@@ -35,7 +70,7 @@ export default function WaitPage() {
 
     tick();
     return () => { cancelled = true; };
-  }, [log, count, router]);
+  }, [log, count, router, useSse]);
 
   return (
     <div className="min-h-screen">
@@ -44,6 +79,7 @@ export default function WaitPage() {
         <h1 className="text-2xl font-semibold mb-3">Đang chấm điểm phiên phỏng vấn...</h1>
         <p className="text-gray-600 mb-6">Log: {log}</p>
         <div className="mx-auto w-16 h-16 border-4 border-[#0065ca] border-t-transparent rounded-full animate-spin"></div>
+        {progress && <p className="text-gray-600 mt-4">Đã chấm {progress.done}/{progress.total} câu</p>}
         {error && <p className="text-red-600 mt-4">{error}</p>}
         <p className="text-gray-500 mt-6">Trang sẽ tự chuyển tới kết quả khi hoàn tất.</p>
       </main>